@@ -0,0 +1,92 @@
+"""
+Compressed frame reading benchmark.
+
+Writes a file of sparse, Eiger-like frames (deflate, and bitshuffle/LZ4 if
+hdf5plugin is installed), then compares reading every frame with regular h5py
+slicing (one decompression at a time) against direct chunk reads decompressed
+by a pool of threads (see chunkFunctions.readFrames).
+
+Usage (from the repository root):
+    python benchmarks/bench_chunk_read.py [--frames N] [--size Y X] [--threads N ...]
+"""
+
+import argparse
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+import h5py
+import numpy as np
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "src"))
+
+from chunkFunctions import chunkDecoder, readFrames  # noqa: E402
+
+
+def writeFrames(path: str, frames: int, size: tuple):
+    """writes the same frames with each available compression, returns dataset names"""
+    rng = np.random.default_rng(0)
+    data = rng.poisson(0.05, (frames, 1) + size).astype("u4")
+    chunks = (1, 1) + size
+    names = []
+    with h5py.File(path, "w") as f:
+        f.create_dataset("deflate", data=data, chunks=chunks, compression="gzip")
+        names.append("deflate")
+        try:
+            import hdf5plugin
+
+            f.create_dataset(
+                "bitshuffle_lz4",
+                data=data,
+                chunks=chunks,
+                **hdf5plugin.Bitshuffle(cname="lz4"),
+            )
+            names.append("bitshuffle_lz4")
+        except ImportError:
+            print("hdf5plugin is not installed, skipping bitshuffle/LZ4")
+    return names
+
+
+def best(func, runs: int):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--size", type=int, nargs=2, default=(1062, 1028))
+    parser.add_argument("--threads", type=int, nargs="*", default=[1, 2, 4, 8])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "frames.nx")
+        names = writeFrames(path, args.frames, tuple(args.size))
+        megabytes = args.frames * np.prod(args.size) * 4 / 1e6
+        with h5py.File(path, "r") as f:
+            for name in names:
+                dset = f[name]
+                print(f"{name}: {args.frames} frames, {megabytes:.0f} MB decompressed")
+                t = best(lambda: dset[:, 0], args.runs)
+                print(f"    h5py slicing      {t:7.3f} s  {megabytes / t:8.0f} MB/s")
+                decode = chunkDecoder(dset)
+                if decode is None:
+                    print("    direct chunk reads are not supported for this filter")
+                    continue
+                for threads in args.threads:
+                    t = best(lambda: readFrames(dset, decode, threads), args.runs)
+                    print(
+                        f"    {threads:2d} thread(s)      {t:7.3f} s"
+                        f"  {megabytes / t:8.0f} MB/s"
+                    )
+
+
+if __name__ == "__main__":
+    main()
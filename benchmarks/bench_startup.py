@@ -0,0 +1,88 @@
+"""
+Startup benchmark.
+
+Measures the cold import time of the main window module (what is loaded before
+the first window appears) using Python's '-X importtime', and lists the slowest
+top-level imports. Heavy dependencies (matplotlib, sklearn, scipy, openpyxl)
+should not appear, since they are imported when first needed.
+
+Usage (from the repository root):
+    python benchmarks/bench_startup.py [module ...] [--top N] [--runs N]
+
+Each module defaults to 'mainWindow'; e.g. also pass 'RXESWindow' to compare
+with the cost of opening the RXES window.
+"""
+
+import argparse
+import os
+import pathlib
+import subprocess
+import sys
+
+SRC = pathlib.Path(__file__).resolve().parent.parent / "src"
+
+# dependencies that should be imported lazily
+HEAVY = ("matplotlib", "sklearn", "scipy", "openpyxl")
+
+
+def importTimes(module: str):
+    """
+    Imports 'module' in a new interpreter with '-X importtime'.
+
+    Returns
+    -------
+    :obj:`list` of (package, self time (us), cumulative time (us), depth)
+    """
+    env = dict(os.environ, PYTHONPATH=str(SRC))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    times = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        times.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return times
+
+
+def report(module: str, top: int, runs: int):
+    best = None
+    for _ in range(runs):
+        times = importTimes(module)
+        total = sum(t[1] for t in times)
+        if best is None or total < best[0]:
+            best = (total, times)
+    total, times = best
+
+    print(f"{module}: {total / 1000:.1f} ms total import time (best of {runs})")
+    outer = sorted((t for t in times if t[3] <= 1), key=lambda t: -t[2])
+    for name, _, cumulative, _ in outer[:top]:
+        print(f"    {cumulative / 1000:8.1f} ms  {name}")
+
+    loaded = {t[0].split(".")[0] for t in times}
+    heavy = [h for h in HEAVY if h in loaded]
+    print(f"    heavy dependencies imported: {', '.join(heavy) or 'none'}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("modules", nargs="*", default=["mainWindow"])
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    for module in args.modules:
+        report(module, args.top, args.runs)
+
+
+if __name__ == "__main__":
+    main()
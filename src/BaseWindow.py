@@ -1,6 +1,7 @@
 from PyQt6 import QtWidgets
 import axeap.core as core
 import pathlib
+import os
 from SettingsWindow import SettingsWindow
 
 
@@ -33,3 +34,21 @@ class Window(QtWidgets.QMainWindow):
         except Exception:
             dtype = "tif"
         return dtype
+
+    def skipFiles(self, paths: list):
+        """gives watched files that couldn't be read back to the folder watcher
+        (see FolderWatcher.retry), and lists them in the status bar"""
+        watcher = getattr(self, "watcher", None)
+        dropped = watcher.retry(paths) if watcher is not None else list(paths)
+        message = "Could not read " + ", ".join(os.path.basename(p) for p in paths)
+        if len(dropped):
+            names = ", ".join(os.path.basename(p) for p in dropped)
+            message += f" (not retried: {names})"
+        self.statusBar().showMessage(message, 10000)
+
+    def processCount(self):
+        try:
+            processes = int(SettingsWindow.getFileSettings()["processes"])
+        except Exception:
+            processes = 1
+        return max(processes, 1)
@@ -3,12 +3,15 @@
 from PyQt6 import QtWidgets, QtCore
 
 AlignFlag = QtCore.Qt.AlignmentFlag
+ItemRole = QtCore.Qt.ItemDataRole
+CheckState = QtCore.Qt.CheckState
 
 
 class CalibFile:
     """
     Class connected to each individual calibration file.
-    Used to create box of all files, and add spinboxes per file.
+    Holds the file's data, whether it is enabled, and its energy.
+    Shown as one row of a :obj:`CalibTableModel`.
     """
 
     def __init__(
@@ -17,40 +20,157 @@ class CalibFile:
         self.name = name
         self.parent = parent
         self.data = data
+        self.row = row
         self.enabled = checked
         self.disabled = not checked
         self.dims = dims
+        self.model = None
 
         self.name = self.name[self.name.rfind("/") + 1 :]
-        if len(self.name) > 16:
-            text = self.name[:16] + "..."
-        else:
-            text = self.name
-        self.check = QtWidgets.QCheckBox(text)
-        self.check.setToolTip(self.name)
-        self.check.setChecked(checked)
-        self.check.stateChanged.connect(self.switch)
-        self.val = cSpinBox()
-        self.val.setMaximum(1000000)
-        self.val.setDecimals(4)
-        self.val.setMinimumWidth(140)
+        self.energy = 0.0
         if energy is not None:
             try:
-                self.val.setValue(int(energy))
+                self.energy = float(int(energy))
             except Exception:
                 pass
-        self.parent.calib_grid.addWidget(self.check, row, 0, AlignFlag.AlignLeft)
-        self.parent.calib_grid.addWidget(self.val, row, 2, AlignFlag.AlignLeft)
 
     def changeVal(self, val):
-        self.val.setValue(val)
+        self.energy = float(val)
+        if self.model is not None:
+            self.model.rowChanged(self.row, CalibTableModel.ENERGY)
 
     def getVal(self):
-        return self.val.value()
+        return self.energy
 
     def switch(self):
         self.enabled = not self.enabled
         self.disabled = not self.disabled
+        if self.model is not None:
+            self.model.rowChanged(self.row, CalibTableModel.NAME)
+
+
+class CalibTableModel(QtCore.QAbstractTableModel):
+    """
+    Table of all calibration files (name, enabled flag and energy).
+    Rows are fetched in batches and only drawn when visible, so calibrations
+    with hundreds of frames don't create any widgets per frame.
+    """
+
+    NAME = 0
+    ENERGY = 1
+    HEADERS = ("File Name", "Energy")
+    MAX_ENERGY = 1000000
+    BATCH = 256
+
+    def __init__(self, files: list, parent=None):
+        super(CalibTableModel, self).__init__(parent)
+        self.files = files
+        for i, f in enumerate(files):
+            f.row = i
+            f.model = self
+        self.loaded = min(len(files), self.BATCH)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self.loaded
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.HEADERS)
+
+    def canFetchMore(self, parent=QtCore.QModelIndex()):
+        return not parent.isValid() and self.loaded < len(self.files)
+
+    def fetchMore(self, parent=QtCore.QModelIndex()):
+        count = min(self.BATCH, len(self.files) - self.loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QtCore.QModelIndex(), self.loaded, self.loaded + count - 1)
+        self.loaded += count
+        self.endInsertRows()
+
+    def headerData(self, section, orientation, role=ItemRole.DisplayRole):
+        if (
+            role == ItemRole.DisplayRole
+            and orientation == QtCore.Qt.Orientation.Horizontal
+        ):
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=ItemRole.DisplayRole):
+        if not index.isValid():
+            return None
+        f = self.files[index.row()]
+        if index.column() == self.NAME:
+            if role == ItemRole.DisplayRole:
+                if len(f.name) > 16:
+                    return f.name[:16] + "..."
+                return f.name
+            elif role == ItemRole.ToolTipRole:
+                return f.name
+            elif role == ItemRole.CheckStateRole:
+                return CheckState.Checked if f.enabled else CheckState.Unchecked
+        elif index.column() == self.ENERGY:
+            if role == ItemRole.DisplayRole:
+                return f"{f.energy:.4f}"
+            elif role == ItemRole.EditRole:
+                return f.energy
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.column() == self.NAME:
+            flags |= QtCore.Qt.ItemFlag.ItemIsUserCheckable
+        elif index.column() == self.ENERGY:
+            flags |= QtCore.Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=ItemRole.EditRole):
+        if not index.isValid():
+            return False
+        f = self.files[index.row()]
+        if index.column() == self.NAME and role == ItemRole.CheckStateRole:
+            f.enabled = CheckState(value) == CheckState.Checked
+            f.disabled = not f.enabled
+        elif index.column() == self.ENERGY and role == ItemRole.EditRole:
+            f.energy = min(max(float(value), 0.0), float(self.MAX_ENERGY))
+        else:
+            return False
+        self.dataChanged.emit(index, index, [role])
+        return True
+
+    def rowChanged(self, row: int, column: int):
+        """tells views to redraw a single cell"""
+        if row < self.loaded:
+            index = self.index(row, column)
+            self.dataChanged.emit(index, index, [])
+
+    def setEnergies(self, energies):
+        """
+        Sets the energy of each file in order, e.g. from an information file.
+        Extra values are ignored. Views are updated once for all rows.
+        """
+        count = min(len(energies), len(self.files))
+        for f, e in zip(self.files, energies):
+            f.energy = min(max(float(e), 0.0), float(self.MAX_ENERGY))
+        if count and self.loaded:
+            last = min(count, self.loaded) - 1
+            self.dataChanged.emit(
+                self.index(0, self.ENERGY), self.index(last, self.ENERGY), []
+            )
+
+
+class EnergyDelegate(QtWidgets.QStyledItemDelegate):
+    """Edits calibration energies with a :obj:`cSpinBox`."""
+
+    def createEditor(self, parent, option, index):
+        editor = cSpinBox()
+        editor.setParent(parent)
+        editor.setMaximum(CalibTableModel.MAX_ENERGY)
+        editor.setDecimals(4)
+        return editor
 
 
 class cSpinBox(QtWidgets.QDoubleSpinBox):
@@ -0,0 +1,90 @@
+from PyQt6 import QtWidgets, QtCore
+import pyqtgraph as pg
+import numpy as np
+from colourGenerator import colourGen
+
+AlignFlag = QtCore.Qt.AlignmentFlag
+CheckState = QtCore.Qt.CheckState
+
+
+class CrystalWindow(QtWidgets.QDialog):
+    """Window showing the summed spectrum of each analyzer crystal, to check
+    their alignment. Unchecked crystals are left out of the selected sum."""
+
+    def __init__(self, energies, spectra, *args, **kwargs):
+        """
+        Parameters
+        ----------
+        energies: :obj:`np.ndarray`
+            emission energy of each bin.
+        spectra: :obj:`np.ndarray`
+            (crystals, energies) intensities (see spectraFunctions.projectCrystals).
+        """
+        super(CrystalWindow, self).__init__(*args, **kwargs)
+        self.setWindowTitle("Per-Crystal Spectra")
+        self.resize(860, 460)
+        self.energies = np.asarray(energies)
+        self.spectra = np.asarray(spectra)
+
+        self.sc = pg.plot()
+        self.sc.setBackground("w")
+        self.sc.addLegend()
+        label_style = {"color": "#444", "font-size": "12pt"}
+        self.sc.plotItem.getAxis("left").setLabel(text="Signal Counts", **label_style)
+        self.sc.plotItem.getAxis("bottom").setLabel(
+            text="Emission Energy (eV)", **label_style
+        )
+
+        # one curve per crystal, and the sum of the checked crystals
+        colours = colourGen(len(self.spectra), "Rainbow")
+        self.curves = [
+            self.sc.plot(
+                self.energies,
+                inte,
+                pen=pg.mkPen(color=colour, width=2),
+                name=f"Crystal {i + 1}",
+            )
+            for i, (inte, colour) in enumerate(zip(self.spectra, colours))
+        ]
+        self.sum_curve = self.sc.plot(
+            self.energies,
+            self.spectra.sum(axis=0),
+            pen=pg.mkPen(color="k", width=2),
+            name="Selected Sum",
+        )
+
+        # total counts and peak energy of each crystal
+        self.crystal_list = QtWidgets.QListWidget()
+        self.crystal_list.setFixedWidth(260)
+        for i, inte in enumerate(self.spectra):
+            peak = self.energies[np.argmax(inte)] if inte.any() else float("nan")
+            item = QtWidgets.QListWidgetItem(
+                f"Crystal {i + 1}: {inte.sum():.0f} counts, peak {peak:.1f} eV"
+            )
+            item.setFlags(item.flags() | QtCore.Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(CheckState.Checked)
+            self.crystal_list.addItem(item)
+        self.crystal_list.itemChanged.connect(self.selectionChanged)
+
+        close_button = QtWidgets.QPushButton("Close")
+        close_button.clicked.connect(self.accept)
+
+        layout = QtWidgets.QGridLayout(self)
+        layout.addWidget(self.crystal_list, 0, 0)
+        layout.addWidget(self.sc, 0, 1)
+        layout.addWidget(close_button, 1, 1, AlignFlag.AlignRight)
+
+        self.show()
+
+    # shows only checked crystals, and sums them
+    def selectionChanged(self, item):
+        mask = np.array(
+            [
+                self.crystal_list.item(i).checkState() == CheckState.Checked
+                for i in range(self.crystal_list.count())
+            ],
+            dtype=bool,
+        )
+        for curve, checked in zip(self.curves, mask):
+            curve.setVisible(bool(checked))
+        self.sum_curve.setData(self.energies, self.spectra[mask].sum(axis=0))
@@ -0,0 +1,148 @@
+from PyQt6 import QtWidgets, QtCore
+import profileFunctions as prof
+
+AlignFlag = QtCore.Qt.AlignmentFlag
+
+
+class DiagnosticsWindow(QtWidgets.QDialog):
+    """Window showing the time, CPU, bytes read and peak memory of each profiled stage."""
+
+    HEADERS = (
+        "Stage",
+        "Calls",
+        "Wall (s)",
+        "CPU (s)",
+        "Read (MB)",
+        "Peak Memory (MB)",
+    )
+
+    def __init__(self, *args, **kwargs):
+        super(DiagnosticsWindow, self).__init__(*args, **kwargs)
+        self.setWindowTitle("Diagnostics")
+        self.resize(620, 360)
+
+        self.status_label = QtWidgets.QLabel()
+
+        self.table = QtWidgets.QTableWidget(0, len(self.HEADERS))
+        self.table.setHorizontalHeaderLabels(self.HEADERS)
+        self.table.verticalHeader().hide()
+        self.table.setEditTriggers(
+            QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers
+        )
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setColumnWidth(0, 180)
+
+        refresh_button = QtWidgets.QPushButton("Refresh")
+        refresh_button.clicked.connect(self.refresh)
+        clear_button = QtWidgets.QPushButton("Clear")
+        clear_button.clicked.connect(self.clear)
+        save_button = QtWidgets.QPushButton("Save As...")
+        save_button.clicked.connect(self.save)
+
+        layout = QtWidgets.QGridLayout(self)
+        layout.addWidget(self.status_label, 0, 0, 1, 3, AlignFlag.AlignLeft)
+        layout.addWidget(self.table, 1, 0, 1, 3)
+        layout.addWidget(refresh_button, 2, 0)
+        layout.addWidget(clear_button, 2, 1)
+        layout.addWidget(save_button, 2, 2)
+
+        # stages can finish in other threads, so the table is refreshed on a timer
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(1000)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start()
+
+        self.refresh()
+        self.show()
+
+    # fills the table with the totals of each stage
+    def refresh(self):
+        if prof.isProfiling():
+            text = f"Profiling is on (log: {prof.LOG_FILE})"
+        else:
+            text = "Profiling is off (turn it on in Settings)"
+        if prof.readBytes() is None:
+            text += "\nBytes read aren't available on this system (needs psutil)"
+        self.status_label.setText(text)
+
+        summary = prof.summarizeRecords()
+        self.table.setRowCount(len(summary))
+        for row, s in enumerate(summary):
+            values = (
+                s["stage"],
+                str(s["calls"]),
+                f"{s['wall']:.3f}",
+                f"{s['cpu']:.3f}",
+                f"{s['read_bytes'] / 1e6:.1f}",
+                f"{s['peak_memory'] / 1e6:.1f}",
+            )
+            for col, value in enumerate(values):
+                item = QtWidgets.QTableWidgetItem(value)
+                if col:
+                    item.setTextAlignment(AlignFlag.AlignRight | AlignFlag.AlignVCenter)
+                self.table.setItem(row, col, item)
+
+    # removes all records
+    def clear(self):
+        prof.clearRecords()
+        self.refresh()
+
+    # saves all records to a JSON file
+    def save(self):
+        path = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Save Diagnostics", filter="JSON (*.json)"
+        )[0]
+        if not len(path):
+            return
+        prof.saveRecords(path)
+
+    def closeEvent(self, event):
+        self.timer.stop()
+        super().closeEvent(event)
+
+
+class CaptureReportWindow(QtWidgets.QDialog):
+    """Window showing the hottest functions (or lines) of a captured operation."""
+
+    def __init__(self, report: dict, *args, **kwargs):
+        super(CaptureReportWindow, self).__init__(*args, **kwargs)
+        self.setWindowTitle(f"Profile of {report['operation']}")
+        self.resize(720, 420)
+
+        text = "Saved to:\n" + "\n".join(report["files"])
+        if "peak_memory" in report:
+            text = f"Peak traced memory: {report['peak_memory'] / 1e6:.1f} MB\n" + text
+        files_label = QtWidgets.QLabel(text)
+        files_label.setTextInteractionFlags(
+            QtCore.Qt.TextInteractionFlag.TextSelectableByMouse
+        )
+        # what the capture couldn't see (e.g. other threads)
+        note_label = QtWidgets.QLabel(report.get("note", ""))
+        note_label.setWordWrap(True)
+
+        headers = report["headers"]
+        table = QtWidgets.QTableWidget(len(report["rows"]), len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.verticalHeader().hide()
+        table.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        table.horizontalHeader().setStretchLastSection(True)
+        table.setColumnWidth(0, 380)
+        for row, values in enumerate(report["rows"]):
+            for col, value in enumerate(values):
+                if isinstance(value, float):
+                    value = f"{value:.3f}"
+                item = QtWidgets.QTableWidgetItem(str(value))
+                if col:
+                    item.setTextAlignment(AlignFlag.AlignRight | AlignFlag.AlignVCenter)
+                table.setItem(row, col, item)
+
+        close_button = QtWidgets.QPushButton("Close")
+        close_button.clicked.connect(self.accept)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(files_label)
+        layout.addWidget(note_label)
+        layout.addWidget(table)
+        layout.addWidget(close_button, alignment=AlignFlag.AlignRight)
+
+        self.show()
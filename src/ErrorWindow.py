@@ -37,6 +37,10 @@ class ErrorWindow(QtWidgets.QDialog):
             labeltext = "Emission or Incident Energy selected are out of range."
         elif error == "NotEnoughData":
             labeltext = "There are either too many or too few lines in the given information file."
+        elif error == "watchDatasets":
+            labeltext = "New files can only be added while one dataset is selected.\nThe folder is no longer watched."
+        elif error == "badEvents":
+            labeltext = "The event lists (x, y and frame) of a file aren't 1D lists\nof the same length."
         elif error == "notImplemented":
             labeltext = "A selected feature is not yet implemented."
         else:
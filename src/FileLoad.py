@@ -11,15 +11,29 @@ loadData loads and returns data in a readible form."""
 from PyQt6.QtWidgets import QFileDialog
 import pathlib
 from calibFunctions import loadCalib
-from openpyxl import load_workbook
 from ErrorWindow import ErrorWindow
 import axeap.core as core
 
 import h5py
+import numpy as np
+import json
+import os
 from collections.abc import Sequence
+from profileFunctions import profiled
+from chunkFunctions import chunkDecoder, readFrames
+from SparseFrameClass import SparseFrame
 
 desktop_directory = str(pathlib.Path.home() / "Desktop")
 
+# JSON cache of NeXus file layouts (see LoadH5Data.getIndex), kept next to settings.ini
+LAYOUT_CACHE = "h5_layout_cache.json"
+
+# maximum number of files kept in the layout cache
+MAX_CACHED_LAYOUTS = 256
+
+# in-memory copy of the layout cache, read once
+_layouts = {}
+
 
 class LoadFile:
     """Base file loading class."""
@@ -44,6 +58,22 @@ class LoadTiffCalib(LoadFile):
     def loadData(directory: str):
         return loadCalib(directory)
 
+    def loadSparse(directory: str | list):
+        """Loads calibration scans (a folder or list of tif files) as a list of
+        SparseFrames (indexed [x, y]). Files are read one at a time, so only
+        one dense frame is held at once."""
+        if isinstance(directory, (str, os.PathLike)):
+            directory = sorted(
+                str(path)
+                for path in pathlib.Path(directory).iterdir()
+                if path.suffix.lower() in (".tif", ".tiff")
+            )
+        scans = (core.Scan.loadFromPath(path) for path in directory)
+        return [
+            SparseFrame.fromDense(s.img, getattr(s, "meta", None), s.dims)
+            for s in scans
+        ]
+
 
 class LoadH5Data(LoadFile):
     def fileDialog(parent: any):
@@ -57,55 +87,254 @@ class LoadH5Data(LoadFile):
         else:
             return None
 
-    def loadData(directory: str | tuple):
-        # "C:\\Users\\bernoa\\Desktop\\mark_data\\example_count_data.nx"
+    def getImages(node):
+        """finds image, energy and I0 datasets in an h5py group (and its subgroups)"""
+        images = []
+        energies = []
+        i0s = []
+        for key in node.keys():
+            child_node = node[key]
+            if key == "energy":
+                energies.append(child_node)
+            elif key == "IpreKB_ds_v1-net_current":
+                i0s.append(child_node)
+            elif hasattr(child_node, "dtype"):
+                if key == "eiger_image":
+                    images.append(child_node)
+                elif key.endswith("_image"):
+                    images.append(child_node)
+            elif hasattr(child_node, "keys"):
+                im, en, i0 = LoadH5Data.getImages(child_node)
+                images += im
+                energies += en
+                i0s += i0
+        return images, energies, i0s
+
+    def indexFile(fd: h5py.File):
+        """Indexes the datasets found by getImages: path, shape, dtype and
+        chunking of each image dataset, and paths of energy and I0 datasets."""
+        images, energies, i0s = LoadH5Data.getImages(fd)
+        return {
+            "images": [
+                {
+                    "path": imgs.name,
+                    "shape": list(imgs.shape),
+                    "dtype": imgs.dtype.str,
+                    "chunks": list(imgs.chunks) if imgs.chunks else None,
+                }
+                for imgs in images
+            ],
+            "energy": [ens.name for ens in energies],
+            "i0": [i.name for i in i0s],
+        }
+
+    def readLayoutCache():
+        if not _layouts:
+            try:
+                with open(LAYOUT_CACHE, "r") as f:
+                    _layouts.update(json.load(f))
+            except (OSError, ValueError):
+                pass
+        return _layouts
+
+    def writeLayoutCache():
+        # the oldest files are dropped first
+        for path in list(_layouts)[: max(len(_layouts) - MAX_CACHED_LAYOUTS, 0)]:
+            del _layouts[path]
+        try:
+            with open(LAYOUT_CACHE, "w") as f:
+                json.dump(_layouts, f)
+        except OSError:
+            pass
+
+    def getIndex(directory: str, fd: h5py.File | None = None):
+        """
+        Returns the layout index of a NeXus file (see indexFile).
+
+        Files are only walked once: indexes are cached in LAYOUT_CACHE,
+        keyed by path, modification time and size.
+
+        Parameters
+        ----------
+        directory: :obj:`str`
+            path of the file.
+        fd: :obj:`h5py.File`, optional
+            the file, if already open.
+        """
+        path = os.path.abspath(directory)
+        stat = os.stat(path)
+        key = [stat.st_mtime_ns, stat.st_size]
+        cache = LoadH5Data.readLayoutCache()
+        entry = cache.get(path)
+        if entry is not None and entry["key"] == key:
+            index = entry["index"]
+            if fd is None or all(
+                p in fd
+                for p in [d["path"] for d in index["images"]]
+                + index["energy"]
+                + index["i0"]
+            ):
+                return index
+
+        if fd is None:
+            with h5py.File(path, mode="r") as f:
+                index = LoadH5Data.indexFile(f)
+        else:
+            index = LoadH5Data.indexFile(fd)
+        cache.pop(path, None)
+        cache[path] = {"key": key, "index": index}
+        LoadH5Data.writeLayoutCache()
+        return index
 
-        def getImages(node):
-            images = []
-            energies = []
-            i0s = []
-            for key in node.keys():
-                child_node = node[key]
-                if key == "energy":
-                    energies.append(child_node)
-                elif key == "IpreKB_ds_v1-net_current":
-                    i0s.append(child_node)
-                elif hasattr(child_node, "dtype"):
-                    if key == "eiger_image":
-                        images.append(child_node)
-                    elif key.endswith("_image"):
-                        images.append(child_node)
-                elif hasattr(child_node, "keys"):
-                    im, en, i0 = getImages(child_node)
-                    for i in im:
-                        images.append(i)
-                    for e in en:
-                        energies.append(e)
-                    for i in i0:
-                        i0s.append(i)
-            return images, energies, i0s
+    def readValues(fd: h5py.File, names: list):
+        """reads and joins 1D datasets (such as energy or I0) into one array"""
+        if not len(names):
+            return np.empty(0)
+        return np.concatenate([np.ravel(fd[name][()]) for name in names])
+
+    def loadLayout(directory: str):
+        """Returns (image dataset name, number of frames) of each image dataset,
+        along with energy and i0 arrays, without reading any frames."""
+        index = LoadH5Data.getIndex(directory)
+        layout = [(d["path"], d["shape"][0]) for d in index["images"]]
+        with h5py.File(directory, mode="r") as fd:
+            energy = LoadH5Data.readValues(fd, index["energy"])
+            i0 = LoadH5Data.readValues(fd, index["i0"])
+        return layout, energy, i0
+
+    @profiled()
+    def loadData(directory: str | tuple, box: tuple | None = None, threads: int = 1):
+        """Returns the frames of a file (or files) as a list, with its
+        energy and i0 as arrays (empty if the file has none).
+        If a bounding box (row start, row stop, col start, col stop) is given,
+        only that part of each frame is read.
+        With several threads, compressed frames are decompressed in parallel
+        where supported (see chunkFunctions)."""
+        # "C:\\Users\\bernoa\\Desktop\\mark_data\\example_count_data.nx"
 
         points = []
-        energy = []
-        i0 = []
         if isinstance(directory, Sequence) and not isinstance(directory, (str,)):
+            energies = [np.empty(0)]
+            i0s = [np.empty(0)]
             for d in directory:
-                points += LoadH5Data.loadData(d)
+                p, e, i = LoadH5Data.loadData(d, box, threads)
+                points += p
+                energies.append(e)
+                i0s.append(i)
+            energy = np.concatenate(energies)
+            i0 = np.concatenate(i0s)
 
         else:
             with h5py.File(directory, mode="r") as fd:
-                images, energies, i0s = getImages(fd)
-                for imgs in images:
-                    for img in imgs:
-                        points.append(img[0])
-                if energies:
-                    for ens in energies:
-                        energy += list(ens)
-                if i0s:
-                    for i in i0s:
-                        i0 += list(i)
+                index = LoadH5Data.getIndex(directory, fd)
+                if box is None:
+                    rows = cols = slice(None)
+                else:
+                    rows, cols = slice(box[0], box[1]), slice(box[2], box[3])
+                # one hyperslab read per dataset, frames are views (y, x) of it
+                for d in index["images"]:
+                    dset = fd[d["path"]]
+                    decode = chunkDecoder(dset) if threads > 1 else None
+                    if decode is not None:
+                        points += readFrames(dset, decode, threads, rows, cols)
+                    else:
+                        points += list(dset[:, 0, rows, cols])
+                energy = LoadH5Data.readValues(fd, index["energy"])
+                i0 = LoadH5Data.readValues(fd, index["i0"])
         return points, energy, i0
 
+    def loadSparse(directory: list):
+        """Loads the frames of each file as SparseFrames (indexed [y, x]),
+        along with their energies. Files are read one at a time, so only one
+        file's dense frames are held at once."""
+        frames = []
+        energies = [np.empty(0)]
+        for path in directory:
+            images, energy, _ = LoadH5Data.loadData(path)
+            frames += [SparseFrame.fromDense(img) for img in images]
+            energies.append(energy)
+            del images
+        return frames, np.concatenate(energies)
+
+
+class LoadEventData(LoadFile):
+    """Photon event lists: one event per detected photon, as "x", "y" and
+    "frame" datasets (and optional "weight"), in a NeXus/HDF5 or npz file."""
+
+    def fileDialog(parent: any):
+        direct = QFileDialog.getOpenFileNames(
+            parent=parent,
+            directory=desktop_directory,
+            filter="Event Lists (*.h5 *.nx *.nxs *.npz);;Frames (*.tif *.tiff *.nx *.*)",
+        )
+        if direct[0] != [] and direct[1] != "":
+            return direct[0]
+        else:
+            return None
+
+    def findEvents(node):
+        """finds the first h5py group (or subgroup) with "x", "y" and "frame"
+        datasets (groups with only "x" and "y", e.g. motor positions, are skipped).
+        Raises ValueError if that group's datasets aren't 1D lists of events."""
+        keys = ("x", "y", "frame")
+        if all(key in node and hasattr(node[key], "dtype") for key in keys):
+            LoadEventData.checkEvents({key: node[key] for key in keys}, node.name)
+            return node
+        for key in node.keys():
+            if hasattr(node[key], "keys"):
+                group = LoadEventData.findEvents(node[key])
+                if group is not None:
+                    return group
+        return None
+
+    def checkEvents(values: dict, name: str):
+        """raises ValueError unless the event datasets are 1D and the same length"""
+        shapes = {key: values[key].shape for key in values}
+        if any(len(shape) != 1 for shape in shapes.values()):
+            raise ValueError(f"events in {name} aren't 1D lists: {shapes}")
+        if len(set(shapes.values())) > 1:
+            raise ValueError(f"events in {name} have different lengths: {shapes}")
+
+    @profiled()
+    def loadData(directory: str):
+        """Returns the events of a file as a dict of "x", "y", "frame" and
+        "weight" arrays ("weight" is None if not saved, and "frame" is all 0 if
+        not saved in an npz file), along with the number of "frames".
+        Returns None if the file has no event list (e.g. a file of frames), and
+        raises ValueError if its event lists don't match (see checkEvents)."""
+        if str(directory).endswith(".npz"):
+            with np.load(directory) as fd:
+                values = {key: fd[key] for key in fd.files}
+        else:
+            try:
+                fd = h5py.File(directory, mode="r")
+            except OSError:
+                return None
+            with fd:
+                group = LoadEventData.findEvents(fd)
+                if group is None:
+                    return None
+                values = {
+                    key: group[key][()]
+                    for key in group.keys()
+                    if hasattr(group[key], "dtype")
+                }
+        if "x" not in values or "y" not in values:
+            return None
+
+        values.setdefault("frame", np.zeros(len(values["x"]), dtype=int))
+        keys = [key for key in ("x", "y", "frame", "weight") if key in values]
+        LoadEventData.checkEvents({key: values[key] for key in keys}, directory)
+        frame = values["frame"]
+        weight = values.get("weight")
+        return {
+            "x": values["x"],
+            "y": values["y"],
+            "frame": frame,
+            "weight": weight,
+            "frames": int(frame.max()) + 1 if len(frame) else 0,
+        }
+
 
 class LoadInfoData(LoadFile):
     def fileDialog(parent: any):
@@ -120,13 +349,17 @@ class LoadInfoData(LoadFile):
             scans = parent.calibscans
             energies = parent.calib_energies
         if directory[0][-5:] == ".xlsx":
+            from openpyxl import load_workbook
+
             wb = load_workbook(directory[0], read_only=True)
             ws = wb.worksheets[0]
             if rtype == "calib":
-                for i, scan in enumerate(scans.items):
+                values = []
+                for i, scan in enumerate(scans):
                     line = ws.cell(i + 1, 1).value
                     scan.meta["IncidentEnergy"] = line
-                    energies[i].changeVal(line)
+                    values.append(line)
+                parent.calib_model.setEnergies(values)
             elif rtype == "rxes":
                 table = []
                 lines = []
@@ -151,16 +384,23 @@ class LoadInfoData(LoadFile):
         elif directory[0][-4:] == ".txt":
             with open(directory[0], "r") as f:
                 lines = f.readlines()
-                for i, line in enumerate(lines):
-                    # scan.meta["IncidentEnergy"] = lines[i]
-                    energies[i].changeVal(float(line[: line.find("\n")]))
+                # scan.meta["IncidentEnergy"] = lines[i]
+                values = [float(line[: line.find("\n")]) for line in lines]
+                parent.calib_model.setEnergies(values)
 
         elif directory[1] != "":
             if rtype == "calib":
                 try:
-                    scans.addCalibRunInfo(core.CalibRunInfo(directory[0]))
-                    for i, e in enumerate(energies):
-                        e.changeVal(scans.items[i].meta["IncidentEnergy"])
+                    # run info rows are matched to scans by index, so frames stay sparse
+                    info = core.CalibRunInfo(directory[0])
+                    values = list(info._table["Energy"])
+                    if len(values) < len(scans):
+                        raise ValueError("fewer energies than scans")
+                    for frame, value in zip(scans, values):
+                        frame.meta["IncidentEnergy"] = value
+                    parent.calib_model.setEnergies(
+                        [s.meta["IncidentEnergy"] for s in scans[: len(energies)]]
+                    )
 
                 except Exception or Warning:
                     directory = old
@@ -178,6 +418,49 @@ class LoadInfoData(LoadFile):
         return directory
 
 
+class LoadSessionData(LoadFile):
+    def fileDialog(parent: any):
+        direct = QFileDialog.getOpenFileName(
+            parent=parent,
+            directory=desktop_directory,
+            filter="RXES Session (*.nxs *.h5)",
+        )
+        if direct[0] != "":
+            return direct[0]
+        else:
+            return None
+
+    def loadData(directory: str):
+        """Loads datasets saved by exportFunctions.saveRXESSession, in saved order.
+        Each is returned as a dict of name, enabled, emission, intensity, energy and i0,
+        along with variance and pixels (None if not saved).
+        """
+        datasets = []
+        with h5py.File(directory, mode="r") as fd:
+            keys = sorted(fd.keys(), key=lambda k: int(k[k.rfind("_") + 1 :]))
+            for key in keys:
+                group = fd[key]
+                datasets.append(
+                    {
+                        "name": group.attrs["name"],
+                        "enabled": bool(group.attrs["enabled"]),
+                        "emission": group["emission"][()],
+                        "intensity": group["intensity"][()],
+                        "variance": (
+                            group["variance"][()] if "variance" in group else None
+                        ),
+                        "pixels": group["pixels"][()] if "pixels" in group else None,
+                        "energy": (group["energy"][()] if "energy" in group else None),
+                        "i0": (
+                            group["IpreKB_ds_v1-net_current"][()]
+                            if "IpreKB_ds_v1-net_current" in group
+                            else None
+                        ),
+                    }
+                )
+        return datasets
+
+
 class LoadTifSpectraData(LoadFile):
     def fileDialog(parent: any):
         dialog = QFileDialog.getOpenFileNames(filter="TIF Files (*.tif *.tiff)")
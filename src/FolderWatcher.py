@@ -0,0 +1,126 @@
+# :author: Alex Berno
+
+from PyQt6 import QtCore
+import os
+
+# file name endings watched for each data type
+WATCH_SUFFIXES = {
+    "tif": (".tif", ".tiff"),
+    "h5py": (".nx", ".nxs", ".h5", ".hdf5"),
+    "events": (".nx", ".nxs", ".h5", ".npz"),
+}
+
+# number of times a file that couldn't be read is reported again
+MAX_RETRIES = 5
+
+
+class FolderWatcher(QtCore.QObject):
+    """
+    Watches a folder for new data files (e.g. during beamtime).
+
+    A QFileSystemWatcher notices new files as soon as they appear, and the
+    folder is also polled in case notifications are missed (e.g. network
+    drives). New files are reported once their size and modification time
+    stop changing between two polls, so files still being written are never
+    loaded. Files already in the folder when watching starts are ignored.
+
+    Complete files are emitted in name order by 'filesReady'. Files that
+    couldn't be read yet (e.g. still locked) can be given back with 'retry'.
+    """
+
+    filesReady = QtCore.pyqtSignal(list)
+
+    def __init__(
+        self,
+        directory: str,
+        suffixes: tuple,
+        interval: int = 1000,
+        parent=None,
+    ):
+        """
+        Parameters
+        ----------
+        directory: :obj:`str`
+            folder to watch.
+        suffixes: :obj:`tuple`
+            file name endings to watch for, e.g. (".tif", ".tiff").
+        interval: :obj:`int`, optional
+            time between polls, in milliseconds.
+        """
+        super(FolderWatcher, self).__init__(parent)
+        self.directory = str(directory)
+        self.suffixes = tuple(s.lower() for s in suffixes)
+        self.known = set(self.listFiles())
+
+        # (size, modification time) of each new file at the last poll
+        self.pending = {}
+        # number of times each file was given back with 'retry'
+        self.retries = {}
+
+        self.watcher = QtCore.QFileSystemWatcher([self.directory], self)
+        self.watcher.directoryChanged.connect(self.scan)
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.poll)
+        self.timer.start()
+
+    def listFiles(self):
+        """every watched file in the folder"""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return [
+            os.path.join(self.directory, name).replace("\\", "/")
+            for name in names
+            if name.lower().endswith(self.suffixes)
+        ]
+
+    def scan(self, *args):
+        """adds files that weren't seen before to the pending files"""
+        for path in self.listFiles():
+            if path not in self.known and path not in self.pending:
+                self.pending[path] = None
+
+    def poll(self):
+        """emits pending files that haven't changed since the last poll"""
+        self.scan()
+        ready = []
+        for path, last in list(self.pending.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                del self.pending[path]
+                continue
+            state = (stat.st_size, stat.st_mtime_ns)
+            if state == last and stat.st_size > 0:
+                del self.pending[path]
+                self.known.add(path)
+                ready.append(path)
+            else:
+                self.pending[path] = state
+        if len(ready):
+            self.filesReady.emit(sorted(ready))
+
+    def retry(self, paths: list):
+        """
+        Forgets files that couldn't be read, so they are reported again once
+        they are complete (up to MAX_RETRIES times each).
+
+        Returns
+        -------
+        :obj:`list` of the files that won't be retried.
+        """
+        dropped = []
+        for path in paths:
+            self.retries[path] = self.retries.get(path, 0) + 1
+            if self.retries[path] > MAX_RETRIES:
+                dropped.append(path)
+            else:
+                self.known.discard(path)
+        return dropped
+
+    def stop(self):
+        """stops watching the folder"""
+        self.timer.stop()
+        self.watcher.removePaths(self.watcher.directories())
@@ -0,0 +1,92 @@
+from multiprocessing import shared_memory
+import numpy as np
+
+
+class FrameBuffer:
+    """
+    Pool of preallocated detector frame slots in shared memory.
+
+    Loaders decode frames into free slots, and worker processes (see
+    :obj:`FrameBuffer.attach`) read them as numpy views. Only slot numbers are
+    sent between processes, so frames are never pickled or copied again.
+    Slots are released (recycled) once their frame has been used.
+    """
+
+    def __init__(self, slots: int, shape: tuple, dtype, name: str | None = None):
+        """
+        Parameters
+        ----------
+        slots: :obj:`int`
+            number of frames the buffer can hold at once.
+        shape: :obj:`tuple`
+            shape of each frame.
+        dtype:
+            numpy dtype of each frame.
+        name: :obj:`str`, optional
+            name of an existing buffer to attach to. A new buffer is created if not given.
+        """
+        self.slots = int(slots)
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        size = self.slots * int(np.prod(self.shape)) * self.dtype.itemsize
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.frames = np.ndarray(
+            (self.slots,) + self.shape, dtype=self.dtype, buffer=self.shm.buf
+        )
+        self.free_slots = list(range(self.slots - 1, -1, -1))
+
+    @classmethod
+    def attach(cls, info: tuple):
+        """attaches to an existing buffer, given its 'info'"""
+        name, slots, shape, dtype = info
+        return cls(slots, shape, dtype, name=name)
+
+    @property
+    def info(self):
+        """everything needed to attach to this buffer from another process"""
+        return (self.shm.name, self.slots, self.shape, self.dtype.str)
+
+    @property
+    def free(self):
+        """number of free slots"""
+        return len(self.free_slots)
+
+    def acquire(self):
+        """reserves a free slot and returns its number"""
+        if not len(self.free_slots):
+            raise IndexError("no free frame slots")
+        return self.free_slots.pop()
+
+    def release(self, slot: int):
+        """returns a slot to the pool"""
+        self.free_slots.append(slot)
+
+    def view(self, slot: int):
+        """numpy view of a slot (not a copy)"""
+        return self.frames[slot]
+
+    def write(self, img):
+        """copies a frame into a free slot and returns the slot number"""
+        img = np.asarray(img)
+        if img.shape != self.shape:
+            raise ValueError(f"frame shape {img.shape} does not match {self.shape}")
+        slot = self.acquire()
+        self.frames[slot] = img
+        return slot
+
+    def close(self):
+        """closes this process's access, and frees the memory if it created it"""
+        self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
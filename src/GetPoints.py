@@ -3,28 +3,68 @@
 from PyQt6 import QtCore
 from calibFunctions import getCoordsFromScans
 from axeap.core import ScanSet
+from profileFunctions import profiled
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import os
 
 
 class GetPoints(QtCore.QObject):
     """
     Class used to retrieve points asynchronously from files.
     Works using Qt threads and emits points as they're calculated.
+
+    Scans are processed concurrently by a pool of threads, but points are
+    emitted in scan order as (index, points, spots). 'abort' stops the job:
+    scans that haven't started are skipped, scans being searched stop at their
+    next block of rows (see calibFunctions.ROW_BLOCK), and nothing more is emitted.
     """
 
     finished = QtCore.pyqtSignal()
     progress = QtCore.pyqtSignal(object)
 
-    def __init__(self, scans: ScanSet, cuts=None):
+    def __init__(
+        self,
+        scans: ScanSet,
+        cuts=None,
+        dtype: str | None = None,
+        workers: int | None = None,
+    ):
         super(GetPoints, self).__init__()
         self.scans = scans
         self.cuts = cuts
+        self.dtype = dtype
+        self.workers = workers if workers is not None else min(os.cpu_count() or 1, 8)
+        self.aborted = threading.Event()
+
+    def abort(self):
+        """stops the job as soon as possible (safe to call from any thread)"""
+        self.aborted.set()
+
+    def isAborted(self):
+        return self.aborted.is_set()
+
+    def getPoints(self, scan, cuts):
+        if self.aborted.is_set():
+            return None
+        return getCoordsFromScans(
+            scan, reorder=True, cuts=cuts, dtype=self.dtype, abort=self.aborted
+        )
 
+    @profiled("getCalibPoints")
     def run(self):
         if self.cuts is not None:
             cuts = self.cuts
         else:
             cuts = (3, 100)
-        for i in self.scans:
-            points = getCoordsFromScans(i, reorder=True, cuts=cuts)
-            self.progress.emit(points)
+        with ThreadPoolExecutor(max(self.workers, 1)) as pool:
+            futures = [pool.submit(self.getPoints, i, cuts) for i in self.scans]
+            for index, future in enumerate(futures):
+                result = future.result()
+                if self.aborted.is_set():
+                    for f in futures:
+                        f.cancel()
+                    break
+                points, spots = result
+                self.progress.emit((index, points, spots))
         self.finished.emit()
@@ -1,12 +1,11 @@
 # :author: Alexander Berno
 
 from axeap.core import Spectra
-from numpy import log, array, average
-from PyQt6 import QtWidgets
+from numpy import log, sqrt, nan, array, asarray, ndarray, full, ndim, flatnonzero
 
 
 class Dataset:
-    """RXES Dataset class to hold checkbox for each dataset."""
+    """RXES Dataset class to hold the data (and selection state) of each dataset."""
 
     def __init__(
         self,
@@ -14,8 +13,8 @@ class Dataset:
         name: str,
         data: tuple,
         num: int,
-        energy: list | None = None,
-        i0: list | None = None,
+        energy: ndarray | None = None,
+        i0: ndarray | None = None,
         enabled: bool = True,
     ):
         """
@@ -24,11 +23,13 @@ class Dataset:
         parent: obj:`RXESWindow`
             Parent is currently not used
         name: :obj:`str`
-            Name of dataset (used for checkbox)
+            Name of dataset (used for the selection list)
         data: :obj:`tuple`
             List or tuple of RXES Spectra (see Spectrum class) from dataset
         num: :obj:`int`
             numerical order of dataset (0, 1, 2, etc.) compared to other datasets (used for ordering)
+        energy, i0: :obj:`numpy.ndarray` (optional)
+            incident energy and I0 of each spectrum, if known
         enabled: :obj:`bool` (optional)
             Dataset otherwise initiates as enabled, but can be initated as disabled by setting this false
         """
@@ -42,14 +43,10 @@ class Dataset:
         self.enabled = enabled
         self.disabled = not enabled
 
-        self.box = QtWidgets.QCheckBox(name)
-        self.box.setChecked(enabled)
-        self.box.stateChanged.connect(self.switch)
-
-    def switch(self):
-        """enables/disables the dataset (flips enabled to disabled and vice versa)"""
-        self.enabled = not self.enabled
-        self.disabled = not self.disabled
+    def setEnabled(self, enabled: bool):
+        """enables/disables the dataset"""
+        self.enabled = enabled
+        self.disabled = not enabled
 
 
 class Spectrum:
@@ -60,8 +57,8 @@ class Spectrum:
         parent,
         spectrum: Spectra | list,
         num: int,
-        inc: list | float | None = None,
-        i0: list | float | None = None,
+        inc: ndarray | float | None = None,
+        i0: ndarray | float | None = None,
         ul: bool = False,  # means "use log"
         tr: bool = False,  # means "transfer"
         ela: bool = False,  # means "elastic removal"
@@ -76,7 +73,8 @@ class Spectrum:
         num: :obj:`int`
             The numerical order of the Spectrum
         inc, i0, ul, tr, ela:
-            optional parameters for modifying data. inc and i0 are floats, ul tr and ela are booleans.
+            optional parameters for modifying data. inc and i0 are floats (or arrays with one
+            value per spectrum in a list of spectra), ul tr and ela are booleans.
 
             inc modifies the incident energy of the spectrum.
 
@@ -87,6 +85,10 @@ class Spectrum:
             Setting tr takes the transfer energy from the incident and emission.
 
             Setting ela enables elastic removal (removing peaks where incident = emission).
+
+        The variance, standard error and pixel count of each intensity are kept as
+        'variance', 'errors' and 'pixels' (NaN if the spectra weren't projected
+        with them, see spectraFunctions.statSpectra).
         """
         if type(spectrum) is list:
             sp = spectrum[0]
@@ -98,63 +100,57 @@ class Spectrum:
         self.parent = parent
         self.spectrum = spectrum
         self.num = num
+        self.i0 = i0
 
+        # one row of intensities per dataset, normalized by each dataset's i0
+        spectra = spectrum if multi else [spectrum]
+        inte = array([s.intensities for s in spectra], dtype=float)
+        var = array([stats(s, "variance") for s in spectra], dtype=float)
+        pixels = array([stats(s, "pixels") for s in spectra], dtype=float)
         if i0 is not None:
-            if type(i0) is list:
-                if multi:
-                    self.inte = average(
-                        array([s.intensities / i0[i] for i, s in enumerate(spectrum)]),
-                        axis=0,
-                    )
-                else:
-                    self.inte = array(spectrum.intensities) / i0[0]
-            else:
-                if multi:
-                    self.inte = (
-                        average(
-                            array([s.intensities for _, s in enumerate(spectrum)]),
-                            axis=0,
-                        )
-                        / i0
-                    )
-                else:
-                    self.inte = array(spectrum.intensities) / i0
-        else:
-            if multi:
-                self.inte = average([s.intensities for s in spectrum], axis=0)
-            else:
-                self.inte = array(spectrum.intensities)
-
-        if type(inc) is list:
-            inc = inc[0]
+            i0 = asarray(i0, dtype=float)
+            if i0.ndim:
+                i0 = i0[: len(inte), None]
+            inte = inte / i0
+            var = var / (i0 * i0)
+        self.inte = inte.mean(axis=0)
+        # variance of the mean of the datasets
+        self.variance = var.sum(axis=0) / len(var) ** 2
+        self.pixels = pixels.sum(axis=0)
+
+        if inc is not None and ndim(inc):
+            inc = asarray(inc).ravel()[0]
 
         if ul:
+            self.variance = self.variance / (self.inte * self.inte)
             self.inte = log(self.inte)
 
-        self.em = sp.energies
-        if inc is None:
-            self.inc = tuple(num for _, _ in enumerate(sp.energies))
-        else:
-            self.inc = tuple(inc for _, _ in enumerate(sp.energies))
+        self.em = asarray(sp.energies)
+        self.inc = full(len(self.em), num if inc is None else inc)
 
         if ela:
-            x = self.inc[0]
-            bad = []
-            for i, e in enumerate(self.em):
-                if x - 5 <= e <= x + 5:
-                    bad.append(i)
-
-            if len(bad):
-                avgsum = sum(self.inte[: bad[0]]) + sum(self.inte[bad[-1] + 1 :])
-                avg = avgsum / (len(self.em) - len(bad))
-                for b in bad:
-                    self.inte[b] = avg
+            bad = abs(self.em - self.inc[0]) <= 5
+            if bad.any():
+                first, last = flatnonzero(bad)[[0, -1]]
+                avgsum = self.inte[:first].sum() + self.inte[last + 1 :].sum()
+                self.inte[bad] = avgsum / (len(self.em) - bad.sum())
+                self.variance[bad] = nan
 
         if tr:
-            self.em = tuple(abs(x - y) for x, y in zip(self.inc, self.em))
+            self.em = abs(self.inc - self.em)
+
+        self.errors = sqrt(self.variance)
 
         try:
             t = self.parent.filenames[num]
             self.name = t[t.rfind("/") + 1 :]
         except Exception:
             self.name = str(num)
+
+
+def stats(spectrum: Spectra, attr: str):
+    """'variance' or 'pixels' of a spectrum, or NaN if it doesn't have them"""
+    values = getattr(spectrum, attr, None)
+    if values is None:
+        return full(len(spectrum.intensities), nan)
+    return values
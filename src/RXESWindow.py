@@ -3,6 +3,7 @@
 
 import pyqtgraph as pg
 import sys
+import os
 from PyQt6 import QtWidgets, QtCore, QtGui
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_qtagg import (
@@ -11,8 +12,6 @@ from matplotlib.backends.backend_qtagg import (
 )
 import matplotlib
 import numpy as np
-from openpyxl import Workbook as ExWorkbook
-from openpyxl.utils import get_column_letter as getColumnLetter
 from axeap import core
 
 matplotlib.use("QtAgg")
@@ -22,10 +21,27 @@ from RXESSpectrumClass import Dataset, Spectrum
 from FileLoad import LoadTifSpectraData, LoadH5Data
 from BaseWindow import Window
 from ErrorWindow import ErrorWindow
-from spectraFunctions import calcDataForSpectra, calcSpectra
+from spectraFunctions import (
+    frameLayout,
+    calcDataForSpectra,
+    calcSpectra,
+    spectraPool,
+    calcH5Spectra,
+    calcFileSpectra,
+)
 from LoadingBarWindow import LoadingBarWindow
-from FileLoad import LoadInfoData
+from FileLoad import LoadInfoData, LoadSessionData
 from SettingsWindow import SettingsWindow
+from plotFunctions import cropGrid, displayBudget, downsampleGrid
+from SelectionListClass import SelectionModel, SelectionList
+from profileFunctions import profiled
+from exportFunctions import (
+    exportType,
+    saveSpectraTable,
+    saveRXESNexus,
+    saveRXESSession,
+)
+from FolderWatcher import FolderWatcher, WATCH_SUFFIXES
 
 
 AlignFlag = QtCore.Qt.AlignmentFlag
@@ -103,8 +119,12 @@ class RXESWindow(Window):
             },
             "col_mode": None,
             "colmap_type": None,
+            "pool_type": None,
         }
         self.data_changed = False
+        self.view_2d = None
+        self.watcher = None
+        self.watch_source = None
 
         # energy map assignment (if parent has an energy map)
         if self.parent is None:
@@ -127,6 +147,9 @@ class RXESWindow(Window):
         self.ax2d = self.sc2d.axes
         self.ax2d.set_position((0.23, 0.16, 0.73, 0.8))
         self.fixax2d()
+        # scrolling zooms the contour map, double clicking resets it
+        self.sc2d.mpl_connect("scroll_event", self.zoom2d)
+        self.sc2d.mpl_connect("button_press_event", self.reset2d)
         # self.sc2d = pg.plot()
         # # self.sc2d.setBackground("w")
         # self.sc2d.plotItem.getAxis("left").setLabel(text="Emission", **label_style)
@@ -194,6 +217,31 @@ class RXESWindow(Window):
         self.save_inc_button.setIcon(QtGui.QIcon("icons/save-icon.png"))
         filemenu.addAction(self.save_inc_button)
 
+        # Session Menu (processed datasets, so raw frames don't need reprocessing)
+        sessionmenu = QtWidgets.QMenu("Session", menubar)
+        menubar.addAction(sessionmenu.menuAction())
+
+        self.save_session_button = QtGui.QAction("Save Session As...")
+        self.save_session_button.triggered.connect(self.saveSession)
+        self.save_session_button.setDisabled(True)
+        self.save_session_button.setIcon(QtGui.QIcon("icons/save-icon.png"))
+        sessionmenu.addAction(self.save_session_button)
+        sessionmenu.addSeparator()
+
+        self.load_session_button = QtGui.QAction("Load Session...")
+        self.load_session_button.triggered.connect(self.loadSession)
+        sessionmenu.addAction(self.load_session_button)
+
+        # Live Menu (new files of the loaded folder are added to its dataset)
+        livemenu = QtWidgets.QMenu("Live", menubar)
+        menubar.addAction(livemenu.menuAction())
+
+        self.watch_button = QtGui.QAction("Watch Folder for New Files")
+        self.watch_button.setCheckable(True)
+        self.watch_button.toggled.connect(self.watchFolder)
+        self.watch_button.setDisabled(True)
+        livemenu.addAction(self.watch_button)
+
         # Emission canvas init
         label_style = {"color": "#444", "font-size": "14pt"}
         self.emsc = pg.plot()
@@ -299,6 +347,14 @@ class RXESWindow(Window):
         self.colmap_type.addItem("Cividis", "cividis")
         self.colmap_type.addItem("Gray", "gray")
 
+        # pooling used when reducing large maps to the canvas size
+        pool_label = QtWidgets.QLabel("Pooling:")
+        self.pool_type = QtWidgets.QComboBox()
+        self.pool_type.setFixedSize(74, 30)
+        self.pool_type.addItem("Mean", "mean")
+        self.pool_type.addItem("Max", "max")
+        self.pool_type.currentIndexChanged.connect(lambda _: self.graph2dSpectra())
+
         # add everything to norm_area
         norm_grid.addWidget(info_load_button, 0, 0, 1, 2)
         norm_grid.addWidget(colour_mode_label, 1, 0)
@@ -311,6 +367,8 @@ class RXESWindow(Window):
         norm_grid.addWidget(self.num_points, 6, 1)
         norm_grid.addWidget(colmap_label, 7, 0)
         norm_grid.addWidget(self.colmap_type, 7, 1)
+        norm_grid.addWidget(pool_label, 8, 0)
+        norm_grid.addWidget(self.pool_type, 8, 1)
         norm_area.setWidget(norm_widget)
 
         # Emission and Incident selection
@@ -324,6 +382,11 @@ class RXESWindow(Window):
         self.em_inc_button.clicked.connect(self.calcEmInc)
         self.em_inc_button.setDisabled(True)
 
+        # dataset selection list
+        self.dataset_model = SelectionModel()
+        self.dataset_model.checkedChanged.connect(self.datasetsChanged)
+        self.checks = SelectionList(self.dataset_model)
+
         # Connects everything to the RXES window
         widget = QtWidgets.QWidget()
         self.mlayout = QtWidgets.QGridLayout(widget)
@@ -342,6 +405,7 @@ class RXESWindow(Window):
         self.mlayout.addWidget(self.em_inc_button, 3, 5)
         self.mlayout.addWidget(self.emsc, 4, 1, 1, 4, AlignFlag.AlignLeft)
         self.mlayout.addWidget(self.incsc, 4, 2, 1, 4, AlignFlag.AlignRight)
+        self.mlayout.addWidget(self.checks, 4, 0)
         self.mlayout.setColumnMinimumWidth(0, 170)
         self.mlayout.setColumnMinimumWidth(2, 180)
         self.mlayout.setColumnMinimumWidth(4, 180)
@@ -402,10 +466,12 @@ class RXESWindow(Window):
             if confirm:
                 if hasattr(self.parent, "childWindow"):
                     self.parent.childWindow = None
+                self.watch_button.setChecked(False)
                 event.accept()
             else:
                 event.ignore()
         else:
+            self.watch_button.setChecked(False)
             event.accept()
 
     # loads information file
@@ -425,6 +491,7 @@ class RXESWindow(Window):
         self.data_changed = True
 
     # Main function for loading RXES data
+    @profiled(operation=True)
     def loadRXES(self):
 
         if len(self.emaps):
@@ -437,8 +504,8 @@ class RXESWindow(Window):
                 return
 
         emap = self.emap
-        data = calcDataForSpectra(emap)
         dtype = self.loadType()
+        data = calcDataForSpectra(emap, frameLayout(dtype))
         if dtype == "tif":
             self.filenames = LoadTifSpectraData.fileDialog(self)
         elif dtype == "h5py":
@@ -452,10 +519,32 @@ class RXESWindow(Window):
         scanset = []
         energies = []
         i0s = []
-        if dtype == "h5py":
+        processes = self.processCount()
+        if dtype == "h5py" and processes > 1:
+            # frames are read and projected in chunks by worker processes
+            with spectraPool(data, processes) as pool:
+                for l, j in enumerate(self.filenames, 1):
+                    layout, energy, i0 = LoadH5Data.loadLayout(j)
+                    energies.append(energy)
+                    i0s.append(i0)
+                    LoadWindow = LoadingBarWindow(
+                        f"Loading RXES (RIXS) data... ({l}/{len(self.filenames)})",
+                        sum(frames for _, frames in layout),
+                    )
+                    for spectra in calcH5Spectra(pool, j, layout, data):
+                        if LoadWindow.wasCanceled():
+                            break
+                        scanset += spectra
+                        LoadWindow.setValue(LoadWindow.value() + len(spectra))
+                        QtWidgets.QApplication.processEvents()
+                    if LoadWindow.wasCanceled():
+                        break
+
+        elif dtype == "h5py":
             for l, j in enumerate(self.filenames, 1):
-                images, energy, i0 = LoadH5Data.loadData(j)
-                temp_scans = [core.Scan(np.swapaxes(img, 0, 1)) for img in images]
+                # only the part of each frame covered by the energy map is read
+                images, energy, i0 = LoadH5Data.loadData(j, box=data["box"])
+                temp_scans = [core.Scan(img) for img in images]
                 energies.append(energy)
                 i0s.append(i0)
                 LoadWindow = LoadingBarWindow(
@@ -465,11 +554,25 @@ class RXESWindow(Window):
                 for i in temp_scans:
                     if LoadWindow.wasCanceled():
                         break
-                    spectra, _, _ = calcSpectra(i, emap, data, dtype)
+                    spectra, _, _ = calcSpectra(i, emap, data, dtype, cropped=True)
                     scanset.append(spectra)
                     LoadWindow.add()
                     QtWidgets.QApplication.processEvents()
 
+        elif processes > 1:
+            # frames are decoded into shared memory and projected by worker processes
+            LoadWindow = LoadingBarWindow(
+                "Loading RXES (RIXS) data...", len(self.filenames)
+            )
+            file_spectra = calcFileSpectra(self.filenames, data, processes)
+            for spectra in file_spectra:
+                if LoadWindow.wasCanceled():
+                    break
+                scanset.append(spectra)
+                LoadWindow.add()
+                QtWidgets.QApplication.processEvents()
+            file_spectra.close()
+
         else:
             LoadWindow = LoadingBarWindow(
                 "Loading RXES (RIXS) data...", len(self.filenames)
@@ -478,7 +581,7 @@ class RXESWindow(Window):
                 if LoadWindow.wasCanceled():
                     break
                 spectra, energy, i0 = calcSpectra(i, emap, data, dtype)
-                if energy and len(energy) == len(spectra):
+                if len(energy) and len(energy) == len(spectra):
                     # self.incident_energy = energy
                     # self.i0 = i0
                     energies.append(energy)
@@ -499,27 +602,110 @@ class RXESWindow(Window):
         if dtype == "tif":
             dname = dname[: dname.rfind("/")]
         dname = dname[dname.rfind("/") + 1 :]
-        self.foldernames.append(dname)
         if dtype == "h5py":
+            # one incident energy and i0 per frame, across all files
+            energy = np.concatenate(energies) if len(energies) else np.empty(0)
+            i0 = np.concatenate(i0s) if len(i0s) else np.empty(0)
             dataset = Dataset(
                 self,
                 dname,
                 scanset,
                 len(self.datasets),
-                energy=energy,
-                i0=i0,
+                energy=energy if len(energy) else None,
+                i0=i0 if len(i0) else None,
                 enabled=True,
             )
         else:
             dataset = Dataset(self, dname, scanset, len(self.datasets))
-        self.datasets.append(dataset)
-        self.addDataCheckbox()
+        self.setWatchSource(data, dtype, dataset)
+        self.addDatasets([dataset])
+
+    # keeps the dataset new files of the loaded folder are added to (see watchFolder)
+    def setWatchSource(self, data: dict, dtype: str, dataset: Dataset):
+        self.watch_button.setChecked(False)
+        self.watch_source = {"data": data, "dtype": dtype, "dataset": dataset}
+        self.watch_button.setDisabled(False)
+
+    # starts (or stops) watching the folder of the loaded files for new files
+    def watchFolder(self, checked: bool):
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher.deleteLater()
+            self.watcher = None
+        if not checked or self.watch_source is None or not self.filenames:
+            return
+        directory = os.path.dirname(self.filenames[0])
+        suffixes = WATCH_SUFFIXES[self.watch_source["dtype"]]
+        self.watcher = FolderWatcher(directory, suffixes, parent=self)
+        self.watcher.filesReady.connect(self.addFiles)
+
+    # projects only the new files, and appends their spectra to the watched dataset
+    @profiled()
+    def addFiles(self, paths: list):
+        data = self.watch_source["data"]
+        dtype = self.watch_source["dtype"]
+        scanset = []
+        energies = []
+        i0s = []
+        skipped = []
+        for path in paths:
+            try:
+                spectra, energy, i0 = calcSpectra(path, self.emap, data, dtype)
+            except (OSError, KeyError, ValueError):
+                # e.g. still locked by the detector, tried again on a later poll
+                skipped.append(path)
+                continue
+            scanset += spectra if type(spectra) is list else [spectra]
+            energies.append(energy)
+            i0s.append(i0)
+        if len(skipped):
+            self.skipFiles(skipped)
+        if len(scanset):
+            self.extendDataset(
+                self.watch_source["dataset"],
+                scanset,
+                np.concatenate(energies),
+                np.concatenate(i0s),
+            )
+
+    # appends spectra (with their incident energy and i0, if known) to a dataset
+    def extendDataset(self, dataset: Dataset, spectra: list, energy, i0):
+        # spectra are combined across enabled datasets, which must be the same length
+        others = [d for d in self.datasets if d.enabled and d is not dataset]
+        if dataset.enabled and len(others):
+            self.watch_button.setChecked(False)
+            self.error = ErrorWindow("watchDatasets")
+            return
+        old = (dataset.data, dataset.energy, dataset.i0)
+        dataset.data = list(dataset.data) + list(spectra)
+        if dataset.energy is not None and len(energy):
+            dataset.energy = np.concatenate((dataset.energy, energy))
+        if dataset.i0 is not None and len(i0):
+            dataset.i0 = np.concatenate((dataset.i0, i0))
+
+        failed = self.setData()  # returns True if failed, otherwise None
+        if failed:
+            dataset.data, dataset.energy, dataset.i0 = old
+            return
+
+        self.data_changed = True
+        self.setSubLimits()
+        self.graph3dSpectra()
+        self.graph2dSpectra()
+
+    # adds datasets to the window, then sets and graphs all data
+    def addDatasets(self, datasets: list):
+        self.foldernames += [d.name for d in datasets]
+        self.datasets += datasets
+        mask = np.concatenate((self.dataset_model.mask, [d.enabled for d in datasets]))
+        self.dataset_model.appendItems(datasets, mask.astype(bool))
 
         failed = self.setData()  # returns True if failed, otherwise None
         if failed:
-            self.foldernames.remove(dname)
-            self.datasets.remove(dataset)
-            self.addDataCheckbox()
+            for d in datasets:
+                self.foldernames.remove(d.name)
+                self.datasets.remove(d)
+                self.dataset_model.removeItem(d)
             return
 
         self.data_changed = True
@@ -527,6 +713,44 @@ class RXESWindow(Window):
         self.setSubLimits()
         self.graph3dSpectra()
         self.graph2dSpectra()
+        self.save_session_button.setDisabled(False)
+
+    # saves every dataset's processed spectra so they can be reloaded later
+    def saveSession(self):
+        dialog = QtWidgets.QFileDialog.getSaveFileName(
+            self,
+            "Save Session",
+            filter="RXES Session (*.nxs)",
+        )
+        if not len(dialog[0]):
+            return
+        saveRXESSession(dialog[0], self.datasets)
+
+    # loads processed datasets from a session file (no energy map needed)
+    def loadSession(self):
+        directory = LoadSessionData.fileDialog(self)
+        if directory is None:
+            return
+        datasets = []
+        for i, d in enumerate(LoadSessionData.loadData(directory)):
+            spectra = [core.Spectra(d["emission"], inte) for inte in d["intensity"]]
+            if d["variance"] is not None and d["pixels"] is not None:
+                for s, var, pixels in zip(spectra, d["variance"], d["pixels"]):
+                    s.variance = var
+                    s.pixels = pixels
+            datasets.append(
+                Dataset(
+                    self,
+                    d["name"],
+                    spectra,
+                    len(self.datasets) + i,
+                    energy=d["energy"],
+                    i0=d["i0"],
+                    enabled=d["enabled"],
+                )
+            )
+        if len(datasets):
+            self.addDatasets(datasets)
 
     def setSubLimits(self):
         mininte = 100000
@@ -603,84 +827,52 @@ class RXESWindow(Window):
             # else:
             #     slen = len(scanset)
 
-            i0inc = False
+            # incident energy and i0 of spectrum i are column i (one row per dataset)
             if self.i0 is not None and self.incident_energy is not None:
-                i0inc = True
-                inc = self.incident_energy
-                i0 = self.i0
-
-                inclen = len(inc)
-                i0len = len(i0)
-
-            if self.normalize:
-                if i0inc:
-                    if slen != i0len or slen != inclen or i0len != inclen:
-                        self.error = ErrorWindow("NotEnoughData")
-                        return True
-                    spectra = []
-                    for i, _ in enumerate(scanset[0][0]):
-                        s = [scanset[j][0][i] for j, _ in enumerate(scanset)]
-                        spectra.append(
-                            Spectrum(self, s, i, inc[i], i0[i], ul=ul, tr=tr, ela=ela)
-                        )
-                else:
-                    spectra = []
-                    for i, _ in enumerate(scanset[0][0]):
-                        s = [scanset[j][0][i] for j, _ in enumerate(scanset)]
-                        inc = [scanset[j][1][i] for j, _ in enumerate(scanset)]
-                        i0 = [scanset[j][2][i] for j, _ in enumerate(scanset)]
-                        spectra.append(
-                            Spectrum(self, s, i, inc, i0, ul=ul, tr=tr, ela=ela)
-                        )
-
+                incs = np.asarray(self.incident_energy, dtype=float)
+                i0s = np.asarray(self.i0, dtype=float)
+                if len(i0s) != slen or len(incs) != slen:
+                    self.error = ErrorWindow("NotEnoughData")
+                    return True
+                incs = np.broadcast_to(incs, (len(scanset), slen))
+                i0s = np.broadcast_to(i0s, (len(scanset), slen))
             else:
-                # if not multi:
-                #     self.spectra = [
-                #         Spectrum(self, s, i, inc[i], ul=ul, tr=tr, ela=ela)
-                #         for i, s in enumerate(scanset)
-                #     ]
-                # else:
-                if i0inc:
-                    spectra = []
-                    for i, _ in enumerate(scanset[0][0]):
-                        s = [scanset[j][0][i] for j, _ in enumerate(scanset)]
-                        spectra.append(
-                            Spectrum(self, s, i, inc[i], ul=ul, tr=tr, ela=ela)
-                        )
-                else:
-                    spectra = []
-                    for i, _ in enumerate(scanset[0][0]):
-                        s = [scanset[j][0][i] for j, _ in enumerate(scanset)]
-                        inc = [scanset[j][1][i] for j, _ in enumerate(scanset)]
-                        spectra.append(Spectrum(self, s, i, inc, ul=ul, tr=tr, ela=ela))
+                # datasets without their own values use the information file's
+                rows = [
+                    (
+                        self.incident_energy if i[1] is None else i[1],
+                        self.i0 if i[2] is None else i[2],
+                    )
+                    for i in scanset
+                ]
+                if any(len(inc) < slen or len(i0) < slen for inc, i0 in rows):
+                    self.error = ErrorWindow("NotEnoughData")
+                    return True
+                incs = np.array(
+                    [np.asarray(inc, dtype=float)[:slen] for inc, _ in rows]
+                )
+                i0s = np.array([np.asarray(i0, dtype=float)[:slen] for _, i0 in rows])
+            if not self.normalize:
+                i0s = [None] * slen
+            else:
+                i0s = i0s.T
+
+            spectra = []
+            for i in range(slen):
+                s = [scanset[j][0][i] for j, _ in enumerate(scanset)]
+                spectra.append(
+                    Spectrum(self, s, i, incs[:, i], i0s[i], ul=ul, tr=tr, ela=ela)
+                )
 
         if do_return:
             return spectra
         else:
             self.spectra = spectra
 
-    # creates the checkbox layout (and recreates it to fix formatting)
-    def addDataCheckbox(self):
-
-        try:
-            self.mlayout.removeWidget(self.checks)
-        except Exception:
-            pass
-
-        self.checks = QtWidgets.QScrollArea()
-        self.checks_widget = QtWidgets.QWidget()
-        self.checks_grid = QtWidgets.QGridLayout(self.checks_widget)
-
-        self.datasets = [
-            Dataset(self, d.name, d.data, d.num, d.energy, d.i0, d.enabled)
-            for d in self.datasets
-        ]
-        for dataset in self.datasets:
-            self.checks_grid.addWidget(dataset.box, dataset.num, 0)
-            self.checks_grid.setRowMinimumHeight(dataset.num, 20)
-
-        self.checks.setWidget(self.checks_widget)
-        self.mlayout.addWidget(self.checks, 4, 0)
+    # updates datasets after they are selected or deselected in the list
+    def datasetsChanged(self, rows):
+        for i in rows:
+            self.datasets[i].setEnabled(bool(self.dataset_model.mask[i]))
 
     # sets data and graphs data all in one (for simpler calling)
     def refresh(self):
@@ -691,6 +883,7 @@ class RXESWindow(Window):
             self.setSubLimits()
 
     # This is the 3d graph
+    @profiled()
     def graph3dSpectra(self):
         self.ax3d.clear()
         if self.transfer:
@@ -717,7 +910,10 @@ class RXESWindow(Window):
         y = np.asarray(y)
         z = np.asarray(z)
 
+        # reduces the surface to the canvas size (and Rows/Cols) before drawing
         count = int(self.num_points.text())
+        rows, cols = displayBudget(self.ax3d, count)
+        x, y, z = downsampleGrid(x, y, z, rows, cols, self.pool_type.currentData())
         self.ax3d.plot_surface(
             x,
             y,
@@ -730,6 +926,7 @@ class RXESWindow(Window):
         self.sc3d.draw_idle()
 
     # This is the contour map
+    @profiled()
     def graph2dSpectra(self, forced=False):
         # skips drawing 2d if it hasn't changed
         if (
@@ -741,6 +938,7 @@ class RXESWindow(Window):
                 or self.use_log != self.old_2d["use"]["log"]
                 or self.colour_mode.currentData() != self.old_2d["col_mode"]
                 or self.colmap_type.currentData() != self.old_2d["colmap_type"]
+                or self.pool_type.currentData() != self.old_2d["pool_type"]
             )
             and not forced
         ):
@@ -769,18 +967,6 @@ class RXESWindow(Window):
 
         self.data_changed = False
 
-        self.ax2d.cla()
-        if self.transfer:
-            self.fixax2dtr()
-        else:
-            self.fixax2d()
-        col_mode = self.colour_mode.currentData()
-        colmap = self.colmap_type.currentData()
-        if col_mode == "contour":
-            self.ax2d.contourf(x, y, z, levels=10, extend="both", cmap=colmap)
-        elif col_mode == "pcolor":
-            self.ax2d.pcolor(x, y, z, cmap=colmap)
-
         self.old_2d = {
             "data": [x, y, z],
             "use": {
@@ -789,15 +975,16 @@ class RXESWindow(Window):
                 "ela": self.ela_remove,
                 "log": self.use_log,
             },
-            "col_mode": col_mode,
-            "colmap_type": colmap,
+            "col_mode": self.colour_mode.currentData(),
+            "colmap_type": self.colmap_type.currentData(),
+            "pool_type": self.pool_type.currentData(),
         }
+        self.draw2dView()
 
         self.save_all_button.setDisabled(False)
         self.save_disp_button.setDisabled(False)
         self.save_surf_button.setDisabled(False)
         self.save_cont_button.setDisabled(False)
-        self.sc2d.draw_idle()
 
         self.save_em_button.setDisabled(True)
         self.save_inc_button.setDisabled(True)
@@ -806,6 +993,61 @@ class RXESWindow(Window):
         self.emsc.plotItem.clear()
         self.incsc.plotItem.clear()
 
+    # draws the stored contour map data, reduced to the size of the canvas
+    @profiled()
+    def draw2dView(self, view: tuple | None = None):
+        """view is (xlim, ylim) to zoom into, or None for the full map"""
+        x, y, z = self.old_2d["data"]
+        if view is not None:
+            x, y, z = cropGrid(x, y, z, *view)
+        rows, cols = displayBudget(self.ax2d)
+        x, y, z = downsampleGrid(x, y, z, rows, cols, self.pool_type.currentData())
+        self.view_2d = view
+
+        self.ax2d.cla()
+        if self.transfer:
+            self.fixax2dtr()
+        else:
+            self.fixax2d()
+        col_mode = self.old_2d["col_mode"]
+        colmap = self.old_2d["colmap_type"]
+        if col_mode == "contour":
+            self.ax2d.contourf(x, y, z, levels=10, extend="both", cmap=colmap)
+        elif col_mode == "pcolor":
+            self.ax2d.pcolor(x, y, z, cmap=colmap)
+        if view is not None:
+            self.ax2d.set_xlim(view[0])
+            self.ax2d.set_ylim(view[1])
+        self.sc2d.draw_idle()
+
+    # zooms the contour map around the cursor, redrawing at higher detail
+    def zoom2d(self, event):
+        if event.inaxes is not self.ax2d or not len(self.old_2d["data"]):
+            return
+        scale = 0.8 if event.button == "up" else 1.25
+        x0, x1 = self.ax2d.get_xlim()
+        y0, y1 = self.ax2d.get_ylim()
+        cx, cy = event.xdata, event.ydata
+        xlim = (cx - (cx - x0) * scale, cx + (x1 - cx) * scale)
+        ylim = (cy - (cy - y0) * scale, cy + (y1 - cy) * scale)
+
+        # returns to the full map once zoomed out past its edges
+        x, y, _ = self.old_2d["data"]
+        if (
+            xlim[0] <= np.nanmin(x)
+            and xlim[1] >= np.nanmax(x)
+            and ylim[0] <= np.nanmin(y)
+            and ylim[1] >= np.nanmax(y)
+        ):
+            self.draw2dView()
+        else:
+            self.draw2dView((xlim, ylim))
+
+    # resets the contour map zoom on double click
+    def reset2d(self, event):
+        if event.dblclick and self.view_2d is not None:
+            self.draw2dView()
+
     # Get datapoints for Emission and Incident vs Intensity 2D graphs
     def calcEmInc(self):
         inc = self.select_inc.text().split(",")
@@ -890,106 +1132,81 @@ class RXESWindow(Window):
             for i in inc:
                 self.incsc.plotItem.plot(i[0], i[1], pen=pg.mkPen(color="k", width=2))
 
-    def saveSpectra(self, spectra=None):
+    def saveSpectra(self, spectra=None, titles=None):
         if spectra is None:
             spectra = self.spectra
+        if titles is None:
+            titles = [f"Spectrum {spect.num}" for spect in spectra]
 
         dialog = QtWidgets.QFileDialog.getSaveFileName(
             self,
             "Save Spectra",
-            filter=("Excel Spreadsheet (*.xlsx)\nSimple Text Layout (*.csv)"),
+            filter=(
+                "Excel Spreadsheet (*.xlsx)\nSimple Text Layout (*.csv)"
+                "\nNeXus HDF5 (*.nxs)"
+            ),
         )
+        file_type = exportType(dialog[1])
+        if file_type is None or not len(spectra):
+            return
 
-        if type(spectra[0]) is Spectrum:
-            if dialog[1] == "Excel Spreadsheet (*.xlsx)":
-                wb = ExWorkbook()
-                ws = wb.active
-
-                lines = [[] for _, _ in enumerate(spectra[0].inc)]
-                lines.append([])
-                lines.append([])
-                lines.append([])
-                for spect in spectra:
-                    lines[0].append(f"Spectrum {spect.num}")
-                    lines[0].append("")
-                    lines[0].append("")
-                    lines[0].append("")
-                    lines[1].append("Incident Energy (eV)")
-                    lines[1].append("Emission Energy (eV)")
-                    lines[1].append("Signal Counts")
-                    lines[1].append("")
-                    texts = [
-                        [str(spect.inc[j]), str(spect.em[j]), str(spect.inte[j]), ""]
-                        for j, _ in enumerate(spect.inc)
-                    ]
-                    for k, item in enumerate(texts):
-                        for l in range(4):
-                            lines[k + 2].append(item[l])
-                for i, line in enumerate(lines, 1):
-                    for j, item in enumerate(line, 1):
-                        try:
-                            n = float(item)
-                        except Exception:
-                            n = item
-                        ws.cell(i, j + 1).value = n
-                for i in range(int(len(lines[1]) / 4)):
-                    ws.merge_cells(
-                        start_row=1,
-                        end_row=1,
-                        start_column=i * 4 + 2,
-                        end_column=i * 4 + 4,
-                    )
-                    ws.column_dimensions[getColumnLetter(i * 4 + 2)].width = 18
-                    ws.column_dimensions[getColumnLetter(i * 4 + 3)].width = 18
-                    ws.column_dimensions[getColumnLetter(i * 4 + 4)].width = 8
-
-                ws.cell(1, 1).value = f"Normalized: {self.normalize}"
-                ws.cell(2, 1).value = f"Logged Intensity: {self.use_log}"
-                ws.cell(3, 1).value = f"Elastic Removal: {self.ela_remove}"
-                ws.cell(4, 1).value = f"Transfer Energy: {self.transfer}"
-                ws.column_dimensions[getColumnLetter(1)].width = 24
-
-                wb.save(dialog[0])
-                wb.close()
-
-            elif dialog[1] == "Simple Text Layout (*.csv)":
-                direct = open(dialog[0], "+w")
-                direct.seek(0)
-                direct.truncate()
-                lines = ["" for _, _ in enumerate(spectra[0].inc)]
-                lines.append("")
-                lines.append("")
-                lines[0] += f"Normalized: {self.normalize},"
-                lines[1] += f"Logged Intensity: {self.use_log},"
-                lines[2] += f"Elastic Removal: {self.ela_remove},"
-                lines[3] += f"Transfer Energy: {self.transfer},"
-                for l, _ in enumerate(lines[4:], 4):
-                    lines[l] += ","
-                for spect in spectra:
-                    lines[0] += f"Spectrum {spect.num},,,,"
-                    lines[
-                        1
-                    ] += "Incident Energy (eV),Emission Energy (eV), Signal Counts,,"
-                    texts = [
-                        f"{spect.inc[j]},{spect.em[j]},{spect.inte[j]},,"
-                        for j, _ in enumerate(spect.inc)
-                    ]
-                    for k, string in enumerate(texts):
-                        lines[k + 2] += string
-                text = ""
-                for line in lines:
-                    text += line + "\n"
-                direct.write(text)
-                direct.close()
-        else:
-            pass
+        if file_type == "nxs":
+            if any(spect.i0 is None for spect in spectra):
+                i0 = None
+            else:
+                i0 = [np.mean(spect.i0) for spect in spectra]
+            saveRXESNexus(
+                dialog[0],
+                [spect.inc[0] for spect in spectra],
+                [spect.em for spect in spectra],
+                [spect.inte for spect in spectra],
+                i0,
+                self.provenance(),
+                [spect.errors for spect in spectra],
+                [spect.pixels for spect in spectra],
+            )
+            return
+
+        saveSpectraTable(
+            dialog[0],
+            file_type,
+            titles,
+            (
+                "Incident Energy (eV)",
+                "Emission Energy (eV)",
+                "Signal Counts",
+                "Error",
+                "Pixels",
+            ),
+            [
+                (spect.inc, spect.em, spect.inte, spect.errors, spect.pixels)
+                for spect in spectra
+            ],
+            side=tuple(f"{k}: {v}" for k, v in self.provenance().items()),
+            widths=(18, 18, 8, 8, 8),
+        )
+
+    # processing applied to the current spectra (saved alongside them)
+    def provenance(self):
+        return {
+            "Normalized": self.normalize,
+            "Logged Intensity": self.use_log,
+            "Elastic Removal": self.ela_remove,
+            "Transfer Energy": self.transfer,
+        }
 
     def saveAllSpectra(self):
-        data = [(d.data, d.energy, d.i0) for d in self.datasets if d.enabled]
         spectra = []
-        for d in data:
-            spectra.append(self.setData([d], True))
-        self.saveSpectra(spectra)
+        titles = []
+        for d in self.datasets:
+            if not d.enabled:
+                continue
+            dspectra = self.setData([(d.data, d.energy, d.i0)], True)
+            if not isinstance(dspectra, list):
+                return
+            spectra += dspectra
+            titles += [f"{d.name} - Spectrum {spect.num}" for spect in dspectra]
+        self.saveSpectra(spectra, titles)
 
     def saveDispSpectra(self):
         self.saveSpectra()
@@ -0,0 +1,165 @@
+from PyQt6 import QtWidgets, QtCore, QtGui
+import numpy as np
+
+AlignFlag = QtCore.Qt.AlignmentFlag
+ItemRole = QtCore.Qt.ItemDataRole
+CheckState = QtCore.Qt.CheckState
+
+
+class SelectionModel(QtCore.QAbstractListModel):
+    """
+    Checkable list of items (XES spectra or RXES datasets).
+    Rows are only drawn when visible, so thousands of items cost no widgets.
+
+    Items need a 'name' attribute, and are shown with a colour swatch if they
+    have a 'colour' attribute. Check states are kept in a numpy mask, which
+    can be shared with the data it selects (e.g. :obj:`SpectrumStore.mask`).
+    """
+
+    # emitted with an array of the rows whose check state changed
+    checkedChanged = QtCore.pyqtSignal(object)
+
+    def __init__(self, items: list | None = None, mask=None, parent=None):
+        super(SelectionModel, self).__init__(parent)
+        self.items = list(items) if items is not None else []
+        if mask is None:
+            mask = np.ones(len(self.items), dtype=bool)
+        self.mask = mask
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.items)
+
+    def data(self, index, role=ItemRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        item = self.items[row]
+        if role == ItemRole.DisplayRole or role == ItemRole.ToolTipRole:
+            return item.name
+        elif role == ItemRole.CheckStateRole:
+            return CheckState.Checked if self.mask[row] else CheckState.Unchecked
+        elif role == ItemRole.DecorationRole:
+            colour = getattr(item, "colour", None)
+            if colour is not None:
+                return QtGui.QColor(*(int(c) for c in colour[:3]))
+        return None
+
+    def flags(self, index):
+        return super().flags(index) | QtCore.Qt.ItemFlag.ItemIsUserCheckable
+
+    def setData(self, index, value, role=ItemRole.CheckStateRole):
+        if not index.isValid() or role != ItemRole.CheckStateRole:
+            return False
+        checked = CheckState(value) == CheckState.Checked
+        self.setChecked([index.row()], checked)
+        return True
+
+    def setChecked(self, rows, state: bool = True):
+        """checks (or unchecks) all given rows, emitting one change for all of them"""
+        rows = np.asarray(rows, dtype=int)
+        changed = rows[self.mask[rows] != state]
+        if not len(changed):
+            return
+        self.mask[changed] = state
+        self.rowsChanged(changed, [ItemRole.CheckStateRole])
+        self.checkedChanged.emit(changed)
+
+    def invert(self, rows):
+        """inverts the check state of all given rows"""
+        rows = np.asarray(rows, dtype=int)
+        if not len(rows):
+            return
+        self.mask[rows] = np.logical_not(self.mask[rows])
+        self.rowsChanged(rows, [ItemRole.CheckStateRole])
+        self.checkedChanged.emit(rows)
+
+    def rowsChanged(self, rows=None, roles: list | None = None):
+        """tells views to redraw the given rows (or all rows)"""
+        if not len(self.items):
+            return
+        if rows is None:
+            first, last = 0, len(self.items) - 1
+        else:
+            first, last = int(np.min(rows)), int(np.max(rows))
+        self.dataChanged.emit(self.index(first), self.index(last), roles or [])
+
+    def appendItems(self, items: list, mask=None, checked: bool = True):
+        """
+        Adds items to the end of the list.
+        'mask' replaces the current mask (it must already include the new items),
+        otherwise new items are added with the given 'checked' state.
+        """
+        if not len(items):
+            return
+        first = len(self.items)
+        self.beginInsertRows(QtCore.QModelIndex(), first, first + len(items) - 1)
+        self.items += list(items)
+        if mask is None:
+            mask = np.concatenate((self.mask, np.full(len(items), checked)))
+        self.mask = mask
+        self.endInsertRows()
+
+    def removeItem(self, item):
+        """removes the given item from the list"""
+        row = self.items.index(item)
+        self.beginRemoveRows(QtCore.QModelIndex(), row, row)
+        self.items.pop(row)
+        self.mask = np.delete(self.mask, row)
+        self.endRemoveRows()
+
+
+class SelectionList(QtWidgets.QWidget):
+    """
+    Widget showing a :obj:`SelectionModel`, with a filter box and
+    All/None/Invert buttons. Bulk buttons only affect rows matching the filter.
+    """
+
+    def __init__(self, model: SelectionModel, *args, **kwargs):
+        super(SelectionList, self).__init__(*args, **kwargs)
+        self.model = model
+
+        # filters rows by name
+        self.proxy = QtCore.QSortFilterProxyModel(self)
+        self.proxy.setSourceModel(model)
+        self.proxy.setFilterCaseSensitivity(QtCore.Qt.CaseSensitivity.CaseInsensitive)
+        self.filter_box = QtWidgets.QLineEdit()
+        self.filter_box.setPlaceholderText("Filter...")
+        self.filter_box.setClearButtonEnabled(True)
+        self.filter_box.textChanged.connect(self.proxy.setFilterFixedString)
+
+        # list view (only draws visible rows)
+        self.view = QtWidgets.QListView()
+        self.view.setModel(self.proxy)
+        self.view.setUniformItemSizes(True)
+
+        all_button = QtWidgets.QPushButton("All")
+        all_button.clicked.connect(lambda: self.model.setChecked(self.visibleRows()))
+        none_button = QtWidgets.QPushButton("None")
+        none_button.clicked.connect(
+            lambda: self.model.setChecked(self.visibleRows(), False)
+        )
+        invert_button = QtWidgets.QPushButton("Invert")
+        invert_button.clicked.connect(lambda: self.model.invert(self.visibleRows()))
+
+        layout = QtWidgets.QGridLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.filter_box, 0, 0, 1, 3)
+        layout.addWidget(all_button, 1, 0)
+        layout.addWidget(none_button, 1, 1)
+        layout.addWidget(invert_button, 1, 2)
+        layout.addWidget(self.view, 2, 0, 1, 3)
+
+    def visibleRows(self):
+        """source model rows that match the current filter"""
+        if not self.filter_box.text():
+            return np.arange(self.model.rowCount())
+        proxy = self.proxy
+        return np.array(
+            [
+                proxy.mapToSource(proxy.index(i, 0)).row()
+                for i in range(proxy.rowCount())
+            ],
+            dtype=int,
+        )
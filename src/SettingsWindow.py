@@ -3,6 +3,8 @@
 from PyQt6 import QtWidgets, QtGui
 from PyQt6.QtCore import Qt
 import sys
+import os
+from profileFunctions import armCapture, captureArmed
 
 AlignFlag = Qt.AlignmentFlag
 
@@ -17,7 +19,7 @@ class SettingsWindow(QtWidgets.QDialog):
         else:
             self.settings = self.getDefaultSettings()
         self.setWindowTitle("Settings")
-        self.setFixedSize(300, 200)
+        self.setFixedSize(300, 280)
 
         # default minimum cuts section
         mincuts_label = QtWidgets.QLabel("Default Minimum Cuts:")
@@ -68,6 +70,14 @@ class SettingsWindow(QtWidgets.QDialog):
         elif roitype == "kmeans":
             self.roitype_box.setCurrentIndex(1)
 
+        # worker processes for RXES (RIXS) data, 1 means no extra processes
+        processes_label = QtWidgets.QLabel("RXES Worker Processes:")
+        processes = self.settings["processes"]
+        self.processes_box = QtWidgets.QSpinBox()
+        self.processes_box.setFixedWidth(100)
+        self.processes_box.setRange(1, os.cpu_count() or 1)
+        self.processes_box.setValue(int(processes))
+
         # confirm on close box
         confirm = self.settings["confirm_on_close"]
         if confirm == "False" or not confirm:
@@ -77,6 +87,21 @@ class SettingsWindow(QtWidgets.QDialog):
         self.confirm_box = QtWidgets.QCheckBox("Confirm on close")
         self.confirm_box.setChecked(confirm)
 
+        # profiling box (stage timings are shown in the diagnostics window)
+        profiling = self.settings["profiling"]
+        self.profiling_box = QtWidgets.QCheckBox("Profile processing stages")
+        self.profiling_box.setChecked(not (profiling == "False" or not profiling))
+
+        # one-off capture of the next calibration or spectra load (not saved)
+        capture_label = QtWidgets.QLabel("Profile next operation:")
+        self.capture_box = QtWidgets.QComboBox()
+        self.capture_box.addItem("Off", None)
+        self.capture_box.addItem("CPU (cProfile)", "cpu")
+        self.capture_box.addItem("Memory (tracemalloc)", "memory")
+        self.capture_box.setCurrentIndex(
+            max(self.capture_box.findData(captureArmed()), 0)
+        )
+
         # save and cancel buttons
         save = QtWidgets.QDialogButtonBox.StandardButton.Save
         reset = QtWidgets.QDialogButtonBox.StandardButton.Reset
@@ -97,8 +122,13 @@ class SettingsWindow(QtWidgets.QDialog):
         layout.addWidget(self.cmap_box, 3, 1, AlignFlag.AlignRight)
         layout.addWidget(roi_label, 4, 0, AlignFlag.AlignLeft)
         layout.addWidget(self.roitype_box, 4, 1, AlignFlag.AlignRight)
-        layout.addWidget(self.confirm_box, 5, 0, AlignFlag.AlignLeft)
-        layout.addWidget(buttons, 6, 0, 1, 2, AlignFlag.AlignHCenter)
+        layout.addWidget(processes_label, 5, 0, AlignFlag.AlignLeft)
+        layout.addWidget(self.processes_box, 5, 1, AlignFlag.AlignRight)
+        layout.addWidget(self.confirm_box, 6, 0, AlignFlag.AlignLeft)
+        layout.addWidget(self.profiling_box, 7, 0, 1, 2, AlignFlag.AlignLeft)
+        layout.addWidget(capture_label, 8, 0, AlignFlag.AlignLeft)
+        layout.addWidget(self.capture_box, 8, 1, AlignFlag.AlignRight)
+        layout.addWidget(buttons, 9, 0, 1, 2, AlignFlag.AlignHCenter)
 
         self.setLayout(layout)
         self.show()
@@ -106,6 +136,7 @@ class SettingsWindow(QtWidgets.QDialog):
     def accept(self):
         settings = self.getSettings()
         self.saveSettings(settings)
+        armCapture(self.capture_box.currentData())
         super().accept()
 
     def saveSettings(self, settings):
@@ -115,6 +146,8 @@ class SettingsWindow(QtWidgets.QDialog):
         confirm = settings["confirm_on_close"]
         cmap = settings["cmap"]
         roitype = settings["roi_type"]
+        processes = settings["processes"]
+        profiling = settings["profiling"]
 
         text = (
             "#default is 3"
@@ -129,6 +162,10 @@ class SettingsWindow(QtWidgets.QDialog):
             + f"\ncmap = {str(cmap)}"
             + f"\n#default is standard"
             + f"\nroi_type = {str(roitype)}"
+            + "\n#default is 1"
+            + f"\nprocesses = {str(processes)}"
+            + "\n#default is False"
+            + f"\nprofiling = {str(profiling)}"
         )
         with open("settings.ini", "w") as f:
             f.seek(0)
@@ -143,6 +180,8 @@ class SettingsWindow(QtWidgets.QDialog):
         cmap = self.cmap_box.currentData()
         confirm = self.confirm_box.isChecked()
         roitype = self.roitype_box.currentData()
+        processes = self.processes_box.value()
+        profiling = self.profiling_box.isChecked()
 
         settings = {
             "default_min_cuts": mincuts,
@@ -151,6 +190,8 @@ class SettingsWindow(QtWidgets.QDialog):
             "confirm_on_close": confirm,
             "cmap": cmap,
             "roi_type": roitype,
+            "processes": processes,
+            "profiling": profiling,
         }
         return settings
 
@@ -162,6 +203,9 @@ class SettingsWindow(QtWidgets.QDialog):
         self.cmap_box.setCurrentIndex(0)
         self.confirm_box.setChecked(False)
         self.roitype_box.setCurrentIndex(0)
+        self.processes_box.setValue(int(defaults["processes"]))
+        self.profiling_box.setChecked(False)
+        self.capture_box.setCurrentIndex(0)
 
     def getFileSettings(self=None):
         try:
@@ -185,6 +229,8 @@ class SettingsWindow(QtWidgets.QDialog):
             "confirm_on_close": "True",
             "cmap": "pcolor",
             "roi_type": "standard",
+            "processes": "1",
+            "profiling": "False",
         }
 
         for setting in defaults:
@@ -200,6 +246,8 @@ class SettingsWindow(QtWidgets.QDialog):
             "confirm_on_close": "True",
             "cmap": "pcolor",
             "roi_type": "standard",
+            "processes": "1",
+            "profiling": "False",
         }
         return settings
 
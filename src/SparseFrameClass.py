@@ -0,0 +1,119 @@
+from axeap import core
+import numpy as np
+
+
+class SparseFrame:
+    """
+    Detector frame kept in compressed sparse row (CSR) form.
+
+    Calibration frames are mostly empty outside of the crystal footprints, so
+    only pixels with counts are stored: row r's pixels are
+    'indices[indptr[r]:indptr[r + 1]]' (their columns) and the same slice of
+    'values'. Frames keep the layout they were loaded in (e.g. [y, x] for
+    h5py frames), and can be made dense again (or into a :obj:`core.Scan`)
+    when a whole image is needed.
+    """
+
+    def __init__(
+        self,
+        shape: tuple,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        values: np.ndarray,
+        meta: dict | None = None,
+        dims: tuple | None = None,
+    ):
+        """
+        Parameters
+        ----------
+        shape: :obj:`tuple`
+            (rows, columns) of the dense frame.
+        indptr: :obj:`np.ndarray`
+            start of each row in 'indices' and 'values' (rows + 1 long).
+        indices, values: :obj:`np.ndarray`
+            column and value of each stored pixel, row by row.
+        meta: :obj:`dict`, optional
+            scan metadata (e.g. "IncidentEnergy"), kept for :obj:`core.Scan`.
+        dims: :obj:`tuple`, optional
+            dimensions of the scan the frame came from (default is 'shape').
+        """
+        self.shape = tuple(int(n) for n in shape)
+        self.indptr = indptr
+        self.indices = indices
+        self.values = values
+        self.meta = dict(meta) if meta is not None else {}
+        self.dims = tuple(dims) if dims is not None else self.shape
+
+    @classmethod
+    def fromDense(cls, img, meta: dict | None = None, dims: tuple | None = None):
+        """stores the nonzero pixels of a 2D image"""
+        img = np.asarray(img)
+        rows, cols = np.nonzero(img)
+        counts = np.bincount(rows, minlength=img.shape[0])
+        indptr = np.zeros(img.shape[0] + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        values = img[rows, cols]
+        return cls(img.shape, indptr, cols.astype(np.int32), values, meta, dims)
+
+    @property
+    def dtype(self):
+        return self.values.dtype
+
+    @property
+    def nnz(self):
+        """number of stored (nonzero) pixels"""
+        return len(self.values)
+
+    @property
+    def nbytes(self):
+        """memory used by the stored pixels"""
+        return self.indptr.nbytes + self.indices.nbytes + self.values.nbytes
+
+    def rows(self):
+        """row of each stored pixel"""
+        return np.repeat(np.arange(self.shape[0], dtype=np.int32), np.diff(self.indptr))
+
+    def points(self, cuts: tuple, abort=None, block: int | None = None):
+        """
+        Finds every stored pixel within the cuts (a, b), the same as thresholding
+        the dense frame (pixels with no counts are never included).
+        With 'block', rows are searched that many at a time, and the search stops
+        (with no points) once 'abort' (a :obj:`threading.Event`) is set.
+
+        Returns
+        -------
+        :obj:`list` of first indexes, second indexes and values of the pixels.
+        """
+        block = block or self.shape[0] or 1
+        rows = self.rows()
+        first, second, values = [], [], []
+        for start in range(0, self.shape[0], block):
+            if abort is not None and abort.is_set():
+                return [], [], []
+            a = self.indptr[start]
+            b = self.indptr[min(start + block, self.shape[0])]
+            part = self.values[a:b]
+            keep = np.logical_and(part >= cuts[0], part <= cuts[1])
+            first += rows[a:b][keep].tolist()
+            second += self.indices[a:b][keep].tolist()
+            values += part[keep].tolist()
+        return first, second, values
+
+    def toDense(self):
+        """the full 2D frame"""
+        img = np.zeros(self.shape, dtype=self.dtype)
+        img[self.rows(), self.indices] = self.values
+        return img
+
+    def __array__(self, dtype=None, copy=None):
+        img = self.toDense()
+        return img if dtype is None else img.astype(dtype)
+
+    def toScan(self):
+        """the frame as a :obj:`core.Scan` (made dense), with its metadata and dims"""
+        scan = core.Scan(self.toDense())
+        if self.meta and hasattr(scan, "meta"):
+            scan.meta.update(self.meta)
+        if tuple(getattr(scan, "dims", ())) != self.dims:
+            scan.dims = self.dims
+        return scan
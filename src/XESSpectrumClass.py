@@ -1,9 +1,104 @@
 # :author: Alexander Berno
 
-from PyQt6 import QtWidgets, QtCore
 from axeap.core import Spectra
+import numpy as np
 
-AlignFlag = QtCore.Qt.AlignmentFlag
+
+class SpectrumStore:
+    """
+    Array-backed store of every XES spectrum in a window.
+
+    Row i of each matrix belongs to spectrum i, and 'mask' marks which spectra
+    are selected. Stacking, averaging and selection changes are all done on
+    whole arrays instead of spectrum by spectrum.
+
+    'variance' and 'pixels' hold the statistics spectra were projected with
+    (see spectraFunctions.statSpectra), or NaN for spectra without them.
+    """
+
+    def __init__(self, spectra: list):
+        """
+        Parameters
+        ----------
+        spectra: :obj:`list`
+            list of :obj:`Spectra`, all with the same number of energies.
+        """
+        self.energies = np.array([s.energies for s in spectra], dtype=float)
+        self.base = np.array([s.intensities for s in spectra], dtype=float)
+        self.current = self.base.copy()
+        self.variance = np.array([stats(s, "variance") for s in spectra], dtype=float)
+        self.pixels = np.array([stats(s, "pixels") for s in spectra], dtype=float)
+        self.offsets = np.zeros(len(spectra))
+        self.mask = np.ones(len(spectra), dtype=bool)
+
+    def __len__(self):
+        return len(self.mask)
+
+    def extend(self, spectra: list):
+        """adds spectra (selected) after the current ones"""
+        new = SpectrumStore(spectra)
+        self.energies = np.concatenate((self.energies, new.energies))
+        self.base = np.concatenate((self.base, new.base))
+        self.current = np.concatenate((self.current, new.current))
+        self.variance = np.concatenate((self.variance, new.variance))
+        self.pixels = np.concatenate((self.pixels, new.pixels))
+        self.offsets = np.concatenate((self.offsets, new.offsets))
+        self.mask = np.concatenate((self.mask, new.mask))
+
+    def replace(self, row: int, spectrum: Spectra):
+        """replaces the spectrum in a row (keeping its offset and selection)"""
+        new = SpectrumStore([spectrum])
+        self.energies[row] = new.energies[0]
+        self.base[row] = new.base[0]
+        self.current[row] = new.base[0] + self.offsets[row]
+        self.variance[row] = new.variance[0]
+        self.pixels[row] = new.pixels[0]
+
+    def select(self, rows, state: bool = True):
+        """selects (or deselects if 'state' is False) the given rows"""
+        self.mask[rows] = state
+
+    def invert(self):
+        """inverts the selection"""
+        np.logical_not(self.mask, out=self.mask)
+
+    def stack(self, spacing: float):
+        """offsets each selected spectrum by 'spacing' times its position among selected spectra"""
+        self.offsets = spacing * (np.cumsum(self.mask) - 1.0)
+        np.add(self.base, self.offsets[:, np.newaxis], out=self.current)
+
+    def average(self):
+        """
+        Returns
+        -------
+        (energies, intensities) averaged over the selected spectra.
+        Raises IndexError if no spectra are selected.
+        """
+        if not self.mask.any():
+            raise IndexError("no spectra are selected")
+        return (
+            self.energies[self.mask].mean(axis=0),
+            self.base[self.mask].mean(axis=0),
+        )
+
+    def averageErrors(self):
+        """
+        Returns
+        -------
+        standard error of the average of the selected spectra (see 'average').
+        Raises IndexError if no spectra are selected.
+        """
+        if not self.mask.any():
+            raise IndexError("no spectra are selected")
+        return np.sqrt(self.variance[self.mask].sum(axis=0)) / self.mask.sum()
+
+
+def stats(spectrum: Spectra, attr: str):
+    """'variance' or 'pixels' of a spectrum, or NaN if it doesn't have them"""
+    values = getattr(spectrum, attr, None)
+    if values is None:
+        return np.full(len(spectrum.intensities), np.nan)
+    return values
 
 
 class Spectrum:
@@ -16,54 +111,63 @@ class Spectrum:
         Parameters
         ----------
         parent: :obj:`XESWindow`
-            NOTE: Should be a fully initialized XES Window.
+            NOTE: Should be a fully initialized XES Window, with a :obj:`SpectrumStore`
+            holding this spectrum as 'parent.store'.
         spectrum: :obj:`Spectra`
             spectrum (or 'Spectra') that is the base of the :obj:`Spectrum`.
         colour: :obj:`tuple`
             colour used with the spectrum.
         num: :obj:`int`
-            position of the spectrum on the checks_grid for the parent XES Window.
+            row of the spectrum in the parent's store (and selection list).
         """
 
-        self.restack_now = True
         self.parent = parent
-        self.energies = spectrum.energies
+        self.row = num
+        self.energies = self.parent.store.energies[self.row]
         self.intensities = spectrum.intensities
         self.spectrum = spectrum
-
-        self.base = spectrum.intensities.copy()
-        self.current = self.base.copy()
+        self.curve = None
 
         self.colour = colour
         if name is None:
             try:
-                t = self.parent.filenames[num - 3]
+                t = self.parent.filenames[num]
                 self.name = t[t.rfind("/") + 1 :]
             except Exception:
-                self.name = str(num - 2)
+                self.name = str(num + 1)
         else:
             self.name = name[name.rfind("/") + 1 :]
-        self.box = QtWidgets.QCheckBox()
-        self.box.setChecked(True)
-        self.box.stateChanged.connect(self.switch)
-        self.box.setText(self.name + ", " + str(tuple(int(i) for i in self.colour)))
 
-        self.parent.checks_grid.addWidget(self.box, num, 0, 1, 3, AlignFlag.AlignLeft)
+    @property
+    def base(self):
+        """intensities before stacking (a view of the parent's store)"""
+        return self.parent.store.base[self.row]
+
+    @property
+    def current(self):
+        """intensities as viewed (a view of the parent's store)"""
+        return self.parent.store.current[self.row]
+
+    @property
+    def variance(self):
+        """variance of each intensity (a view of the parent's store)"""
+        return self.parent.store.variance[self.row]
+
+    @property
+    def errors(self):
+        """standard error of each intensity"""
+        return np.sqrt(self.variance)
+
+    @property
+    def pixels(self):
+        """number of pixels with counts in each energy bin (a view of the parent's store)"""
+        return self.parent.store.pixels[self.row]
+
+    @property
+    def enabled(self):
+        """whether the spectrum is selected"""
+        return bool(self.parent.store.mask[self.row])
 
     def increaseIntensity(self, inc, pos):
         """increases viewed intensity (does not affect Spectrum.intensities)"""
         self.current[pos] += inc
-
-    def switch(self, s):
-        """enables/disables the spectrum based on whether the checkbox was checked or unchecked"""
-        if s != QtCore.Qt.CheckState.Checked.value:
-            self.parent.removeSpectrum(self)
-        else:
-            self.parent.addSpectrum(self)
-
-    def editBoxText(self, text: str | None = None):
-        """changes the text in the checkbox"""
-        if text is None:
-            self.box.setText(self.name + ", " + str(tuple(int(i) for i in self.colour)))
-        else:
-            self.box.setText(text)
@@ -4,20 +4,35 @@
 from PyQt6 import QtWidgets, QtCore, QtGui
 import pyqtgraph as pg
 import sys
-from openpyxl import Workbook as ExWorkbook
-from openpyxl.utils import get_column_letter as getColumnLetter
+import os
 import numpy as np
 from axeap import core
 
 from ErrorWindow import ErrorWindow
 from LoadingBarWindow import LoadingBarWindow
-from spectraFunctions import calcDataForSpectra, calcSpectra
-from XESSpectrumClass import Spectrum
+from spectraFunctions import (
+    frameLayout,
+    calcDataForSpectra,
+    calcSpectra,
+    projectSum,
+    projectStats,
+    projectCrystals,
+    statSpectra,
+    sumFrames,
+    framesToEvents,
+    projectEvents,
+)
+from XESSpectrumClass import Spectrum, SpectrumStore
+from SelectionListClass import SelectionModel, SelectionList
 from colourGenerator import colourGen
 from ColourSelectWindow import ColourSelect
-from FileLoad import LoadTifSpectraData, LoadH5Data
+from FileLoad import LoadTifSpectraData, LoadH5Data, LoadEventData
 from ExitDialogWindow import exitDialog
 from BaseWindow import Window
+from profileFunctions import profiled
+from exportFunctions import exportType, saveSpectraTable, saveXESNexus
+from CrystalWindow import CrystalWindow
+from FolderWatcher import FolderWatcher, WATCH_SUFFIXES
 
 AlignFlag = QtCore.Qt.AlignmentFlag
 
@@ -34,6 +49,11 @@ QtCore.qInstallMessageHandler(handler)
 class XESWindow(Window):
     """Window for viewing XES spectra"""
 
+    # accumulation modes (accumulate_box indexes)
+    EACH_FRAME = 0
+    SUM_PER_FILE = 1
+    SUM_ALL = 2
+
     def __init__(self, parent: QtWidgets.QMainWindow | None, *args, **kwargs):
         super(XESWindow, self).__init__(*args, **kwargs)
 
@@ -47,6 +67,11 @@ class XESWindow(Window):
         load_xes_button.clicked.connect(self.loadXES)
         load_xes_button.setFixedSize(140, 30)
 
+        # photon event list button
+        load_events_button = QtWidgets.QPushButton("Photon Events...")
+        load_events_button.clicked.connect(self.loadEvents)
+        load_events_button.setFixedSize(140, 30)
+
         # Canvas (graph plot)
         self.sc = pg.plot()
         self.sc.setBackground("w")
@@ -77,6 +102,11 @@ class XESWindow(Window):
             self.no_close_dialog = False
         self.average_spectra = None
         self.emaps = []
+        self.checks = None
+        self.crystal_spectra = None
+        self.crystal_energies = None
+        self.watcher = None
+        self.watch_source = None
 
         # energy map assignment (if parent has an energy map)
         if self.parent is None:
@@ -123,6 +153,27 @@ class XESWindow(Window):
         self.save_avg_button.setIcon(QtGui.QIcon("icons/save-icon.png"))
         filemenu.addAction(self.save_avg_button)
 
+        # View Menu
+        viewmenu = QtWidgets.QMenu("View", menubar)
+        menubar.addAction(viewmenu.menuAction())
+
+        # Per-crystal spectra "button"
+        self.crystal_view_button = QtGui.QAction("Per-Crystal Spectra...")
+        self.crystal_view_button.triggered.connect(self.showCrystals)
+        self.crystal_view_button.setDisabled(True)
+        viewmenu.addAction(self.crystal_view_button)
+
+        # Live Menu
+        livemenu = QtWidgets.QMenu("Live", menubar)
+        menubar.addAction(livemenu.menuAction())
+
+        # Watch folder "button" (adds new files of the loaded folder as they appear)
+        self.watch_button = QtGui.QAction("Watch Folder for New Files")
+        self.watch_button.setCheckable(True)
+        self.watch_button.toggled.connect(self.watchFolder)
+        self.watch_button.setDisabled(True)
+        livemenu.addAction(self.watch_button)
+
         # Energy map selection box
         self.emap_combo = QtWidgets.QComboBox()
         self.emap_combo.setFixedSize(140, 30)
@@ -164,6 +215,14 @@ class XESWindow(Window):
         self.stack_type_box.addItem("Average of Spectra")
         self.stack_type_box.setCurrentIndex(1)
 
+        # Accumulation mode (one spectrum per frame, or sums of frames)
+        self.accumulate_box = QtWidgets.QComboBox()
+        self.accumulate_box.setFixedSize(140, 30)
+        self.accumulate_box.addItem("Each Frame")
+        self.accumulate_box.addItem("Sum per File")
+        self.accumulate_box.addItem("Sum of All Frames")
+        self.accumulate_box.setCurrentIndex(self.EACH_FRAME)
+
         # Refresh button
         self.refresh_button = QtWidgets.QPushButton("Refresh")
         self.refresh_button.setFixedSize(140, 30)
@@ -176,7 +235,12 @@ class XESWindow(Window):
         self.mlayout.addWidget(self.sc, 2, 2, 1, 2, AlignFlag.AlignCenter)
         self.mlayout.addWidget(load_xes_button, 0, 0, AlignFlag.AlignLeft)
         self.mlayout.addWidget(self.colour_box, 0, 1, AlignFlag.AlignLeft)
-        self.mlayout.addWidget(self.custom_col_button, 0, 2, AlignFlag.AlignLeft)
+        top_layout = QtWidgets.QHBoxLayout()
+        top_layout.addWidget(self.custom_col_button)
+        top_layout.addWidget(load_events_button)
+        top_layout.addStretch()
+        top_layout.addWidget(self.accumulate_box)
+        self.mlayout.addLayout(top_layout, 0, 2)
         self.mlayout.addWidget(self.emap_combo, 0, 3, AlignFlag.AlignRight)
         self.mlayout.addWidget(self.refresh_button, 1, 0, AlignFlag.AlignLeft)
         self.mlayout.addWidget(self.stack_type_box, 1, 1, AlignFlag.AlignLeft)
@@ -202,22 +266,32 @@ class XESWindow(Window):
             if confirm:
                 if hasattr(self.parent, "childWindow"):
                     self.parent.childWindow = None
+                self.watch_button.setChecked(False)
                 event.accept()
             else:
                 event.ignore()
         else:
+            self.watch_button.setChecked(False)
             event.accept()
 
-    # loads XES data (currently only able to load from TIF files)
-    def loadXES(self):
+    # gets the selected energy map (or the parent's), None if there isn't one
+    def selectedEmap(self):
         if len(self.emaps):
             self.emap = self.emaps[self.emap_combo.currentIndex() // 2]
         elif self.emap is None:
             try:
                 self.emap = self.parent.emap
             except Exception:
-                self.error = ErrorWindow("XESemap")
-                return
+                self.emap = None
+        if self.emap is None:
+            self.error = ErrorWindow("XESemap")
+        return self.emap
+
+    # loads XES data (currently only able to load from TIF files)
+    @profiled(operation=True)
+    def loadXES(self):
+        if self.selectedEmap() is None:
+            return
 
         dtype = self.loadType()
         if dtype == "tif":
@@ -233,13 +307,59 @@ class XESWindow(Window):
         emap = self.emap
         # gets all XES spectra.
         scanset = []
-        data = calcDataForSpectra(emap)
+        data = calcDataForSpectra(emap, frameLayout(dtype))
         hnames = {}
-        if dtype == "h5py":
+        names = None
+        accumulate = self.accumulate_box.currentIndex()
+        cropped = dtype == "h5py"
+
+        # every frame is also added to a sum, projected per crystal once at the end
+        total = None
+        projected = None
+        count = 0
+        crystals = np.zeros((data["crystals"], len(data["energies"])))
+
+        if accumulate != self.EACH_FRAME:
+            # frames are summed as they're loaded, and each sum is projected once
+            names = []
+            LoadWindow = LoadingBarWindow("Loading XES data...", len(self.filenames))
+            for j in self.filenames:
+                if LoadWindow.wasCanceled():
+                    break
+                if dtype == "h5py":
+                    frames, _, _ = LoadH5Data.loadData(
+                        j, box=data["box"], threads=self.processCount()
+                    )
+                else:
+                    frames = [core.Scan.loadFromPath(j).getImg()]
+                # variance and pixel counts are summed too, for error bars
+                total = sumFrames(frames, total, stats=True)
+                count += len(frames)
+                if accumulate == self.SUM_PER_FILE and total is not None:
+                    stats = projectSum(total, data, cropped)
+                    scanset.append(statSpectra(data["energies"], stats))
+                    names.append(j)
+                    crystals += projectCrystals(total[0], data, cropped)
+                    total = None
+                LoadWindow.add()
+                QtWidgets.QApplication.processEvents()
+            if accumulate == self.SUM_ALL and total is not None:
+                stats = projectSum(total, data, cropped)
+                scanset.append(statSpectra(data["energies"], stats))
+                names.append(f"Sum of {count} frames")
+                # new files are added to the sum when the folder is watched
+                projected = stats
+                total = total[0]
+
+        elif dtype == "h5py":
             for l, j in enumerate(self.filenames, 1):
-                images, _, _ = LoadH5Data.loadData(j)
-                temp_scans = [core.Scan(np.swapaxes(img, 0, 1)) for img in images]
+                # only the part of each frame covered by the energy map is read
+                images, _, _ = LoadH5Data.loadData(
+                    j, box=data["box"], threads=self.processCount()
+                )
+                temp_scans = [core.Scan(img) for img in images]
                 hnames[j] = len(temp_scans)
+                total = sumFrames(images, total)
 
                 LoadWindow = LoadingBarWindow(
                     f"Loading XES data... ({l}/{len(self.filenames)})", len(temp_scans)
@@ -247,7 +367,7 @@ class XESWindow(Window):
                 for i in temp_scans:
                     if LoadWindow.wasCanceled():
                         break
-                    spectra = calcSpectra(i, emap, data, dtype)[0]
+                    spectra = calcSpectra(i, emap, data, dtype, cropped=True)[0]
                     scanset.append(spectra)
                     LoadWindow.add()
                     QtWidgets.QApplication.processEvents()
@@ -257,25 +377,247 @@ class XESWindow(Window):
             for i in self.filenames:
                 if LoadWindow.wasCanceled():
                     break
-                spectra = calcSpectra(i, emap, data, dtype)[0]
-                if type(spectra) is list:
-                    hnames[i] = len(spectra)
-                    scanset += spectra
-                else:
-                    scanset.append(spectra)
+                scan = core.Scan.loadFromPath(i)
+                total = sumFrames([scan.getImg()], total)
+                scanset.append(calcSpectra(scan, emap, data, dtype)[0])
                 LoadWindow.add()
                 QtWidgets.QApplication.processEvents()
         LoadWindow.deleteLater()
 
-        if LoadWindow.wasCanceled():
+        if LoadWindow.wasCanceled() or not len(scanset):
             return
 
-        self.checks = QtWidgets.QScrollArea()
-        self.checks.setMinimumWidth(280)
-        self.check_widgets = QtWidgets.QWidget()
-        self.checks_grid = QtWidgets.QGridLayout(self.check_widgets)
+        if total is not None:
+            crystals += projectCrystals(total, data, cropped)
+        self.crystal_spectra = crystals
+        self.crystal_energies = data["energies"]
+        self.crystal_view_button.setDisabled(False)
+
+        if names is None and dtype == "h5py":
+            names = []
+            for i in hnames:
+                names += [i + f"-{j}" for j in range(hnames[i])]
+        self.setWatchSource(data, dtype, accumulate, projected, count)
+        self.setSpectra(scanset, names)
+
+    # loads photon event lists (or files of frames, converted to events) and
+    # bins the events directly, so the cost scales with the number of photons
+    @profiled(operation=True)
+    def loadEvents(self):
+        emap = self.selectedEmap()
+        if emap is None:
+            return
+        self.filenames = LoadEventData.fileDialog(self)
+        if not self.filenames:
+            return
+
+        data = calcDataForSpectra(emap, frameLayout("h5py"))
+        energies = data["energies"]
+        accumulate = self.accumulate_box.currentIndex()
+        scanset = []
+        names = []
+        total = None
+        count = 0
+
+        LoadWindow = LoadingBarWindow("Loading photon events...", len(self.filenames))
+        for j in self.filenames:
+            if LoadWindow.wasCanceled():
+                break
+            try:
+                events = self.readEvents(j, data)
+            except ValueError:
+                LoadWindow.deleteLater()
+                self.error = ErrorWindow("badEvents")
+                return
+            frames = events["frames"]
+            count += frames
+            if accumulate == self.EACH_FRAME:
+                stats = projectEvents(events, data, frames)
+                scanset += [statSpectra(energies, st) for st in stats]
+                names += [j + f"-{i}" for i in range(frames)]
+            else:
+                stats = projectEvents(events, data)
+                if accumulate == self.SUM_PER_FILE:
+                    scanset.append(statSpectra(energies, stats))
+                    names.append(j)
+                else:
+                    total = stats if total is None else total + stats
+            LoadWindow.add()
+            QtWidgets.QApplication.processEvents()
+        if accumulate == self.SUM_ALL and total is not None:
+            scanset.append(statSpectra(energies, total))
+            names.append(f"Sum of {count} frames")
+        LoadWindow.deleteLater()
+
+        if LoadWindow.wasCanceled() or not len(scanset):
+            return
+
+        # events aren't kept per crystal
+        self.crystal_spectra = None
+        self.crystal_view_button.setDisabled(True)
+        self.setWatchSource(data, "events", accumulate, total, count)
+        self.setSpectra(scanset, names)
+
+    # reads the events of a file, converting frames to events if it has none
+    def readEvents(self, path: str, data: dict):
+        events = LoadEventData.loadData(path)
+        if events is not None:
+            return events
+        if path.endswith((".tif", ".tiff")):
+            frames = [core.Scan.loadFromPath(path).getImg()]
+            events = framesToEvents(frames, frameLayout("tif"))
+        else:
+            box = data["box"]
+            frames, _, _ = LoadH5Data.loadData(
+                path, box=box, threads=self.processCount()
+            )
+            events = framesToEvents(frames, frameLayout("h5py"), (box[0], box[2]))
+        events["frames"] = len(frames)
+        return events
+
+    # keeps what new files of the loaded folder are projected with (see watchFolder),
+    # and for SUM_ALL the projected sum (variance and pixels too) and its frame count
+    def setWatchSource(
+        self,
+        data: dict,
+        dtype: str,
+        accumulate: int,
+        total: np.ndarray | None = None,
+        count: int = 0,
+    ):
+        self.watch_button.setChecked(False)
+        self.watch_source = {
+            "data": data,
+            "dtype": dtype,
+            "accumulate": accumulate,
+            "total": total,
+            "count": count,
+        }
+        self.watch_button.setDisabled(False)
+
+    # starts (or stops) watching the folder of the loaded files for new files
+    def watchFolder(self, checked: bool):
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher.deleteLater()
+            self.watcher = None
+        if not checked or self.watch_source is None or not self.filenames:
+            return
+        directory = os.path.dirname(self.filenames[0])
+        suffixes = WATCH_SUFFIXES[self.watch_source["dtype"]]
+        self.watcher = FolderWatcher(directory, suffixes, parent=self)
+        self.watcher.filesReady.connect(self.addFiles)
+
+    # projects only the new files, and appends their spectra
+    # (or adds them to the sum of every frame, if that is what was loaded)
+    @profiled()
+    def addFiles(self, paths: list):
+        data = self.watch_source["data"]
+        dtype = self.watch_source["dtype"]
+        energies = data["energies"]
+        accumulate = self.watch_source["accumulate"]
+        each = accumulate == self.EACH_FRAME
+        total_all = self.watch_source["total"]
+        count = self.watch_source["count"]
+        cropped = dtype == "h5py"
+        scanset = []
+        names = []
+        skipped = []
+        for path in paths:
+            try:
+                if dtype == "events":
+                    events = self.readEvents(path, data)
+                elif dtype == "h5py":
+                    frames, _, _ = LoadH5Data.loadData(
+                        path, box=data["box"], threads=self.processCount()
+                    )
+                else:
+                    frames = [core.Scan.loadFromPath(path).getImg()]
+            except (OSError, KeyError, ValueError):
+                # e.g. still locked by the detector, tried again on a later poll
+                skipped.append(path)
+                continue
+
+            if dtype == "events":
+                if each:
+                    stats = projectEvents(events, data, events["frames"])
+                    scanset += [statSpectra(energies, st) for st in stats]
+                    names += [path + f"-{i}" for i in range(events["frames"])]
+                elif accumulate == self.SUM_ALL:
+                    stats = projectEvents(events, data)
+                    total_all = stats if total_all is None else total_all + stats
+                    count += events["frames"]
+                else:
+                    scanset.append(statSpectra(energies, projectEvents(events, data)))
+                    names.append(path)
+                continue
+
+            total = sumFrames(frames, stats=True)
+            if total is None:
+                continue
+            if accumulate == self.SUM_ALL:
+                # sums project linearly, so the new frames' projection is added
+                stats = projectSum(total, data, cropped)
+                total_all = stats if total_all is None else total_all + stats
+                count += len(frames)
+            elif each and dtype == "h5py":
+                for i, img in enumerate(frames):
+                    scanset.append(statSpectra(energies, projectStats(img, data, True)))
+                    names.append(path + f"-{i}")
+            else:
+                # tif files have one frame, so their sum is the frame
+                scanset.append(statSpectra(energies, projectSum(total, data, cropped)))
+                names.append(path)
+            if self.crystal_spectra is not None:
+                self.crystal_spectra += projectCrystals(total[0], data, cropped)
+
+        if len(skipped):
+            self.skipFiles(skipped)
+        if accumulate == self.SUM_ALL and count > self.watch_source["count"]:
+            self.watch_source["total"] = total_all
+            self.watch_source["count"] = count
+            self.replaceSpectrum(
+                0, statSpectra(energies, total_all), f"Sum of {count} frames"
+            )
+        if len(scanset):
+            self.appendSpectra(scanset, names)
+
+    # replaces the spectrum in a row, keeping its colour and selection
+    def replaceSpectrum(self, row: int, spectrum, name: str):
+        self.store.replace(row, spectrum)
+        s = self.spectra[row]
+        s.spectrum = spectrum
+        s.intensities = spectrum.intensities
+        s.name = name
+        if s.curve is not None:
+            s.curve.setData(s.energies, s.base)
+        self.spectra_model.rowsChanged([row])
+        self.refreshSpectra()
+
+    # adds spectra after the current ones, only making curves for the new ones
+    def appendSpectra(self, scanset: list, names: list):
+        if not hasattr(self, "store"):
+            self.setSpectra(scanset, names)
+            return
+        first = len(self.store)
+        self.store.extend(scanset)
+        new = [
+            Spectrum(self, s, None, first + i, names[i]) for i, s in enumerate(scanset)
+        ]
+        self.spectra += new
+        for s in new:
+            s.curve = pg.PlotDataItem(s.energies, s.base)
+            s.curve.setVisible(False)
+            self.sc.plotItem.addItem(s.curve)
+        self.spectra_model.appendItems(new, self.store.mask)
+        self.shown = np.concatenate((self.shown, np.zeros(len(new), dtype=bool)))
+        self.shown_offsets = np.concatenate((self.shown_offsets, np.zeros(len(new))))
+        # colours are spread over every spectrum again
+        self.colour_key = None
+        self.refreshSpectra()
 
-        # scanset = calcXESSpectra(self.filenames, emap)
+    # shows a new list of spectra (names default to the file names)
+    def setSpectra(self, scanset: list, names: list | None = None):
         scanlen = len(scanset)
         colour_index = self.colour_box.currentIndex()
         if colour_index == 9:
@@ -283,14 +625,10 @@ class XESWindow(Window):
             colours = colourGen(scanlen, None, cols, True)
         else:
             colours = colourGen(scanlen, colour_index)
-        if dtype == "h5py":
-            names = []
-            for i in hnames:
-                n = hnames[i]
-                names += [i + f"-{j}" for j in range(n)]
-
+        self.store = SpectrumStore(scanset)
+        if names is not None:
             self.spectra = [
-                Spectrum(self, scanset[i], colours[i], i + 3, names[i])
+                Spectrum(self, scanset[i], colours[i], i, names[i])
                 for i, _ in enumerate(scanset)
             ]
         else:
@@ -299,28 +637,21 @@ class XESWindow(Window):
                     self,
                     scanset[i],
                     colours[i],
-                    i + 3,
+                    i,
                 )
                 for i, _ in enumerate(scanset)
             ]
 
-        self.disp_spectra = self.spectra.copy()
-
         self.refresh_button.setDisabled(False)
 
-        all_button = QtWidgets.QPushButton()
-        all_button.clicked.connect(self.allSpectra)
-        all_button.setText("All")
-        none_button = QtWidgets.QPushButton()
-        none_button.clicked.connect(self.noSpectra)
-        none_button.setText("None")
-        invert_button = QtWidgets.QPushButton()
-        invert_button.clicked.connect(self.invertSpectra)
-        invert_button.setText("Invert")
-        self.checks_grid.addWidget(all_button, 0, 0, AlignFlag.AlignLeft)
-        self.checks_grid.addWidget(none_button, 0, 1, AlignFlag.AlignLeft)
-        self.checks_grid.addWidget(invert_button, 0, 2, AlignFlag.AlignLeft)
-        self.checks.setWidget(self.check_widgets)
+        # selection list (shares its check states with the store's mask)
+        if self.checks is not None:
+            self.mlayout.removeWidget(self.checks)
+            self.checks.deleteLater()
+        self.spectra_model = SelectionModel(self.spectra, self.store.mask)
+        self.spectra_model.checkedChanged.connect(self.selectionChanged)
+        self.checks = SelectionList(self.spectra_model)
+        self.checks.setMinimumWidth(280)
         self.mlayout.addWidget(
             self.checks, 2, 0, 1, 2, AlignFlag.AlignHCenter | AlignFlag.AlignTop
         )
@@ -329,8 +660,17 @@ class XESWindow(Window):
         self.save_disp_button.setDisabled(False)
         self.save_avg_button.setDisabled(False)
 
+        self.initCurves()
         self.refreshSpectra()
 
+    # opens a window with the summed spectrum of each crystal
+    def showCrystals(self):
+        if self.crystal_spectra is None:
+            return
+        self.crystal_window = CrystalWindow(
+            self.crystal_energies, self.crystal_spectra, self
+        )
+
     # sets colours for custom gradient
     def setCustomColours(self):
         self.ColourSelects = ColourSelect(
@@ -342,53 +682,24 @@ class XESWindow(Window):
         self.stackSpectra()
         self.graphSpectra()
 
-    # selects all spectra
-    def allSpectra(self):
-        for i in self.spectra:
-            i.restack_now = False
-            i.box.setChecked(True)
-            i.restack_now = True
-        self.refreshSpectra()
-
-    # deselects all spectra
-    def noSpectra(self):
-        for i in self.spectra:
-            i.restack_now = False
-            i.box.setChecked(False)
-            i.restack_now = True
+    # refreshes spectra after spectra are selected or deselected in the list
+    def selectionChanged(self, rows):
         self.refreshSpectra()
 
-    # inverts spectra selection
-    def invertSpectra(self):
-        for i in self.spectra:
-            i.restack_now = False
-            if i in self.disp_spectra:
-                i.box.setChecked(False)
-            else:
-                i.box.setChecked(True)
-            i.restack_now = True
-        self.refreshSpectra()
+    # spectra that are currently selected (in the same order as self.spectra)
+    @property
+    def disp_spectra(self):
+        return [s for s, m in zip(self.spectra, self.store.mask) if m]
 
     # calculates the average spectra
     def setAverageSpectra(self):
-        energies = []
-        intensities = []
-        for i, _ in enumerate(self.disp_spectra[0].energies):
-            energies.append(
-                sum(x.energies[i] for x in self.disp_spectra) / len(self.disp_spectra)
-            )
-        for i, _ in enumerate(self.disp_spectra[0].intensities):
-            intensities.append(
-                sum(x.intensities[i] for x in self.disp_spectra)
-                / len(self.disp_spectra)
-            )
-        return (energies, intensities)
+        return self.store.average()
 
     # does the math to find how the spectra should be drawn
     def stackSpectra(self):
         stack_type = self.stack_type_box.currentIndex()
         if stack_type == 2:
-            if not len(self.disp_spectra):
+            if not self.store.mask.any():
                 self.average_spectra = None
             else:
                 self.average_spectra = self.setAverageSpectra()
@@ -399,57 +710,68 @@ class XESWindow(Window):
                 amt = 100
             else:
                 amt = 0
-            for index, s in enumerate(self.disp_spectra):
-                s.current = s.base.copy()
-                for j, _ in enumerate(s.current):
-                    inc = amt * index
-                    s.increaseIntensity(inc, j)
+            self.store.stack(amt)
+
+    # creates one persistent curve per spectrum (and one for the average)
+    def initCurves(self):
+        self.sc.plotItem.clear()
+        for s in self.spectra:
+            s.curve = pg.PlotDataItem(s.energies, s.base)
+            s.curve.setVisible(False)
+            self.sc.plotItem.addItem(s.curve)
+        self.avg_curve = pg.PlotDataItem(pen=pg.mkPen(color="k", width=2))
+        self.avg_curve.setVisible(False)
+        self.sc.plotItem.addItem(self.avg_curve)
+
+        # what is currently drawn, so only changes need to be redrawn
+        self.shown = np.zeros(len(self.store), dtype=bool)
+        self.shown_offsets = np.zeros(len(self.store))
+        self.colour_key = None
+
+    # sets spectrum colours, only when the colour settings have changed
+    def setColours(self):
+        coltype = self.colour_box.currentIndex()
+        cols = (
+            self.custom_colour_one.getRgb(),
+            self.custom_colour_two.getRgb(),
+        )
+        key = (coltype, cols) if coltype == 9 else coltype
+        if key == self.colour_key:
+            return
+        self.colour_key = key
+
+        if coltype == 9:
+            colours = colourGen(len(self.spectra), None, cols, True)
+        else:
+            colours = colourGen(len(self.spectra), coltype)
+        for i, s in enumerate(self.spectra):
+            s.colour = colours[i]
+            s.curve.setPen(pg.mkPen(color=s.colour, width=2))
+        self.spectra_model.rowsChanged(roles=[QtCore.Qt.ItemDataRole.DecorationRole])
 
     # draws the spectra to the figure
+    @profiled()
     def graphSpectra(self):
+        self.setColours()
         if self.average_spectra is not None:
             s = self.average_spectra
-            self.sc.plotItem.clear()
-            self.sc.plotItem.plot(s[0], s[1], pen=pg.mkPen(color="k", width=2))
-
+            self.avg_curve.setData(s[0], s[1])
+            self.avg_curve.setVisible(True)
+            visible = np.zeros(len(self.store), dtype=bool)
         else:
-            coltype = self.colour_box.currentIndex()
-            if coltype == 9:
-                cols = (
-                    self.custom_colour_one.getRgb(),
-                    self.custom_colour_two.getRgb(),
-                )
-                colours = colourGen(len(self.spectra), None, cols, True)
-                for i, s in enumerate(self.spectra):
-                    s.colour = colours[i]
-                    s.editBoxText()
-            else:
-                colours = colourGen(len(self.spectra), coltype)
-                for i, s in enumerate(self.spectra):
-                    s.colour = colours[i]
-                    s.editBoxText()
-            self.sc.plotItem.clear()
-            for i in self.disp_spectra:
-                self.sc.plotItem.plot(
-                    i.energies, i.current, pen=pg.mkPen(color=i.colour, width=2)
-                )
-
-    # disables given spectrum
-    def removeSpectrum(self, spectrum):
-        self.disp_spectra.remove(spectrum)
-        if spectrum.restack_now:
-            self.refreshSpectra()
-
-    # enables given spectrum
-    def addSpectrum(self, spectrum):
-        num = self.spectra.index(spectrum)
-        count = 0
-        for i in range(num):
-            if self.spectra[i] in self.disp_spectra:
-                count += 1
-        self.disp_spectra.insert(count, spectrum)
-        if spectrum.restack_now:
-            self.refreshSpectra()
+            self.avg_curve.setVisible(False)
+            visible = self.store.mask.copy()
+
+        # only curves whose visibility or stacking offset changed are touched.
+        # offsets are applied as a translation, so curve data is never re-sent.
+        for i in np.flatnonzero(visible != self.shown):
+            self.spectra[i].curve.setVisible(visible[i])
+        offsets = self.store.offsets
+        moved = np.flatnonzero(visible & (offsets != self.shown_offsets))
+        for i in moved:
+            self.spectra[i].curve.setPos(0, offsets[i])
+        self.shown_offsets[moved] = offsets[moved]
+        self.shown = visible
 
     # saves given spectra (or all if none are given)
     def saveSpectra(self, spectra=None):
@@ -459,68 +781,36 @@ class XESWindow(Window):
         dialog = QtWidgets.QFileDialog.getSaveFileName(
             self,
             "Save Spectra",
-            filter=("Excel Spreadsheet (*.xlsx)\nSimple Text Layout (*.csv)"),
+            filter=(
+                "Excel Spreadsheet (*.xlsx)\nSimple Text Layout (*.csv)"
+                "\nNeXus HDF5 (*.nxs)"
+            ),
+        )
+        file_type = exportType(dialog[1])
+        if file_type is None:
+            return
+        if file_type == "nxs":
+            saveXESNexus(
+                dialog[0],
+                [s.name for s in spectra],
+                [s.energies for s in spectra],
+                [s.intensities for s in spectra],
+                [s.errors for s in spectra],
+                [s.pixels for s in spectra],
+            )
+            return
+        if file_type == "xlsx":
+            titles = [os.path.splitext(os.path.basename(s.name))[0] for s in spectra]
+        else:
+            titles = [s.name for s in spectra]
+        saveSpectraTable(
+            dialog[0],
+            file_type,
+            titles,
+            ("Emission Energy (eV)", "Counts", "Error", "Pixels"),
+            [(s.energies, s.intensities, s.errors, s.pixels) for s in spectra],
+            widths=(20,),
         )
-        if dialog[1] == "Excel Spreadsheet (*.xlsx)":
-            wb = ExWorkbook()
-            ws = wb.active
-
-            lines = [[] for _, _ in enumerate(spectra[0].energies)]
-            lines.insert(0, [])
-            lines.insert(1, [])
-            for spect in spectra:
-                lines[0].append(spect.name[: spect.name.rfind(".")])
-                lines[0].append("")
-                lines[0].append("")
-                lines[1].append("Emission Energy (eV)")
-                lines[1].append("Counts")
-                lines[1].append("")
-                texts = [
-                    [str(spect.energies[j]), str(spect.intensities[j]), ""]
-                    for j, _ in enumerate(spect.energies)
-                ]
-                for k, item in enumerate(texts):
-                    for l in range(3):
-                        lines[k + 2].append(item[l])
-            for i, line in enumerate(lines, 1):
-                for j, item in enumerate(line, 1):
-                    try:
-                        n = float(item)
-                    except Exception:
-                        n = item
-                    ws.cell(i, j).value = n
-            for i in range(int(len(lines[0]) / 3)):
-                ws.merge_cells(
-                    start_row=1,
-                    end_row=1,
-                    start_column=i * 3 + 1,
-                    end_column=i * 3 + 2,
-                )
-                ws.column_dimensions[getColumnLetter(i * 3 + 1)].width = 20
-            wb.save(dialog[0])
-            wb.close()
-
-        elif dialog[1] == "Simple Text Layout (*.csv)":
-            direct = open(dialog[0], "+w")
-            direct.seek(0)
-            direct.truncate()
-            lines = ["" for _, _ in enumerate(spectra[0].energies)]
-            lines.insert(0, "")
-            lines.insert(1, "")
-            for spect in spectra:
-                lines[0] += spect.name + ",,,"
-                lines[1] += "Emission Energy (eV),Counts,,"
-                texts = [
-                    str(spect.energies[j]) + "," + str(spect.intensities[j]) + ",,"
-                    for j, _ in enumerate(spect.energies)
-                ]
-                for k, string in enumerate(texts):
-                    lines[k + 2] += string
-            text = ""
-            for line in lines:
-                text += line + "\n"
-            direct.write(text)
-            direct.close()
 
     # runs saveSpectra with all selected
     def saveAllSpectra(self):
@@ -528,7 +818,7 @@ class XESWindow(Window):
 
     # saves enables spectra only
     def saveDispSpectra(self):
-        if not len(self.disp_spectra):
+        if not self.store.mask.any():
             self.error = ErrorWindow("nodispSpec")
             return
         self.saveSpectra(self.disp_spectra)
@@ -542,69 +832,38 @@ class XESWindow(Window):
             return
 
         spec = self.average_spectra
+        errors = self.store.averageErrors()
+        pixels = self.store.pixels[self.store.mask].sum(axis=0)
 
         dialog = QtWidgets.QFileDialog.getSaveFileName(
             self,
             "Save Spectra",
-            filter=("Excel Spreadsheet (*.xlsx)\nSimple Text Layout (*.csv)"),
+            filter=(
+                "Excel Spreadsheet (*.xlsx)\nSimple Text Layout (*.csv)"
+                "\nNeXus HDF5 (*.nxs)"
+            ),
+        )
+        file_type = exportType(dialog[1])
+        if file_type is None:
+            return
+        if file_type == "nxs":
+            saveXESNexus(
+                dialog[0],
+                ["Average Spectra"],
+                [spec[0]],
+                [spec[1]],
+                [errors],
+                [pixels],
+            )
+            return
+        saveSpectraTable(
+            dialog[0],
+            file_type,
+            ["Average Spectra"],
+            ("Emission Energy (eV)", "Counts", "Error", "Pixels"),
+            [(spec[0], spec[1], errors, pixels)],
+            widths=(20,),
         )
-        if dialog[1] == "Excel Spreadsheet (*.xlsx)":
-            wb = ExWorkbook()
-            ws = wb.active
-
-            lines = [[] for _, _ in enumerate(spec[0])]
-            lines.insert(0, [])
-            lines.insert(1, [])
-            lines[0].append("Average Spectra")
-            lines[0].append("")
-            lines[0].append("")
-            lines[1].append("Emission Energy (eV)")
-            lines[1].append("Counts")
-            lines[1].append("")
-            texts = [
-                [str(spec[0][i]), str(spec[1][i]), ""] for i, _ in enumerate(spec[0])
-            ]
-            for k, item in enumerate(texts):
-                for l in range(3):
-                    lines[k + 2].append(item[l])
-            for i, line in enumerate(lines, 1):
-                for j, item in enumerate(line, 1):
-                    try:
-                        n = float(item)
-                    except Exception:
-                        n = item
-                    ws.cell(i, j).value = n
-            for i in range(int(len(lines[0]) / 3)):
-                ws.merge_cells(
-                    start_row=1,
-                    end_row=1,
-                    start_column=i * 3 + 1,
-                    end_column=i * 3 + 2,
-                )
-                ws.column_dimensions[getColumnLetter(i * 3 + 1)].width = 20
-            wb.save(dialog[0])
-            wb.close()
-
-        elif dialog[1] == "Simple Text Layout (*.csv)":
-            direct = open(dialog[0], "+w")
-            direct.seek(0)
-            direct.truncate()
-            lines = ["" for _, _ in enumerate(spec[0])]
-            lines.insert(0, "")
-            lines.insert(1, "")
-            lines[0] += "Average Spectra" + ",,,"
-            lines[1] += "Emission Energy (eV),Counts,,"
-            texts = [
-                str(spec[0][j]) + "," + str(spec[1][j]) + ",,"
-                for j, _ in enumerate(spec[0])
-            ]
-            for k, string in enumerate(texts):
-                lines[k + 2] += string
-            text = ""
-            for line in lines:
-                text += line + "\n"
-            direct.write(text)
-            direct.close()
 
 
 # creates an XES window when file is run
@@ -4,18 +4,25 @@
 
 This file contains functions used for calibration.
 It also contains the energy map calculation function.
+
+scipy and sklearn are only imported when they are first needed,
+so they don't slow down application startup.
 """
 
 from pathlib import Path
 from axeap import core
 from axeap.core import conventions as cnv
-from scipy import interpolate
-from sklearn.cluster import KMeans
 import os
 import numpy as np
 import h5py
+from profileFunctions import profiled
+from SparseFrameClass import SparseFrame
+
+# rows of a frame searched for points at a time, so a search can be aborted mid-frame
+ROW_BLOCK = 64
 
 
+@profiled()
 def loadCalib(file_dir: Path | tuple, run_info: str | None = None):
     """Loads scans from each scan file.
     Assumed that this is only used to load calibration scans.
@@ -61,11 +68,43 @@ def loadCalib(file_dir: Path | tuple, run_info: str | None = None):
     return calib_scans
 
 
+def _blockPoints(block: np.ndarray, cuts: tuple):
+    """nonzero pixels of a block of rows within the cuts (see '_imagePoints')"""
+    keep = np.logical_and(block >= cuts[0], block <= cuts[1])
+    keep &= block != 0
+    first, second = np.nonzero(keep)
+    return first, second, block[first, second]
+
+
+def _imagePoints(img, cuts: tuple, abort=None):
+    """
+    Finds every nonzero pixel of an image within the cuts (a, b), without copying the image.
+    The image is searched ROW_BLOCK rows at a time, and the search stops (with no
+    points) once 'abort' (a :obj:`threading.Event`) is set.
+
+    Returns
+    -------
+    :obj:`list` of first indexes, second indexes and values of the pixels.
+    """
+    img = np.asarray(img)
+    first, second, values = [], [], []
+    for start in range(0, img.shape[0], ROW_BLOCK):
+        if abort is not None and abort.is_set():
+            return [], [], []
+        f, s, v = _blockPoints(img[start : start + ROW_BLOCK], cuts)
+        first += (f + start).tolist()
+        second += s.tolist()
+        values += v.tolist()
+    return first, second, values
+
+
+@profiled()
 def getCoordsFromScans(
-    scans: core.Scan | core.ScanSet | h5py.Dataset,
+    scans: core.Scan | core.ScanSet | h5py.Dataset | SparseFrame,
     reorder: bool = False,
     cuts: tuple = (5, 100),
     dtype: str = None,
+    abort=None,
 ):
     """Gets the coordinates and intensities of points from scan objects.
 
@@ -73,6 +112,8 @@ def getCoordsFromScans(
     ----------
     scans: :obj:`core.Scan` or :obj:`core.ScanSet`
         expects either a core.Scan object or a list of core.Scan objects.
+        A :obj:`SparseFrame` (or an h5py frame) is also accepted, in the
+        layout of 'dtype'.
         the order of the list is the order the coordinates and intensities
         will be returned in.
     reorder: :obj:`bool`
@@ -91,6 +132,9 @@ def getCoordsFromScans(
     cuts: :obj:`tuple`, optional (Default is (5, 100))
         Pair of values (a,b) where any pixel values with
         'intensity < a' or 'intensity > b' are masked (ignored).
+    abort: :obj:`threading.Event`, optional
+        checked between blocks of rows of each frame. Once it is set, the
+        frames left (and the rest of the current frame) give no points.
 
 
     Returns
@@ -101,20 +145,8 @@ def getCoordsFromScans(
         :obj:`list` of arrays (:obj:`np.ndarray`) of coordinates and intensities from scans.
 
     """
-    mask = cuts
     if type(scans) is core.Scan:
-        scan = scans
-        img = scan.img.copy()
-        img[np.logical_or(img < mask[0], img > mask[1])] = 0
-        xval = []
-        yval = []
-        sval = []
-        for x, _ in enumerate(img):
-            for y, _ in enumerate(img[x]):
-                if img[x][y]:
-                    xval.append(x)
-                    yval.append(y)
-                    sval.append(img[x][y])
+        xval, yval, sval = _imagePoints(scans.img, cuts, abort)
         if reorder:
             points = [xval, yval, sval]
         else:
@@ -123,34 +155,24 @@ def getCoordsFromScans(
     elif type(scans) is core.ScanSet:
         points = []
         for scan in scans:
-            img = scan.img.copy()
-            img[np.logical_or(img < mask[0], img > mask[1])] = 0
-            xval = []
-            yval = []
-            sval = []
-            for x, _ in enumerate(img):
-                for y, _ in enumerate(img[x]):
-                    xval.append(x)
-                    yval.append(y)
-                    sval.append(img[x][y])
+            xval, yval, sval = _imagePoints(scan.img, cuts, abort)
             if reorder:
                 points.append([xval, yval, sval])
             else:
                 points.append([(a, b, c) for a, b, c in zip(xval, yval, sval)])
 
-    elif dtype == "h5py":
-        img = scans.copy()
-        img[np.logical_or(img < mask[0], img > mask[1])] = 0
-        xval = []
-        yval = []
-        sval = []
-        for y, _ in enumerate(img):
-            for x, _ in enumerate(img[y]):
-                if img[y][x]:
-                    xval.append(x)
-                    yval.append(y)
-                    sval.append(img[y][x])
+    elif type(scans) is SparseFrame:
+        first, second, sval = scans.points(cuts, abort, ROW_BLOCK)
+        # h5py frames are (y, x)
+        xval, yval = (second, first) if dtype == "h5py" else (first, second)
+        if reorder:
+            points = [xval, yval, sval]
+        else:
+            points = [(a, b, c) for a, b, c in zip(xval, yval, sval)]
 
+    elif dtype == "h5py":
+        # h5py frames are (y, x)
+        yval, xval, sval = _imagePoints(scans, cuts, abort)
         if reorder:
             points = [xval, yval, sval]
         else:
@@ -172,6 +194,7 @@ def getCoordsFromScans(
 
 
 # for each roi: roi = (lox, loy, hix, hiy)
+@profiled()
 def calcEnergyMap(dims: tuple, energies: tuple, points: tuple, rois: tuple):
     """Generates an energy map for a given scanset, in given regions.
 
@@ -204,8 +227,9 @@ def calcEnergyMap(dims: tuple, energies: tuple, points: tuple, rois: tuple):
     returns
     -------
     :obj:`core.EnergyMap`
-        This is the energy map created for the given points.
+        This is the energy map created for the given points, with its 'rois'.
     """
+    from scipy import interpolate
 
     emap = np.full(dims, float(-1))
     # energies = [s.meta["IncidentEnergy"] for s in scanset]
@@ -249,9 +273,13 @@ def calcEnergyMap(dims: tuple, energies: tuple, points: tuple, rois: tuple):
             ):
                 emap[xval][yval] = efunc(yval)
         # print(f"roi {rois.index(roi)+1} has run of {len(rois)} rois.")
-    return core.EnergyMap(emap)
+    emap = core.EnergyMap(emap)
+    # kept so spectra can be split by crystal (see spectraFunctions.crystalLabels)
+    emap.rois = tuple(rois)
+    return emap
 
 
+@profiled()
 def approximateROIs(numcrystals, mincuts, maxcuts, scan, points):
     """
     Approximates the regions of interest (ROIs) for a given scanset.
@@ -266,6 +294,7 @@ def approximateROIs(numcrystals, mincuts, maxcuts, scan, points):
         the maximum cuts (highest value to accept). Generally, anything above 100 is alright for this.
     scan: :obj:`Scan`
         Reference scan used to approximate horizontal regions of interest.
+        A frame (:obj:`np.ndarray` or :obj:`SparseFrame`) is made into a scan.
         NOTE: Any scan can be used from a set of callibration scans.
     points: :obj:`tuple`
         Array of all points, organized as ((x values), (y values), (brightness values)).
@@ -278,6 +307,8 @@ def approximateROIs(numcrystals, mincuts, maxcuts, scan, points):
     s = scan
     if type(s) is np.ndarray:
         s = core.Scan(s)
+    elif type(s) is SparseFrame:
+        s = s.toScan()
     minwidth = s.dims[cnv.X] / 8 / 3
     hrois = core.calcHROIs(
         s.mod(cuts=(mincuts, maxcuts)),
@@ -345,7 +376,10 @@ def approximateROIs(numcrystals, mincuts, maxcuts, scan, points):
     return hrois, vrois
 
 
+@profiled()
 def approxKmeans(points, k: int):
+    from sklearn.cluster import KMeans
+
     vals = []
     allx = []
     ally = []
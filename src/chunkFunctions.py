@@ -0,0 +1,142 @@
+"""
+Direct chunk reading functions.
+
+Compressed h5py frames (e.g. bitshuffle/LZ4 Eiger NeXus data) are usually
+stored as one chunk per frame. Regular h5py reads decompress them one at a
+time, so 'readFrames' instead reads the raw chunks with 'read_direct_chunk'
+and decompresses them in a pool of threads (zlib and bitshuffle release the GIL).
+
+Only uncompressed, deflate (gzip) and bitshuffle/LZ4 chunks of whole frames
+are supported (bitshuffle/LZ4 needs the optional bitshuffle package).
+'chunkDecoder' returns None for anything else, and callers fall back to
+regular reads.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import zlib
+import numpy as np
+import h5py
+
+# HDF5 filter ids
+FILTER_DEFLATE = h5py.h5z.FILTER_DEFLATE
+FILTER_BITSHUFFLE = 32008
+
+# bitshuffle compression option (5th filter value) for LZ4
+BSHUF_LZ4 = 2
+
+# bitshuffle chunks start with the uncompressed size (8 bytes) and block size (4 bytes)
+BSHUF_HEADER = 12
+
+
+def datasetFilters(dset: h5py.Dataset):
+    """(filter id, values) of each filter of a dataset, in order"""
+    plist = dset.id.get_create_plist()
+    filters = []
+    for i in range(plist.get_nfilters()):
+        code, _, values, _ = plist.get_filter(i)
+        filters.append((code, values))
+    return filters
+
+
+def chunkDecoder(dset: h5py.Dataset):
+    """
+    Gets a function decoding the raw chunks of a frame dataset.
+
+    Parameters
+    ----------
+    dset: :obj:`h5py.Dataset`
+        frames dataset, e.g. (frames, 1, y, x).
+
+    Returns
+    -------
+    function (filter mask, raw chunk bytes) -> frame (y, x),
+    or :obj:`None` if the chunks aren't whole frames or a filter is unsupported.
+    """
+    chunks = dset.chunks
+    if chunks is None or dset.ndim < 3:
+        return None
+    shape = dset.shape[-2:]
+    if any(c != 1 for c in chunks[:-2]) or tuple(chunks[-2:]) != shape:
+        return None
+    dtype = dset.dtype
+
+    def raw(data: bytes):
+        return np.frombuffer(data, dtype).reshape(shape)
+
+    filters = datasetFilters(dset)
+    if not len(filters):
+        return lambda mask, data: raw(data)
+    if len(filters) > 1:
+        return None
+
+    code, values = filters[0]
+    if code == FILTER_DEFLATE:
+
+        def decode(mask: int, data: bytes):
+            # a set mask bit means the chunk was stored without the filter
+            return raw(data if mask & 1 else zlib.decompress(data))
+
+        return decode
+
+    if code == FILTER_BITSHUFFLE and len(values) > 4 and values[4] == BSHUF_LZ4:
+        try:
+            import bitshuffle
+        except ImportError:
+            return None
+
+        def decode(mask: int, data: bytes):
+            if mask & 1:
+                return raw(data)
+            block = int.from_bytes(data[8:BSHUF_HEADER], "big") // dtype.itemsize
+            buf = np.frombuffer(data, np.uint8, offset=BSHUF_HEADER)
+            return bitshuffle.decompress_lz4(buf, shape, dtype, block)
+
+        return decode
+
+    return None
+
+
+def readFrames(
+    dset: h5py.Dataset,
+    decode,
+    threads: int,
+    rows: slice = slice(None),
+    cols: slice = slice(None),
+):
+    """
+    Reads every frame of a dataset by direct chunk reads.
+    Chunks are read here and decompressed by a pool of threads.
+
+    Parameters
+    ----------
+    dset: :obj:`h5py.Dataset`
+        frames dataset, e.g. (frames, 1, y, x).
+    decode:
+        created from 'chunkDecoder' function.
+    threads: :obj:`int`
+        number of decompression threads.
+    rows, cols: :obj:`slice`, optional
+        part of each frame kept (e.g. an energy map's bounding box).
+
+    Returns
+    -------
+    :obj:`list` of :obj:`np.ndarray`
+        each frame (y, x), in order.
+    """
+    lead = (0,) * (dset.ndim - 3)
+    cropped = rows != slice(None) or cols != slice(None)
+
+    def frame(chunk: tuple):
+        img = decode(*chunk)
+        if cropped:
+            # keeps only the crop, not the whole decoded frame
+            img = np.ascontiguousarray(img[rows, cols])
+        return img
+
+    with ThreadPoolExecutor(max(threads, 1)) as pool:
+        # chunks are read in order here while earlier ones are decompressed
+        chunks = (
+            dset.id.read_direct_chunk((i,) + lead + (0, 0))
+            for i in range(dset.shape[0])
+        )
+        return list(pool.map(frame, chunks))
@@ -0,0 +1,360 @@
+"""
+Export functions.
+
+This file contains functions used for saving XES and RXES spectra.
+Spectra are given as columns of numbers and streamed to disk in chunks of rows,
+so values stay numeric end to end and large datasets are never held as text.
+Spectra can also be saved as chunked, compressed HDF5 (NeXus) files.
+openpyxl is only imported when an xlsx file is saved.
+"""
+
+import numpy as np
+import h5py
+from profileFunctions import profiled
+
+# number of rows converted and written at a time
+CHUNK_ROWS = 4096
+
+
+def exportType(name_filter: str):
+    """
+    Gets the export type from the name filter chosen in a save file dialog.
+
+    Returns
+    -------
+    "xlsx", "csv", "nxs", or :obj:`None` if the filter is unknown (e.g. dialog was cancelled).
+    """
+    if name_filter.startswith("Excel Spreadsheet"):
+        return "xlsx"
+    elif name_filter.startswith("Simple Text Layout"):
+        return "csv"
+    elif name_filter.startswith("NeXus HDF5"):
+        return "nxs"
+    return None
+
+
+def iterRowChunks(blocks: list, rows: int):
+    """
+    Yields (first row, 2D array) for chunks of rows of all columns of all blocks.
+    Only one chunk is held in memory at a time.
+    """
+    columns = [col for block in blocks for col in block]
+    for start in range(0, rows, CHUNK_ROWS):
+        stop = min(start + CHUNK_ROWS, rows)
+        yield start, np.column_stack([col[start:stop] for col in columns])
+
+
+@profiled()
+def saveSpectraTable(
+    path: str,
+    file_type: str,
+    titles: list,
+    headers: tuple,
+    blocks: list,
+    side: tuple = (),
+    widths: tuple = (),
+    side_width: float = 24,
+):
+    """
+    Saves spectra side by side, one block of columns per spectrum.
+
+    Layout (an empty column follows each block):
+        row 1: title of each block (merged across the block in xlsx files)
+        row 2: column headers of each block
+        row 3+: values
+
+    Parameters
+    ----------
+    path: :obj:`str`
+        file to save to.
+    file_type: :obj:`str`
+        "xlsx" or "csv" (see 'exportType').
+    titles: :obj:`list`
+        title of each block (e.g. spectrum name).
+    headers: :obj:`tuple`
+        header of each column in a block, e.g. ("Emission Energy (eV)", "Counts").
+    blocks: :obj:`list`
+        one tuple of columns (1D arrays, all the same length) per spectrum.
+    side: :obj:`tuple`, optional
+        text placed in an extra first column, one item per row from the top
+        (used for RXES provenance flags).
+    widths: :obj:`tuple`, optional
+        xlsx column widths for each column in a block (None keeps the default).
+    side_width: :obj:`float`, optional
+        xlsx width of the side column.
+    """
+    blocks = [tuple(np.asarray(col) for col in block) for block in blocks]
+    if not len(blocks):
+        raise ValueError("no spectra to save")
+    rows = len(blocks[0][0])
+    if any(len(col) != rows for block in blocks for col in block):
+        raise ValueError("all spectra must have the same number of points")
+
+    if file_type == "xlsx":
+        saveXlsx(path, titles, headers, blocks, rows, side, widths, side_width)
+    elif file_type == "csv":
+        saveCsv(path, titles, headers, blocks, rows, side)
+    else:
+        raise ValueError(f"unknown file type {file_type}, only accepts xlsx or csv")
+
+
+def saveXlsx(path, titles, headers, blocks, rows, side, widths, side_width):
+    """Streams a table to an xlsx file using openpyxl's write-only mode."""
+    from openpyxl import Workbook as ExWorkbook
+    from openpyxl.utils import get_column_letter as getColumnLetter
+
+    ncols = len(headers)
+    step = ncols + 1
+    lead = 1 if len(side) else 0
+
+    wb = ExWorkbook(write_only=True)
+    ws = wb.create_sheet()
+
+    # column widths and merged titles must be set before rows are written
+    if lead:
+        ws.column_dimensions[getColumnLetter(1)].width = side_width
+    for b, _ in enumerate(blocks):
+        first = lead + b * step + 1
+        for j, width in enumerate(widths):
+            if width is not None:
+                ws.column_dimensions[getColumnLetter(first + j)].width = width
+        ws.merged_cells.add(
+            f"{getColumnLetter(first)}1:{getColumnLetter(first + ncols - 1)}1"
+        )
+
+    def sideCell(row):
+        if not lead:
+            return []
+        return [side[row]] if row < len(side) else [None]
+
+    title_row = sideCell(0)
+    header_row = sideCell(1)
+    for title in titles:
+        title_row += [title] + [None] * ncols
+        header_row += list(headers) + [None]
+    ws.append(title_row)
+    ws.append(header_row)
+
+    for start, chunk in iterRowChunks(blocks, rows):
+        for i, values in enumerate(chunk.tolist()):
+            row = sideCell(start + i + 2)
+            for b in range(0, len(values), ncols):
+                row += values[b : b + ncols]
+                row.append(None)
+            ws.append(row)
+
+    wb.save(path)
+    wb.close()
+
+
+def saveCsv(path, titles, headers, blocks, rows, side):
+    """Streams a table to a csv file through a buffered writer."""
+    ncols = len(headers)
+    lead = "," if len(side) else ""
+    block_fmt = ",".join("%s" for _ in range(ncols)) + ",,"
+    fmt = block_fmt * len(blocks)
+
+    def sideCell(row):
+        if not lead:
+            return ""
+        return (side[row] if row < len(side) else "") + ","
+
+    with open(path, "w", buffering=1 << 20) as f:
+        f.write(sideCell(0) + "".join(t + "," * (ncols + 1) for t in titles) + "\n")
+        f.write(sideCell(1) + (",".join(headers) + ",,") * len(blocks) + "\n")
+        for start, chunk in iterRowChunks(blocks, rows):
+            # rows next to side text are written individually, the rest in bulk
+            head = min(max(len(side) - 2 - start, 0), len(chunk)) if lead else 0
+            for i in range(head):
+                f.write(sideCell(start + i + 2) + fmt % tuple(chunk[i]) + "\n")
+            np.savetxt(f, chunk[head:], fmt=lead + fmt)
+
+
+# NeXus names used by LoadH5Data for incident energy and I0
+NX_INCIDENT = "energy"
+NX_I0 = "IpreKB_ds_v1-net_current"
+
+
+def createArray(group, name: str, values):
+    """
+    Creates a dataset in an HDF5 group. Lists of strings are saved as strings,
+    and arrays with more than one value are chunked and gzip compressed.
+    Nothing is created if 'values' is None.
+    """
+    if values is None:
+        return
+    if isinstance(values, list) and len(values) and isinstance(values[0], str):
+        group.create_dataset(name, data=values, dtype=h5py.string_dtype())
+        return
+    values = np.asarray(values)
+    if values.ndim and values.size > 1:
+        group.create_dataset(
+            name,
+            data=values,
+            chunks=True,
+            compression="gzip",
+            compression_opts=4,
+            shuffle=True,
+        )
+    else:
+        group.create_dataset(name, data=values)
+
+
+def writeNexusData(path: str, data: dict, signal: str, axes: list, process: dict):
+    """
+    Writes datasets to an NXentry/NXdata group of a new HDF5 (NeXus) file.
+
+    Arrays with more than one row are chunked and gzip compressed.
+    'process' is stored as attributes of an NXprocess group (processing provenance).
+    """
+    with h5py.File(path, "w") as f:
+        f.attrs["NX_class"] = "NXroot"
+        entry = f.create_group("entry")
+        entry.attrs["NX_class"] = "NXentry"
+        entry.attrs["default"] = "data"
+
+        nxdata = entry.create_group("data")
+        nxdata.attrs["NX_class"] = "NXdata"
+        nxdata.attrs["signal"] = signal
+        nxdata.attrs["axes"] = axes
+        for name, values in data.items():
+            createArray(nxdata, name, values)
+
+        proc = entry.create_group("process")
+        proc.attrs["NX_class"] = "NXprocess"
+        proc.attrs["program"] = "pyAXEAP1"
+        for key, value in process.items():
+            proc.attrs[key] = value
+
+
+def optionalArray(values):
+    """Returns values as a float array, or None if not given."""
+    return None if values is None else np.asarray(values, dtype=float)
+
+
+def commonAxis(rows: list):
+    """Returns rows as one 1D axis if they are all equal, otherwise as a 2D array."""
+    rows = np.asarray(rows, dtype=float)
+    if len(rows) and np.all(rows == rows[0]):
+        return rows[0]
+    return rows
+
+
+@profiled()
+def saveXESNexus(
+    path: str,
+    names: list,
+    energies: list,
+    intensities: list,
+    errors: list | None = None,
+    pixels: list | None = None,
+):
+    """
+    Saves XES spectra to a NeXus file.
+
+    Layout (in /entry/data):
+        emission: emission energies (1D if shared by all spectra)
+        intensity: (n_spectra x n_energies) counts
+        intensity_errors: standard error of each count (if given)
+        pixels: number of pixels with counts in each energy bin (if given)
+        names: name of each spectrum
+    """
+    writeNexusData(
+        path,
+        {
+            "emission": commonAxis(energies),
+            "intensity": np.asarray(intensities, dtype=float),
+            "intensity_errors": optionalArray(errors),
+            "pixels": optionalArray(pixels),
+            "names": list(names),
+        },
+        "intensity",
+        [".", "emission"],
+        {"spectra": "XES"},
+    )
+
+
+@profiled()
+def saveRXESNexus(
+    path: str,
+    incident,
+    emission,
+    intensity,
+    i0=None,
+    flags: dict | None = None,
+    errors=None,
+    pixels=None,
+):
+    """
+    Saves an RXES plane to a NeXus file, using the names LoadH5Data reads.
+
+    Layout (in /entry/data):
+        energy: incident energy of each spectrum
+        emission: emission (or transfer) energies, 2D if they differ per spectrum
+        intensity: (n_incident x n_emission) intensities
+        intensity_errors: standard error of each intensity (if given)
+        pixels: number of pixels with counts in each bin (if given)
+        IpreKB_ds_v1-net_current: I0 of each spectrum (if given)
+
+    'flags' (e.g. {"normalized": True}) are saved as provenance attributes.
+    """
+    process = {"spectra": "RXES"}
+    if flags is not None:
+        process.update(flags)
+    writeNexusData(
+        path,
+        {
+            NX_INCIDENT: np.asarray(incident, dtype=float),
+            "emission": commonAxis(emission),
+            "intensity": np.asarray(intensity, dtype=float),
+            "intensity_errors": optionalArray(errors),
+            "pixels": optionalArray(pixels),
+            NX_I0: optionalArray(i0),
+        },
+        "intensity",
+        [NX_INCIDENT, "emission"],
+        process,
+    )
+
+
+@profiled()
+def saveRXESSession(path: str, datasets: list):
+    """
+    Saves processed RXES datasets so they can be reloaded without reprocessing
+    raw frames (see FileLoad.LoadSessionData).
+
+    Each dataset is saved as its own NXentry group ('dataset_0', 'dataset_1', ...)
+    with its name and enabled state as attributes, and:
+        emission: emission energies
+        intensity: (n_frames x n_energies) spectra
+        variance, pixels: statistics of each spectrum (if every spectrum has them)
+        energy: incident energy of each frame (if known)
+        IpreKB_ds_v1-net_current: I0 of each frame (if known)
+
+    Parameters
+    ----------
+    datasets: :obj:`list`
+        list of :obj:`RXESSpectrumClass.Dataset`.
+    """
+    with h5py.File(path, "w") as f:
+        f.attrs["NX_class"] = "NXroot"
+        f.attrs["session"] = "RXES"
+        for i, d in enumerate(datasets):
+            entry = f.create_group(f"dataset_{i}")
+            entry.attrs["NX_class"] = "NXentry"
+            entry.attrs["name"] = d.name
+            entry.attrs["enabled"] = d.enabled
+            createArray(entry, "emission", np.asarray(d.data[0].energies, dtype=float))
+            createArray(
+                entry,
+                "intensity",
+                np.array([s.intensities for s in d.data], dtype=float),
+            )
+            for name in ("variance", "pixels"):
+                if all(getattr(s, name, None) is not None for s in d.data):
+                    values = [getattr(s, name) for s in d.data]
+                    createArray(entry, name, np.array(values, dtype=float))
+            if d.energy is not None and len(d.energy):
+                createArray(entry, NX_INCIDENT, np.asarray(d.energy, dtype=float))
+            if d.i0 is not None and len(d.i0):
+                createArray(entry, NX_I0, np.asarray(d.i0, dtype=float))
@@ -3,26 +3,27 @@
 
 import axeap.core as core
 import sys
+import multiprocessing
 
 from axeap.core.roi import HROI
 import pathlib
 import numpy as np
 
 from LoadingBarWindow import LoadingBarWindow
+from GetPoints import GetPoints
 from ApproxWindow import ApproxWindow
 from ErrorWindow import ErrorWindow
-from XESWindow import XESWindow
-from RXESWindow import RXESWindow
 from calibFunctions import (
     approximateROIs,
     approxKmeans,
-    getCoordsFromScans,
     calcEnergyMap,
 )
-from CalibFileClass import CalibFile
+from CalibFileClass import CalibFile, CalibTableModel, EnergyDelegate
 from SettingsWindow import SettingsWindow
 from FileLoad import LoadTiffCalib, LoadInfoData, LoadH5Data
 from ExitDialogWindow import exitDialog
+from profileFunctions import profiled, setProfiling, captureListeners
+from DiagnosticsWindow import DiagnosticsWindow, CaptureReportWindow
 
 from PyQt6 import QtCore, QtWidgets, QtGui
 import pyqtgraph as pg
@@ -59,9 +60,23 @@ class MainWindow(QtWidgets.QMainWindow):
         self.childWindow = None
         self.info_file = None
         self.emap_img = None
-        self.calib_grid_scroll = None
+        self.calib_view = None
         self.points = []
         self.spots = []
+        self.old_points = ([], [])
+        self.points_job = None
+        self.points_threads = []
+        self.LoadWindow = None
+        self.points_runinit = False
+
+        # Refresh clicks within this delay only start one job
+        self.points_timer = QtCore.QTimer(self)
+        self.points_timer.setSingleShot(True)
+        self.points_timer.setInterval(200)
+        self.points_timer.timeout.connect(self.startCalibPoints)
+
+        # reports of captured operations are shown in a dialog
+        captureListeners.append(self.showCapture)
 
         # get settings from settings file, or load defaults
         settings = self.getSettings()
@@ -77,6 +92,7 @@ class MainWindow(QtWidgets.QMainWindow):
         else:
             self.confirm_on_close = True
         self.roi_type = settings["roi_type"]
+        setProfiling(settings["profiling"] not in ("False", False))
 
         self.setWindowTitle("pyAXEAP1")
         self.setFixedSize(960, 574)
@@ -126,6 +142,11 @@ class MainWindow(QtWidgets.QMainWindow):
         self.set_button.clicked.connect(lambda: self.openSettings(settings))
         self.set_button.setFixedSize(120, 30)
 
+        # diagnostics button (profiled stage timings)
+        diag_button = QtWidgets.QPushButton("Diagnostics")
+        diag_button.clicked.connect(self.openDiagnostics)
+        diag_button.setFixedSize(120, 30)
+
         # energy map buttons
         emap_area = QtWidgets.QScrollArea()
         emap_area.setFixedSize(286, 170)
@@ -196,6 +217,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.mlayout.addWidget(emap_load_button, 0, 1, AlignFlag.AlignCenter)
         self.mlayout.addWidget(xes_button, 1, 0, AlignFlag.AlignCenter)
         self.mlayout.addWidget(rxes_button, 1, 1, AlignFlag.AlignCenter)
+        self.mlayout.addWidget(diag_button, 0, 2, AlignFlag.AlignLeft)
         self.mlayout.addWidget(self.set_button, 1, 2, AlignFlag.AlignLeft)
         self.mlayout.addWidget(self.mouse_label, 1, 2, AlignFlag.AlignRight)
         self.mlayout.addWidget(
@@ -220,6 +242,11 @@ class MainWindow(QtWidgets.QMainWindow):
                 # closes the child window without a dialog box
                 self.childWindow.no_close_dialog = True
                 self.childWindow.close()
+            if self.points_job is not None:
+                self.points_job.abort()
+            for thread, _ in self.points_threads:
+                thread.quit()
+                thread.wait()
             self.deleteLater()
             event.accept()
         else:
@@ -246,6 +273,14 @@ class MainWindow(QtWidgets.QMainWindow):
         self.SettingsWindow = SettingsWindow(self, settings)
         self.SettingsWindow.finished.connect(self.setSettings)
 
+    # shows the report of a captured operation (see "Profile next operation" setting)
+    def showCapture(self, report: dict):
+        self.CaptureWindow = CaptureReportWindow(report, self)
+
+    # opens the diagnostics window (timings of profiled stages)
+    def openDiagnostics(self):
+        self.DiagnosticsWindow = DiagnosticsWindow(self)
+
     # sets settings after getting them
     def setSettings(self):
         settings = self.SettingsWindow.getSettings()
@@ -259,79 +294,64 @@ class MainWindow(QtWidgets.QMainWindow):
         else:
             self.confirm_on_close = True
         self.roi_type = settings["roi_type"]
+        setProfiling(settings["profiling"] not in ("False", False))
 
     # opens calibration file dialog window, then loads data
+    @profiled(operation=True)
     def openPath(self):
 
+        # calibration frames are kept sparse (only pixels with counts)
         if self.load_data_type == "tif":
             self.calibfiledir = LoadTiffCalib.fileDialog(self)
 
             if self.calibfiledir is not None:
-                self.calibscans = LoadTiffCalib.loadData(self.calibfiledir)
+                self.calibscans = LoadTiffCalib.loadSparse(self.calibfiledir)
             else:
                 return
         elif self.load_data_type == "h5py":
             self.calibfiledir = LoadH5Data.fileDialog(self)
             if self.calibfiledir is not None:
-                images = []
-                energies = []
-                for i in self.calibfiledir:
-                    img, en, _ = LoadH5Data.loadData(i)
-                    images.append(img)
-                    energies += en
-
-                self.calibscans = []
-                for imgs in images:
-                    for img in imgs:
-                        self.calibscans.append(img)
+                self.calibscans, energies = LoadH5Data.loadSparse(self.calibfiledir)
             else:
                 return
 
-        # creates a new scrollable area
-        if self.calib_grid_scroll is not None:
-            self.mlayout.removeWidget(self.calib_grid_scroll)
-        self.calib_grid_scroll = QtWidgets.QScrollArea()
-        self.calib_grid_scroll.setHorizontalScrollBarPolicy(
-            QtCore.Qt.ScrollBarPolicy.ScrollBarAlwaysOff
-        )
-        self.calib_widget = QtWidgets.QWidget()
-        self.calib_grid = QtWidgets.QGridLayout(self.calib_widget)
-        self.calib_grid.setColumnMinimumWidth(1, 10)
-
-        # adds a File Name label above file names
-        filename = QtWidgets.QLabel("File Name")
-        font = filename.font()
-        font.setUnderline(True)
-        filename.setFont(font)
-        self.calib_grid.addWidget(filename, 0, 0, AlignFlag.AlignLeft)
-        del font, filename
-
-        # adds an Energy label above energies
-        energy = QtWidgets.QLabel("Energy")
-        font = energy.font()
-        font.setUnderline(True)
-        energy.setFont(font)
-        self.calib_grid.addWidget(energy, 0, 2, AlignFlag.AlignLeft)
-        del font, energy
-
         if self.load_data_type == "tif":
-            self.calib_energies = [
-                CalibFile(
-                    self, self.calibscans.items[i], c, i + 1, self.calibscans.dims
-                )
+            files = [
+                CalibFile(self, self.calibscans[i], c, i, self.calibscans[i].dims)
                 for i, c in enumerate(self.calibfiledir)
             ]
         elif self.load_data_type == "h5py":
-            self.calib_energies = [
+            # h5py frames are (y, x)
+            files = [
                 CalibFile(
-                    self, c, str(i), i + 1, (len(c[0]), len(c)), energy=energies[i]
+                    self,
+                    c,
+                    str(i),
+                    i,
+                    c.shape[::-1],
+                    energy=energies[i] if i < len(energies) else None,
                 )
                 for i, c in enumerate(self.calibscans)
             ]
 
-        # adds scrollable area to the main window
-        self.calib_grid_scroll.setWidget(self.calib_widget)
-        self.calib_grid_scroll.setFixedWidth(290)
+        # creates a new table of calibration files (names, enabled, and energies)
+        if self.calib_view is not None:
+            self.mlayout.removeWidget(self.calib_view)
+            self.calib_view.deleteLater()
+        self.calib_model = CalibTableModel(files)
+        self.calib_energies = self.calib_model.files
+        self.calib_view = QtWidgets.QTableView()
+        self.calib_view.setModel(self.calib_model)
+        self.calib_view.setItemDelegateForColumn(
+            CalibTableModel.ENERGY, EnergyDelegate(self.calib_view)
+        )
+        self.calib_view.setHorizontalScrollBarPolicy(
+            QtCore.Qt.ScrollBarPolicy.ScrollBarAlwaysOff
+        )
+        self.calib_view.verticalHeader().hide()
+        self.calib_view.horizontalHeader().setStretchLastSection(True)
+        self.calib_view.setColumnWidth(CalibTableModel.NAME, 140)
+        self.calib_view.setFixedWidth(290)
 
         self.getCalibPoints(True)
 
@@ -340,47 +360,104 @@ class MainWindow(QtWidgets.QMainWindow):
         directory = LoadInfoData.fileDialog(self)
         self.info_file = LoadInfoData.loadData(self, directory)
 
-    # gets points from calibration scans
+    # gets points from calibration scans (repeated requests are debounced)
     def getCalibPoints(self, runinit: bool = False):
         minc = self.mincuts.value()
         maxc = self.maxcuts.value()
         if minc > maxc:
             self.error = ErrorWindow("minmaxcuts")
             return
+        # a newer request supersedes the running job
+        if self.points_job is not None:
+            self.points_job.abort()
+        self.points_runinit = self.points_runinit or runinit
+        self.points_timer.start()
+
+    # starts a job getting points from the enabled calibration scans in a thread
+    def startCalibPoints(self):
         enabled_energies = [i for i in self.calib_energies if i.enabled]
+        cuts = (self.mincuts.value(), self.maxcuts.value())
+
+        if self.points_job is not None:
+            self.points_job.abort()
+        if self.LoadWindow is not None:
+            self.LoadWindow.canceled.disconnect()
+            self.LoadWindow.close()
+        self.points = [None] * len(enabled_energies)
+        self.spots = [None] * len(enabled_energies)
+        # jobs are kept with their threads until the threads are done
+        self.points_threads = [t for t in self.points_threads if t[0].isRunning()]
+
+        job = GetPoints(
+            [i.data for i in enabled_energies], cuts=cuts, dtype=self.load_data_type
+        )
+        thread = QtCore.QThread()
+        job.moveToThread(thread)
+        thread.started.connect(job.run)
+        job.finished.connect(thread.quit)
+        job.progress.connect(self.addCalibPoints)
+        job.finished.connect(self.finishCalibPoints)
+        self.points_job = job
+        self.points_threads.append((thread, job))
+
+        self.clearCalibPlot()
+        self.approx_rois.setDisabled(True)
+        self.emap_calc_button.setDisabled(True)
         self.LoadWindow = LoadingBarWindow(
             "Loading calibration data...", len(enabled_energies)
         )
-        old_points = self.points
-        self.points = []
-        old_spots = self.spots
-        self.spots = []
-        for i in enabled_energies:
-            if self.LoadWindow.wasCanceled():
-                self.points = old_points
-                self.spots = old_spots
-                return
-            points, spots = getCoordsFromScans(
-                i.data, reorder=True, cuts=(minc, maxc), dtype=self.load_data_type
-            )
-            self.points.append(points)
-            self.spots.append(spots)
-            self.LoadWindow.add()
-            QtWidgets.QApplication.processEvents()
+        self.LoadWindow.canceled.connect(self.cancelCalibPoints)
+        thread.start()
 
-        if runinit:
-            self.initDrawCalibPoints()
-        else:
+    # adds the points of one scan to the plot as soon as they're calculated
+    def addCalibPoints(self, result: tuple):
+        job = self.sender()
+        if job is None or job is not self.points_job or job.isAborted():
+            return
+        index, points, spots = result
+        self.points[index] = points
+        self.spots[index] = spots
+        self.ax.addPoints(points[0], points[1], size=1, brush=(0, 0, 0, 255))
+        self.LoadWindow.add()
+
+    # runs once a job is done (or aborted), unless a newer job replaced it
+    def finishCalibPoints(self):
+        job = self.sender()
+        if job is None or job is not self.points_job:
+            return
+        self.points_job = None
+        if job.isAborted():
+            return
+        # kept in case the next job is canceled
+        self.old_points = (self.points, self.spots)
+        if self.points_runinit:
+            self.points_runinit = False
+            self.placeCalibView()
+        self.enableCalibButtons()
+
+    # stops the running job and restores the points of the last finished job
+    def cancelCalibPoints(self):
+        self.points_timer.stop()
+        if self.points_job is None:
+            return
+        self.points_job.abort()
+        self.points_job = None
+        self.points, self.spots = self.old_points
+        if self.points_runinit:
+            self.points_runinit = False
+            self.placeCalibView()
+        # points of the canceled job are removed if none were found before
+        if len(self.points):
             self.drawCalibPoints()
+        else:
+            self.clearCalibPlot()
 
-    # runs drawCalibPoints and places file names next to energy input boxes
-    def initDrawCalibPoints(self):
+    # places file names next to energy input boxes
+    def placeCalibView(self):
+        self.mlayout.addWidget(self.calib_view, 3, 0, 1, 2, AlignFlag.AlignLeft)
 
-        self.drawCalibPoints()
-        self.mlayout.addWidget(self.calib_grid_scroll, 3, 0, 1, 2, AlignFlag.AlignLeft)
-
-    # draws calibration points to the main scatter plot grid
-    def drawCalibPoints(self):
+    # removes the calibration points and ROIs from the main scatter plot grid
+    def clearCalibPlot(self):
 
         # deletes existing scatter plot grid
         if self.ax is not None:
@@ -395,11 +472,19 @@ class MainWindow(QtWidgets.QMainWindow):
         self.sc.addItem(self.ax)
         self.sc.setBackground("w")
 
+    # draws calibration points to the main scatter plot grid
+    @profiled()
+    def drawCalibPoints(self):
+
+        self.clearCalibPlot()
         for i in self.points:
             self.ax.addPoints(i[0], i[1], size=1, brush=(0, 0, 0, 255))
         # self.ax.addPoints(spots=self.spots, brush=(0, 0, 0, 255)[0])
 
-        # enables buttons
+        self.enableCalibButtons()
+
+    # enables the buttons that need calibration points
+    def enableCalibButtons(self):
         self.drawn_calib = True
         self.reload_calib.setDisabled(False)
         self.approx_rois.setDisabled(False)
@@ -564,6 +649,7 @@ class MainWindow(QtWidgets.QMainWindow):
         return rois
 
     # organizes data and then calculates an energy map
+    @profiled(operation=True)
     def calcEmap(self):
         # stops if any energy value is not given
         enabled = tuple(i for i in self.calib_energies if i.enabled)
@@ -649,40 +735,42 @@ class MainWindow(QtWidgets.QMainWindow):
         self.drawEmap()
 
     # manages the creation of an XES window
+    # (windows are imported when first opened, so matplotlib etc. don't slow startup)
     def runXES(self):
+        from XESWindow import XESWindow
+
         if type(self.childWindow) is XESWindow:
             self.childWindow.activateWindow()
-        elif type(self.childWindow) is RXESWindow:
+        elif self.childWindow is not None:
             self.childWindow.activateWindow()
             run = exitDialog(self.childWindow)
             if run:
                 self.childWindow.no_close_dialog = True
                 self.childWindow.close()
                 self.childWindow = XESWindow(self)
-        elif self.childWindow is None:
-            self.childWindow = XESWindow(self)
         else:
-            self.error = ErrorWindow()
+            self.childWindow = XESWindow(self)
 
     # manages the creation of an RXES window
     def runRXES(self):
+        from RXESWindow import RXESWindow
+
         if type(self.childWindow) is RXESWindow:
             self.childWindow.activateWindow()
-        elif type(self.childWindow) is XESWindow:
+        elif self.childWindow is not None:
             self.childWindow.activateWindow()
             run = exitDialog(self.childWindow)
             if run:
                 self.childWindow.no_close_dialog = True
                 self.childWindow.close()
                 self.childWindow = RXESWindow(self)
-        elif self.childWindow is None:
-            self.childWindow = RXESWindow(self)
         else:
-            self.error = ErrorWindow()
+            self.childWindow = RXESWindow(self)
 
 
 # creates a MainWindow when file is execcuted
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     app = QtWidgets.QApplication(sys.argv)
     app.setWindowIcon(QtGui.QIcon("icons/spc-logo-nobg.png"))
     W = MainWindow()
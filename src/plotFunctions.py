@@ -0,0 +1,119 @@
+"""
+Plotting functions.
+
+This file contains functions used to prepare RXES planes for plotting.
+Large planes are reduced to a display budget (roughly one cell per pixel)
+before being drawn, so first paint stays fast for very large maps.
+"""
+
+import numpy as np
+
+
+def blockStarts(length: int, blocks: int):
+    """
+    Splits 'length' items into at most 'blocks' nearly equal blocks.
+
+    Returns
+    -------
+    :obj:`np.ndarray`
+        index of the first item of each block (usable with 'ufunc.reduceat').
+    """
+    blocks = max(1, min(int(blocks), length))
+    return np.linspace(0, length, blocks + 1).astype(int)[:-1]
+
+
+def poolGrid(arr, rows: int, cols: int, method: str = "mean"):
+    """
+    Reduces a 2D array to at most (rows, cols) using block pooling.
+
+    Parameters
+    ----------
+    arr: :obj:`np.ndarray`
+        2D array to be reduced.
+    rows, cols: :obj:`int`
+        maximum size of the returned array.
+    method: :obj:`str`, optional (Default is "mean")
+        "mean" averages each block, "max" keeps the largest value of each block.
+        Max pooling keeps narrow peaks visible when zoomed out.
+
+    Returns
+    -------
+    :obj:`np.ndarray`
+        pooled array. If 'arr' already fits, it is returned unchanged.
+    """
+    arr = np.asarray(arr, dtype=float)
+    nrows, ncols = arr.shape
+    rstarts = blockStarts(nrows, rows)
+    cstarts = blockStarts(ncols, cols)
+    if len(rstarts) == nrows and len(cstarts) == ncols:
+        return arr
+
+    if method == "max":
+        pooled = np.fmax.reduceat(arr, rstarts, axis=0)
+        return np.fmax.reduceat(pooled, cstarts, axis=1)
+    elif method == "mean":
+        pooled = np.add.reduceat(arr, rstarts, axis=0)
+        pooled = np.add.reduceat(pooled, cstarts, axis=1)
+        rsizes = np.diff(np.append(rstarts, nrows))
+        csizes = np.diff(np.append(cstarts, ncols))
+        return pooled / np.outer(rsizes, csizes)
+    raise ValueError(f"unknown pooling method {method}, only accepts mean or max")
+
+
+def downsampleGrid(x, y, z, rows: int, cols: int, method: str = "mean"):
+    """
+    Reduces an RXES plane (x, y, z) to at most (rows, cols) cells.
+
+    Coordinates are always mean pooled so cells stay centred on their data,
+    intensities ('z') are pooled with 'method' (see 'poolGrid').
+    """
+    return (
+        poolGrid(x, rows, cols, "mean"),
+        poolGrid(y, rows, cols, "mean"),
+        poolGrid(z, rows, cols, method),
+    )
+
+
+def cropGrid(x, y, z, xlim: tuple, ylim: tuple):
+    """
+    Crops an RXES plane to the rows and columns visible within 'xlim' and 'ylim'.
+
+    One extra row and column is kept on each side so the cropped plane
+    still fills the view to its edges.
+
+    Returns
+    -------
+    cropped (x, y, z), or the original arrays if nothing is within the limits.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    inx = np.logical_and(x >= min(xlim), x <= max(xlim))
+    iny = np.logical_and(y >= min(ylim), y <= max(ylim))
+    rows = np.flatnonzero(np.any(inx, axis=1))
+    cols = np.flatnonzero(np.any(iny, axis=0))
+    if not len(rows) or not len(cols):
+        return x, y, z
+
+    r0 = max(rows[0] - 1, 0)
+    r1 = min(rows[-1] + 2, x.shape[0])
+    c0 = max(cols[0] - 1, 0)
+    c1 = min(cols[-1] + 2, x.shape[1])
+    return x[r0:r1, c0:c1], y[r0:r1, c0:c1], np.asarray(z)[r0:r1, c0:c1]
+
+
+def displayBudget(ax, limit: int | None = None):
+    """
+    Gets the number of (rows, cols) an RXES plane should be reduced to for
+    the given matplotlib axes.
+
+    Rows of the plane run along the x axis (incident energy) and columns along
+    the y axis (emission energy), so the budget is the axes' width and height
+    in pixels. 'limit' optionally caps both values.
+    """
+    bbox = ax.get_window_extent()
+    rows = max(1, int(bbox.width))
+    cols = max(1, int(bbox.height))
+    if limit is not None:
+        rows = min(rows, limit)
+        cols = min(cols, limit)
+    return rows, cols
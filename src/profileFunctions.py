@@ -0,0 +1,436 @@
+"""
+Profiling functions.
+
+This file contains lightweight instrumentation for the main processing stages
+(loading, calibration, spectra calculation, plotting and export).
+
+Stages are timed with 'stage' (a context manager) or 'profiled' (a decorator).
+Each finished stage records its wall time, CPU time, bytes read and peak
+(traced) memory. Records are kept in memory for the diagnostics window and,
+if a log file is set, appended to it as JSON lines. The log is written once
+per operation (see 'profiled'), so files aren't opened for every stage.
+
+Bytes read come from psutil if it's installed, otherwise from /proc (Linux
+only), so they aren't recorded on Windows without psutil (see 'readBytes').
+
+Profiling is switched on with 'setProfiling' (the "profiling" setting).
+When it is off, stages only check a flag, so they cost almost nothing.
+Peak memory comes from tracemalloc, which slows allocations while profiling
+is on, and is approximate when stages overlap in different threads.
+
+The next top-level operation (calibration or spectra load, see 'profiled')
+can also be captured in full with cProfile or tracemalloc (see 'armCapture').
+"""
+
+import atexit
+from collections import deque
+from functools import wraps
+import io
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+# optional, used for bytes read on systems without /proc (e.g. Windows)
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# JSON lines log of every stage, kept next to settings.ini
+LOG_FILE = "profile_log.jsonl"
+
+# maximum number of records kept in memory
+MAX_RECORDS = 5000
+
+# number of functions (or lines) in capture reports
+CAPTURE_TOP = 30
+
+# what captures can't see, shown with their reports
+CAPTURE_NOTES = {
+    "cpu": (
+        "Only the thread that started the operation is profiled. Work in other "
+        "threads (e.g. calibration point extraction) or worker processes (spectra "
+        "loads with more than one process) shows as waiting, or not at all."
+    ),
+    "memory": "Allocations in worker processes aren't traced.",
+}
+
+_state = {
+    "enabled": False,
+    "log": None,
+    "owns_tracing": False,
+    "capture": None,
+    "process": None,
+}
+_lock = threading.Lock()
+_local = threading.local()
+records = deque(maxlen=MAX_RECORDS)
+# records not yet written to the log file (see 'flushRecords')
+_unwritten = []
+captureListeners = []
+
+
+def setProfiling(enabled: bool, log_path: str | None = LOG_FILE):
+    """
+    Switches profiling on or off.
+
+    Parameters
+    ----------
+    enabled: :obj:`bool`
+        whether stages are recorded.
+    log_path: :obj:`str`, optional
+        JSON lines file records are appended to (:obj:`None` keeps them in memory only).
+    """
+    enabled = bool(enabled)
+    flushRecords()
+    _state["log"] = log_path if enabled else None
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _state["owns_tracing"] = True
+    elif not enabled and _state["owns_tracing"]:
+        tracemalloc.stop()
+        _state["owns_tracing"] = False
+    _state["enabled"] = enabled
+
+
+def isProfiling():
+    return _state["enabled"]
+
+
+def readBytes():
+    """
+    bytes read by this process so far, from psutil if it's installed,
+    otherwise from /proc (Linux). :obj:`None` if neither is available.
+    """
+    if psutil is not None:
+        try:
+            if _state["process"] is None:
+                _state["process"] = psutil.Process()
+            counters = _state["process"].io_counters()
+            # read_chars (Linux) counts the same as /proc's rchar
+            return getattr(counters, "read_chars", counters.read_bytes)
+        except (AttributeError, psutil.Error):
+            pass
+    try:
+        with open("/proc/self/io", "r") as f:
+            for line in f:
+                if line.startswith("rchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+class _Stage:
+    """Measures one stage, see 'stage'."""
+
+    __slots__ = ("name", "start", "cpu", "read", "base", "peak")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        if tracemalloc.is_tracing():
+            self.base, peak = tracemalloc.get_traced_memory()
+            # the outer stage keeps its peak so far before the peak is reset
+            if len(stack):
+                stack[-1].peak = max(stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+        else:
+            self.base = 0
+        self.peak = 0
+        stack.append(self)
+        self.read = readBytes()
+        self.cpu = time.process_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        wall = time.perf_counter() - self.start
+        cpu = time.process_time() - self.cpu
+        read = readBytes()
+        stack = _local.stack
+        stack.pop()
+        peak = self.peak
+        if tracemalloc.is_tracing():
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            if len(stack):
+                stack[-1].peak = max(stack[-1].peak, peak)
+        record = {
+            "stage": self.name,
+            "time": time.time(),
+            "depth": len(stack),
+            "wall": wall,
+            "cpu": cpu,
+            "read_bytes": None if read is None else read - self.read,
+            "peak_memory": max(peak - self.base, 0),
+        }
+        addRecord(record)
+        return False
+
+
+class _NoStage:
+    """Stage used while profiling is off."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_no_stage = _NoStage()
+
+
+def stage(name: str):
+    """
+    Context manager measuring a stage, e.g.
+
+        with stage("calcEnergyMap"):
+            ...
+
+    Does nothing while profiling is off.
+    """
+    if not _state["enabled"]:
+        return _no_stage
+    return _Stage(name)
+
+
+def profiled(name: str | None = None, operation: bool = False):
+    """
+    Decorator measuring every call of a function as a stage (see 'stage').
+
+    'operation' marks top-level actions (e.g. calibrating or loading spectra),
+    which are captured in full when a capture is armed (see 'armCapture').
+    Records are written to the log file when an operation ends.
+    """
+
+    def decorator(func):
+        label = name if name is not None else func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _state["enabled"]:
+                return func(*args, **kwargs)
+            with _Stage(label):
+                return func(*args, **kwargs)
+
+        if not operation:
+            return wrapper
+
+        @wraps(func)
+        def operationWrapper(*args, **kwargs):
+            try:
+                if _state["capture"] is None:
+                    return wrapper(*args, **kwargs)
+                with _Capture(label):
+                    return wrapper(*args, **kwargs)
+            finally:
+                flushRecords()
+
+        return operationWrapper
+
+    return decorator
+
+
+def armCapture(mode: str | None):
+    """
+    Captures the next operation (see 'profiled').
+
+    Parameters
+    ----------
+    mode: :obj:`str`
+        "cpu" profiles with cProfile, "memory" traces allocations with tracemalloc,
+        :obj:`None` cancels an armed capture.
+    """
+    if mode not in (None, "cpu", "memory"):
+        raise ValueError(f"unknown capture mode {mode}, only accepts cpu or memory")
+    _state["capture"] = mode
+
+
+def captureArmed():
+    return _state["capture"]
+
+
+class _Capture:
+    """
+    Captures one operation with cProfile or tracemalloc.
+
+    Writes 'profile_<operation>_<mode>_<time>' files to the current directory
+    (next to settings.ini): a .prof (cpu) or .snapshot (memory) file that
+    can be loaded with pstats/tracemalloc, and a .txt summary.
+    The report is then passed to every function in 'captureListeners'.
+
+    cProfile only profiles the calling thread, so cpu captures leave out work
+    done in other threads and processes (see CAPTURE_NOTES).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.mode = _state["capture"]
+        _state["capture"] = None
+
+    def __enter__(self):
+        if self.mode == "cpu":
+            import cProfile
+
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        else:
+            self.started = not tracemalloc.is_tracing()
+            if self.started:
+                tracemalloc.start(25)
+            tracemalloc.reset_peak()
+        return self
+
+    def __exit__(self, *args):
+        name = self.name.replace(".", "_")
+        base = f"profile_{name}_{self.mode}_{time.strftime('%Y%m%d-%H%M%S')}"
+        if self.mode == "cpu":
+            self.profile.disable()
+            report = cpuReport(self.profile, base)
+        else:
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            if self.started:
+                tracemalloc.stop()
+            report = memoryReport(snapshot, peak, base)
+        report["operation"] = self.name
+        for listener in captureListeners:
+            listener(report)
+        return False
+
+
+def cpuReport(profile, base: str):
+    """writes a cProfile capture and its summary, and returns its report"""
+    import pstats
+
+    files = [os.path.abspath(base + ".prof"), os.path.abspath(base + ".txt")]
+    profile.dump_stats(files[0])
+    text = io.StringIO()
+    text.write(f"Note: {CAPTURE_NOTES['cpu']}\n\n")
+    stats = pstats.Stats(profile, stream=text)
+    stats.sort_stats("cumulative").print_stats(CAPTURE_TOP)
+    with open(files[1], "w") as f:
+        f.write(text.getvalue())
+
+    top = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+    rows = [
+        (f"{func} ({os.path.basename(file)}:{line})", nc, tt, ct)
+        for (file, line, func), (_, nc, tt, ct, _) in top[:CAPTURE_TOP]
+    ]
+    return {
+        "mode": "cpu",
+        "note": CAPTURE_NOTES["cpu"],
+        "files": files,
+        "headers": ("Function", "Calls", "Own Time (s)", "Total Time (s)"),
+        "rows": rows,
+    }
+
+
+def memoryReport(snapshot, peak: int, base: str):
+    """writes a tracemalloc capture and its summary, and returns its report"""
+    files = [os.path.abspath(base + ".snapshot"), os.path.abspath(base + ".txt")]
+    snapshot.dump(files[0])
+    top = snapshot.statistics("lineno")[:CAPTURE_TOP]
+    with open(files[1], "w") as f:
+        f.write(f"Note: {CAPTURE_NOTES['memory']}\n")
+        f.write(f"Peak traced memory: {peak / 1e6:.1f} MB\n\n")
+        for stat in top:
+            f.write(f"{stat}\n")
+
+    rows = [(str(stat.traceback[0]), stat.count, stat.size / 1e6) for stat in top]
+    return {
+        "mode": "memory",
+        "note": CAPTURE_NOTES["memory"],
+        "files": files,
+        "peak_memory": peak,
+        "headers": ("Line", "Blocks", "Size (MB)"),
+        "rows": rows,
+    }
+
+
+def addRecord(record: dict):
+    """keeps a record (logged by 'flushRecords' if a log file is set)"""
+    with _lock:
+        records.append(record)
+        if _state["log"] is not None:
+            _unwritten.append(record)
+        full = len(_unwritten) >= MAX_RECORDS
+    if full:
+        flushRecords()
+
+
+def flushRecords():
+    """appends records that haven't been written yet to the log file"""
+    with _lock:
+        path = _state["log"]
+        if path is None or not len(_unwritten):
+            _unwritten.clear()
+            return
+        lines = "".join(json.dumps(record) + "\n" for record in _unwritten)
+        _unwritten.clear()
+        try:
+            with open(path, "a") as f:
+                f.write(lines)
+        except OSError:
+            pass
+
+
+# stages outside of operations are written when the program exits
+atexit.register(flushRecords)
+
+
+def clearRecords():
+    with _lock:
+        records.clear()
+
+
+def summarizeRecords(items=None):
+    """
+    Totals records by stage.
+
+    Returns
+    -------
+    :obj:`list` of :obj:`dict`
+        one dict per stage (in order of first use) with 'stage', 'calls',
+        'wall', 'cpu', 'read_bytes' (totals) and 'peak_memory' (largest).
+    """
+    if items is None:
+        with _lock:
+            items = list(records)
+    summary = {}
+    for r in items:
+        s = summary.setdefault(
+            r["stage"],
+            {
+                "stage": r["stage"],
+                "calls": 0,
+                "wall": 0.0,
+                "cpu": 0.0,
+                "read_bytes": 0,
+                "peak_memory": 0,
+            },
+        )
+        s["calls"] += 1
+        s["wall"] += r["wall"]
+        s["cpu"] += r["cpu"]
+        s["read_bytes"] += r["read_bytes"] or 0
+        s["peak_memory"] = max(s["peak_memory"], r["peak_memory"])
+    return list(summary.values())
+
+
+def saveRecords(path: str | os.PathLike):
+    """saves every record in memory to a JSON file (and writes the log file)"""
+    flushRecords()
+    with _lock:
+        items = list(records)
+    with open(path, "w") as f:
+        json.dump(items, f, indent=1)
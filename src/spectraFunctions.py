@@ -5,25 +5,77 @@ Spectra functions.
 
 This file contains functions used for calculating XES and RXES spectra.
 XES and RXES spectra are calculated using the same functions.
+
+Each frame is projected with one gather and one bincount over the energy map's
+pixels (see 'projectImage'). h5py data can also be projected by several worker
+processes, each reading its own chunks of frames (see 'spectraPool'), and
+other frames are handed to workers through shared memory (see 'calcFileSpectra').
+
+Only pixels with an energy contribute to spectra, so h5py frames are read
+cropped to the bounding box of those pixels (see 'orientData').
+
+Each pixel is also labelled with its analyzer crystal, so the spectrum of
+every crystal can be projected in the same pass (see 'projectCrystals').
+
+Spectra carry their uncertainty: the same gather also gives the Poisson variance
+(pixel values are photon counts, so the variance of each bin is its total count)
+and the number of contributing pixels of each bin (see 'projectStats').
+
+Photon event lists (x, y, frame, weight) are binned directly through a lookup
+table of the energy map, so their cost scales with the number of photons
+instead of the detector area (see 'projectEvents').
 """
 
 from pathlib import Path
 from axeap import core
 import numpy as np
+import multiprocessing
+import itertools
+from collections import deque
+import h5py
 from FileLoad import LoadH5Data
+from FrameBufferClass import FrameBuffer
+from profileFunctions import profiled
+
+# number of frames read and projected by a worker at a time
+CHUNK_FRAMES = 32
+
+
+def frameLayout(dtype: str | None):
+    """
+    Gets the layout of frames loaded with a data type.
+
+    Returns
+    -------
+    "yx" for h5py frames (indexed [y, x], as stored on disk),
+    otherwise "xy" (indexed [x, y], the same as energy map values).
+    """
+    return "yx" if dtype == "h5py" else "xy"
 
 
-def calcDataForSpectra(emap: core.EnergyMap):
+@profiled()
+def calcDataForSpectra(emap: core.EnergyMap, layout: str = "xy"):
     """
     Simple function for calculating data used in calculating Spectra.
     Useful to have as stand-alone in case these calculations would otherwise
     be done MANY times.
     This function can be skipped when calculating Spectra.
 
+    Parameters
+    ----------
+    emap: :obj:`core.emap.EnergyMap`
+        energy map for calculating spectra.
+    layout: :obj:`str`, optional (Default is "xy")
+        layout of the frames that will be projected (see 'frameLayout').
+        The energy map is oriented to the frames once here, so frames never
+        need to be transposed.
+
     Returns
     -------
     :obj:`dict`
         Contains 'evals','evres','minenergy','maxenergy', 'energies', and 'emap_energies'.
+        Also contains the binning index used by 'projectImage', and the
+        number of 'crystals' with the labelled index used by 'projectCrystals'.
         Designed to be used with 'calcXESSpectra'."""
 
     evals = emap.values
@@ -31,27 +83,412 @@ def calcDataForSpectra(emap: core.EnergyMap):
     minenergy = np.min(evals, initial=1000000, where=evals > 0)
     maxenergy = np.max(evals, initial=0, where=evals > 0)
     energies = np.arange(minenergy, maxenergy + evres, evres)
-    emap_energies = []
-    for x in range(evals.shape[0]):
-        for y in range(evals.shape[1]):
-            energy = evals[x, y]
-            if energy > 0:
-                emap_energies.append(energy)
-    return {
+
+    # pixels with an energy (in the same order as looping over x, then y)
+    xs, ys = np.nonzero(evals > 0)
+    emap_energies = evals[xs, ys]
+
+    # histogram bin of each pixel, the same as np.histogram(range=(min, max))
+    edges = np.linspace(minenergy, maxenergy, len(energies) + 1)
+    bins = np.searchsorted(edges, emap_energies, side="right") - 1
+    bins = np.clip(bins, 0, len(energies) - 1)
+
+    # bin of each pixel in a (crystals + 1, energies) histogram,
+    # pixels without a crystal go to the last row
+    labels = crystalLabels(evals, getattr(emap, "rois", None))[xs, ys]
+    crystals = int(labels.max(initial=-1)) + 1
+    labels[labels < 0] = crystals
+    crystal_bins = labels * len(energies) + bins
+
+    data = {
         "evals": evals,
         "evres": evres,
         "minenergy": minenergy,
         "maxenergy": maxenergy,
         "energies": energies,
         "emap_energies": emap_energies,
+        "bins": bins,
+        "crystals": crystals,
+        "crystal_bins": crystal_bins,
     }
+    return orientData(data, xs, ys, layout)
+
 
+def crystalLabels(evals: np.ndarray, rois: tuple | None = None):
+    """
+    Labels each energy map pixel with its analyzer crystal (ROI).
+
+    Parameters
+    ----------
+    evals: :obj:`np.ndarray`
+        energy map values, indexed [x, y].
+    rois: :obj:`tuple`, optional
+        ROIs the energy map was calculated in, as (low_x, low_y, high_x, high_y).
+        If not known (e.g. a loaded energy map), each run of columns with
+        energies is taken as one crystal.
+
+    Returns
+    -------
+    :obj:`np.ndarray`
+        crystal number of each pixel, -1 for pixels without an energy.
+    """
+    valid = evals > 0
+    labels = np.full(evals.shape, -1)
+    if rois:
+        xs = np.arange(evals.shape[0])[:, np.newaxis]
+        ys = np.arange(evals.shape[1])[np.newaxis, :]
+        for n, (lox, loy, hix, hiy) in enumerate(rois):
+            inside = (lox <= xs) & (xs <= hix) & (loy <= ys) & (ys <= hiy)
+            labels[valid & inside & (labels < 0)] = n
+        return labels
+
+    columns = valid.any(axis=1)
+    starts = columns & ~np.concatenate(([False], columns[:-1]))
+    column_labels = np.where(columns, np.cumsum(starts) - 1, -1)
+    labels[valid] = np.broadcast_to(column_labels[:, np.newaxis], evals.shape)[valid]
+    return labels
+
+
+def orientData(data: dict, xs, ys, layout: str):
+    """
+    Sets the binning index of 'data' for frames of the given layout.
+
+    'rows' and 'cols' are the frame indexes of each energy map pixel (x, y),
+    sorted so frames are read in memory order. 'flat' is the same index into
+    a flattened frame of 'shape'.
+
+    'box' is the bounding box (row start, row stop, col start, col stop) of
+    those pixels in the frame, and 'box_flat' indexes a flattened frame
+    cropped to it (of 'box_shape').
+    """
+    shape = data["evals"].shape
+    if layout == "yx":
+        rows, cols = ys, xs
+        shape = shape[::-1]
+    elif layout == "xy":
+        rows, cols = xs, ys
+    else:
+        raise ValueError(f"unknown frame layout {layout}, only accepts xy or yx")
+
+    order = np.lexsort((cols, rows))
+    data = dict(data)
+    data["layout"] = layout
+    data["shape"] = shape
+    data["rows"] = rows[order]
+    data["cols"] = cols[order]
+    data["bins"] = data["bins"][order]
+    data["crystal_bins"] = data["crystal_bins"][order]
+    data["emap_energies"] = data["emap_energies"][order]
+    data["flat"] = data["rows"] * shape[1] + data["cols"]
+
+    if len(order):
+        rows, cols = data["rows"], data["cols"]
+        box = (int(rows[0]), int(rows[-1]) + 1, int(cols.min()), int(cols.max()) + 1)
+    else:
+        box = (0, 0, 0, 0)
+    data["box"] = box
+    data["box_shape"] = (box[1] - box[0], box[3] - box[2])
+    data["box_flat"] = (data["rows"] - box[0]) * data["box_shape"][1] + (
+        data["cols"] - box[2]
+    )
+    return data
+
+
+def cropSlices(box: tuple, shape: tuple):
+    """row and column slices of a bounding box, clipped to a frame 'shape'"""
+    r1 = min(box[1], shape[0])
+    c1 = min(box[3], shape[1])
+    return slice(min(box[0], r1), r1), slice(min(box[2], c1), c1)
+
+
+def projectImage(img, data: dict, cropped: bool = False):
+    """
+    Projects one image onto the energy bins of an energy map.
+    Pixels outside of the image count as 0.
 
+    Parameters
+    ----------
+    img: :obj:`np.ndarray`
+        2D image, in the layout 'data' was created for (see 'calcDataForSpectra').
+        Frames read straight from h5py files can be projected without transposing.
+    data: :obj:`dict`
+        created from 'calcDataForSpectra' function.
+    cropped: :obj:`bool`, optional
+        whether the image was cropped to data["box"] (see 'orientData').
+
+    Returns
+    -------
+    :obj:`np.ndarray`
+        intensity of each energy in data["energies"].
+    """
+    weights = gatherPixels(img, data, cropped)
+    return np.bincount(data["bins"], weights=weights, minlength=len(data["energies"]))
+
+
+def projectStats(img, data: dict, cropped: bool = False):
+    """
+    Projects one image onto the energy bins of an energy map, along with
+    the statistics of each bin, from the same gathered pixels.
+
+    Parameters
+    ----------
+    img: :obj:`np.ndarray`
+        2D image, the same as for 'projectImage'.
+    data: :obj:`dict`
+        created from 'calcDataForSpectra' function.
+    cropped: :obj:`bool`, optional
+        whether the image was cropped to data["box"] (see 'orientData').
+
+    Returns
+    -------
+    :obj:`np.ndarray`
+        (3, energies) rows: intensity (the same as 'projectImage'), variance
+        (Poisson, so the same as the intensity) and number of pixels with counts.
+    """
+    weights = gatherPixels(img, data, cropped)
+    return binStats(data["bins"], weights, len(data["energies"]))
+
+
+def binStats(bins: np.ndarray, weights: np.ndarray, nbins: int, counts: bool = True):
+    """
+    (3, nbins) sum, variance and count of nonzero 'weights' of each bin.
+    The variance of photon counts (Poisson) is their sum, and the variance
+    of other weights (counts=False) is the sum of their squares.
+    """
+    weights = np.asarray(weights, dtype=float)
+    total = np.bincount(bins, weights=weights, minlength=nbins)
+    if counts:
+        variance = total.copy()
+    else:
+        variance = np.bincount(bins, weights=weights * weights, minlength=nbins)
+    return np.stack(
+        (total, variance, np.bincount(bins, weights=weights != 0, minlength=nbins))
+    )
+
+
+def projectSum(total: np.ndarray, data: dict, cropped: bool = False):
+    """
+    Projects a sum of frames with statistics (see 'sumFrames' with stats=True).
+    Gives the same as adding the 'projectStats' of each frame.
+
+    Returns
+    -------
+    :obj:`np.ndarray`
+        (3, energies) rows: intensity, variance and number of pixels with counts.
+    """
+    return np.stack([projectImage(t, data, cropped) for t in total])
+
+
+def statSpectra(energies: np.ndarray, stats: np.ndarray):
+    """
+    Creates a spectrum from projected statistics (see 'projectStats').
+    The variance and pixel counts are kept as its 'variance' and 'pixels'.
+    """
+    spectrum = core.Spectra(energies, stats[0])
+    spectrum.variance = stats[1]
+    spectrum.pixels = stats[2]
+    return spectrum
+
+
+def eventLUT(data: dict):
+    """
+    Lookup table from flattened frame pixel (of data["shape"]) to energy bin,
+    -1 for pixels without an energy. Made once and kept in 'data'.
+    """
+    lut = data.get("lut")
+    if lut is None:
+        lut = np.full(int(np.prod(data["shape"])), -1, dtype=np.int32)
+        lut[data["flat"]] = data["bins"]
+        data["lut"] = lut
+    return lut
+
+
+def framesToEvents(frames, layout: str = "xy", origin: tuple = (0, 0)):
+    """
+    Converts frames to a photon event list, one event per pixel with counts.
+
+    Parameters
+    ----------
+    frames:
+        iterable of 2D frames.
+    layout: :obj:`str`, optional
+        layout of the frames (see 'frameLayout').
+    origin: :obj:`tuple`, optional
+        (row, col) of each frame's first pixel, for frames cropped to a box.
+
+    Returns
+    -------
+    :obj:`dict`
+        events as "x", "y", "frame" and "weight" arrays (see 'projectEvents'),
+        with "counts" True, as the weights are the pixels' photon counts.
+    """
+    rows, cols, index, weights = [], [], [], []
+    for i, img in enumerate(frames):
+        r, c = np.nonzero(img)
+        rows.append(r + origin[0])
+        cols.append(c + origin[1])
+        index.append(np.full(len(r), i))
+        weights.append(np.asarray(img)[r, c])
+    if not len(rows):
+        rows = cols = index = weights = [np.empty(0, dtype=int)]
+    rows, cols = np.concatenate(rows), np.concatenate(cols)
+    x, y = (cols, rows) if layout == "yx" else (rows, cols)
+    return {
+        "x": x,
+        "y": y,
+        "frame": np.concatenate(index),
+        "weight": np.concatenate(weights).astype(float),
+        "counts": True,
+    }
+
+
+@profiled()
+def projectEvents(events: dict, data: dict, frames: int | None = None):
+    """
+    Projects a photon event list onto the energy bins of an energy map.
+    Events outside of the energy map are left out.
+
+    Converted frames (see 'framesToEvents') give the same statistics as
+    'projectStats'. Events of the same pixel and frame are counted separately.
+
+    Parameters
+    ----------
+    events: :obj:`dict`
+        "x" and "y" detector pixel (indexed like energy map values), "frame"
+        number, and optional "weight" (:obj:`None` counts each event as 1).
+        Weights are only taken as photon counts (Poisson variance) if
+        "counts" is True, otherwise the variance is the sum of squared weights.
+    data: :obj:`dict`
+        created from 'calcDataForSpectra' function (of any layout).
+    frames: :obj:`int`, optional
+        number of frames. If given, each frame is projected separately.
+
+    Returns
+    -------
+    :obj:`np.ndarray`
+        (3, energies) statistics (see 'projectStats'),
+        or (frames, 3, energies) if 'frames' is given.
+    """
+    x = np.asarray(events["x"], dtype=np.int64)
+    y = np.asarray(events["y"], dtype=np.int64)
+    rows, cols = (y, x) if data["layout"] == "yx" else (x, y)
+    shape = data["shape"]
+    inside = (rows >= 0) & (rows < shape[0]) & (cols >= 0) & (cols < shape[1])
+
+    bins = np.full(len(rows), -1, dtype=np.int64)
+    bins[inside] = eventLUT(data)[rows[inside] * shape[1] + cols[inside]]
+    keep = bins >= 0
+    bins = bins[keep]
+    weights = events.get("weight")
+    counts = weights is None or events.get("counts", False)
+    weights = np.ones(len(bins)) if weights is None else np.asarray(weights)[keep]
+
+    nbins = len(data["energies"])
+    if frames is None:
+        return binStats(bins, weights, nbins, counts)
+    index = np.asarray(events["frame"], dtype=np.int64)[keep]
+    valid = (index >= 0) & (index < frames)
+    flat = index[valid] * nbins + bins[valid]
+    stats = binStats(flat, weights[valid], frames * nbins, counts)
+    return stats.reshape(3, frames, nbins).swapaxes(0, 1)
+
+
+def projectCrystals(img, data: dict, cropped: bool = False):
+    """
+    Projects one image onto the energy bins of each analyzer crystal,
+    in one labelled pass (see 'crystalLabels').
+
+    Parameters
+    ----------
+    img: :obj:`np.ndarray`
+        2D image, the same as for 'projectImage'.
+    data: :obj:`dict`
+        created from 'calcDataForSpectra' function.
+    cropped: :obj:`bool`, optional
+        whether the image was cropped to data["box"] (see 'orientData').
+
+    Returns
+    -------
+    :obj:`np.ndarray`
+        (crystals, energies) intensities. Summed over crystals, this is the
+        same as 'projectImage' (unless some pixels are outside every ROI).
+    """
+    weights = gatherPixels(img, data, cropped)
+    nbins = len(data["energies"])
+    counts = np.bincount(
+        data["crystal_bins"], weights=weights, minlength=(data["crystals"] + 1) * nbins
+    )
+    return counts.reshape(-1, nbins)[: data["crystals"]]
+
+
+def gatherPixels(img, data: dict, cropped: bool = False):
+    """value of each energy map pixel in an image (see 'projectImage')"""
+    if cropped:
+        shape, flat = data["box_shape"], data["box_flat"]
+    else:
+        shape, flat = data["shape"], data["flat"]
+    if img.shape == shape and img.flags.c_contiguous:
+        return np.take(img.reshape(-1), flat)
+
+    rows = data["rows"]
+    cols = data["cols"]
+    if cropped:
+        rows = rows - data["box"][0]
+        cols = cols - data["box"][2]
+    if img.shape[0] >= shape[0] and img.shape[1] >= shape[1]:
+        return img[rows, cols]
+    # pixels outside of smaller images count as 0
+    inside = np.logical_and(rows < img.shape[0], cols < img.shape[1])
+    weights = np.zeros(len(rows))
+    weights[inside] = img[rows[inside], cols[inside]]
+    return weights
+
+
+@profiled()
+def sumFrames(frames, total: np.ndarray | None = None, stats: bool = False):
+    """
+    Adds frames to a running sum, one frame at a time.
+
+    Projection is linear, so the spectrum of a sum of frames is the sum of
+    their spectra: summing first means many frames are projected only once.
+
+    Parameters
+    ----------
+    frames:
+        iterable of 2D frames, all the same shape.
+    total: :obj:`np.ndarray`, optional
+        sum so far (added to in place). A new sum is started if not given.
+    stats: :obj:`bool`, optional
+        also sums the variance of frames (their counts, see 'projectStats') and
+        counts their nonzero pixels, giving a (3, y, x) sum to be projected
+        with 'projectSum'.
+
+    Returns
+    -------
+    :obj:`np.ndarray`
+        the sum (float), or 'total' if there were no frames.
+    """
+    for img in frames:
+        if total is None:
+            shape = np.shape(img)
+            total = np.zeros((3,) + shape if stats else shape)
+        if stats:
+            img = np.asarray(img, dtype=float)
+            np.add(total[0], img, out=total[0])
+            total[1] += img
+            total[2] += img != 0
+        else:
+            np.add(total, img, out=total)
+    return total
+
+
+@profiled()
 def calcSpectra(
     file_dir: Path | tuple,
     emap: core.EnergyMap,
     data: dict | None,
     dtype: str | None = None,
+    cropped: bool = False,
 ):
     """
     Calculates spectra for XES and RXES scans using a given energy map.
@@ -66,15 +503,20 @@ def calcSpectra(
         NOTE: is no longer explicitly required, can be :obj:`None` or anything else.
     data: :obj:`tuple`
         has evals, evres, minenergy, maxenergy, energies, and emap_energies.
-        created from 'calcDataForSpectra' function.
+        created from 'calcDataForSpectra' function, with the frame layout of
+        'dtype' (h5py scans are expected as stored, indexed [y, x]).
+    cropped: :obj:`bool`, optional
+        whether scans were cropped to data["box"] (e.g. by 'LoadH5Data.loadData').
+        h5py files loaded from 'file_dir' are always cropped.
 
     Returns
     -------
     :obj:`core.spectra.Spectra`
-    or list of :obj:`core.spectra.Spectra`
+    or list of :obj:`core.spectra.Spectra` (with variance and pixels, see 'statSpectra'),
+    along with the incident energy and i0 arrays of h5py scans (otherwise empty)
     """
-    energy = []
-    i0 = []
+    energy = np.empty(0)
+    i0 = np.empty(0)
 
     if type(file_dir) is core.Scan or type(file_dir) is core.ScanSet:
         scans = file_dir
@@ -89,65 +531,197 @@ def calcSpectra(
                 scans.append(core.Scan.loadFromPath(i))
             scans = core.ScanSet(scans)
     elif dtype == "h5py":
-        images, energy, i0 = LoadH5Data.loadData(file_dir)
-        scans = []
-        for img in images:
-            scans.append(core.Scan(np.swapaxes(img, 0, 1)))
-        scans = core.ScanSet(scans)
+        if data is None:
+            data = calcDataForSpectra(emap, frameLayout(dtype))
+        images, energy, i0 = LoadH5Data.loadData(file_dir, box=data["box"])
+        scans = core.ScanSet([core.Scan(img) for img in images])
+        cropped = True
     else:
         raise TypeError(f"unknown dtype {dtype}, only accepts tif or h5py")
 
     if data is None:
-        data = calcDataForSpectra(emap)
+        data = calcDataForSpectra(emap, frameLayout(dtype))
 
-    evals = data["evals"]
-    evres = data["evres"]  # not currently needed
-    minenergy = data["minenergy"]
-    maxenergy = data["maxenergy"]
     energies = data["energies"]
-    emap_energies = data["emap_energies"]
 
     if type(scans) is core.ScanSet:
         spectra = []
         for i in scans:
-            img = i.getImg()
-            emap_energy_weights = []
-            for x in range(evals.shape[0]):
-                for y in range(evals.shape[1]):
-                    if evals[x, y] > 0:
-                        try:
-                            emap_energy_weights.append(img[x, y])
-                        except IndexError:
-                            emap_energy_weights.append(0)
-            hist_intensities, _ = np.histogram(
-                emap_energies,
-                bins=len(energies),
-                range=(minenergy, maxenergy),
-                weights=emap_energy_weights,
-            )
-            spectvals = np.stack((energies, hist_intensities)).T
-            spectra.append(core.Spectra(spectvals[:, 0], spectvals[:, 1]))
+            stats = projectStats(i.getImg(), data, cropped)
+            spectra.append(statSpectra(energies, stats))
             # The below functions are kept here as reference
             # spectvals = core.spectra.calcSpectra(evals, img, evres)
             # emap.calcSpectra
 
     else:
-        img = scans.getImg()
-        emap_energy_weights = []
-        for x in range(evals.shape[0]):
-            for y in range(evals.shape[1]):
-                if evals[x, y] > 0:
-                    try:
-                        emap_energy_weights.append(img[x, y])
-                    except IndexError:
-                        emap_energy_weights.append(0)
-        hist_intensities, _ = np.histogram(
-            emap_energies,
-            bins=len(energies),
-            range=(minenergy, maxenergy),
-            weights=emap_energy_weights,
-        )
-        spectvals = np.stack((energies, hist_intensities)).T
-        spectra = core.Spectra(spectvals[:, 0], spectvals[:, 1])
+        stats = projectStats(scans.getImg(), data, cropped)
+        spectra = statSpectra(energies, stats)
 
     return spectra, energy, i0
+
+
+# state of each worker process, set once by '_initWorker'
+_worker = {}
+
+
+def _initWorker(data: dict, buffer_info: tuple | None = None):
+    _worker["data"] = data
+    _worker["files"] = {}
+    _worker["scratch"] = None
+    _worker["buffer"] = None
+    if buffer_info is not None:
+        _worker["buffer"] = FrameBuffer.attach(buffer_info)
+
+
+def _projectFrames(task: tuple):
+    """projects frames [start, stop) of an h5py image dataset in a worker"""
+    path, name, start, stop = task
+    files = _worker["files"]
+    if path not in files:
+        files[path] = h5py.File(path, mode="r")
+    dset = files[path][name]
+    data = _worker["data"]
+
+    # only the bounding box of the energy map is read, into a reused scratch
+    # array instead of a new array per chunk
+    rows, cols = cropSlices(data["box"], dset.shape[2:])
+    shape = (stop - start, rows.stop - rows.start, cols.stop - cols.start)
+    scratch = _worker["scratch"]
+    if scratch is None or scratch.shape[1:] != shape[1:] or len(scratch) < shape[0]:
+        scratch = np.empty((max(shape[0], CHUNK_FRAMES),) + shape[1:], dset.dtype)
+        _worker["scratch"] = scratch
+    frames = scratch[: shape[0]]
+    dset.read_direct(frames, source_sel=np.s_[start:stop, 0, rows, cols])
+
+    return np.array([projectStats(f, data, cropped=True) for f in frames])
+
+
+def _projectSlot(slot: int):
+    """projects the frame in a shared frame buffer slot in a worker"""
+    return projectStats(_worker["buffer"].view(slot), _worker["data"])
+
+
+def spectraPool(data: dict, processes: int, buffer: FrameBuffer | None = None):
+    """
+    Creates a pool of worker processes for 'calcH5Spectra' or 'calcFileSpectra'.
+    Each worker gets its own read-only copy of the binning index once,
+    instead of with every chunk of frames.
+
+    Parameters
+    ----------
+    data: :obj:`dict`
+        created from 'calcDataForSpectra' function.
+    processes: :obj:`int`
+        number of worker processes.
+    buffer: :obj:`FrameBuffer`, optional
+        shared frame buffer the workers attach to (needed for 'calcFileSpectra').
+
+    Returns
+    -------
+    :obj:`multiprocessing.pool.Pool`
+        should be closed (or used in a 'with' statement) when done.
+    """
+    keys = (
+        "evals",
+        "energies",
+        "layout",
+        "shape",
+        "rows",
+        "cols",
+        "flat",
+        "bins",
+        "box",
+        "box_shape",
+        "box_flat",
+    )
+    index = {key: data[key] for key in keys}
+    info = None if buffer is None else buffer.info
+    return multiprocessing.Pool(
+        processes, initializer=_initWorker, initargs=(index, info)
+    )
+
+
+def calcH5Spectra(pool, path: str, layout: list, data: dict, chunk: int = CHUNK_FRAMES):
+    """
+    Calculates spectra for all frames of an h5py file using a pool of workers.
+    Workers read their own chunks of frames from the file, so frames are
+    never sent between processes.
+
+    Parameters
+    ----------
+    pool: :obj:`multiprocessing.pool.Pool`
+        created from 'spectraPool' function.
+    path: :obj:`str`
+        h5py file directory.
+    layout: :obj:`list`
+        (image dataset name, number of frames) of each image dataset in the file.
+        created from 'LoadH5Data.loadLayout'.
+    data: :obj:`dict`
+        created from 'calcDataForSpectra' function, with the "yx" layout
+        (also used for the pool).
+    chunk: :obj:`int`, optional
+        number of frames read and projected by a worker at a time.
+
+    Yields
+    ------
+    :obj:`list` of :obj:`core.spectra.Spectra`
+        spectra of each chunk of frames, in frame order.
+    """
+    tasks = [
+        (path, name, start, min(start + chunk, frames))
+        for name, frames in layout
+        for start in range(0, frames, chunk)
+    ]
+    energies = data["energies"]
+    for stats in pool.imap(_projectFrames, tasks):
+        yield [statSpectra(energies, st) for st in stats]
+
+
+def calcFileSpectra(paths: list, data: dict, processes: int, slots: int | None = None):
+    """
+    Calculates spectra for image files (e.g. tif) using worker processes.
+
+    Frames are decoded here into the slots of a shared :obj:`FrameBuffer`, and
+    workers project them straight from shared memory. Only slot numbers are sent
+    to workers, and each slot is reused once its spectrum has been collected.
+
+    Parameters
+    ----------
+    paths: :obj:`list`
+        image file directories, one frame per file.
+    data: :obj:`dict`
+        created from 'calcDataForSpectra' function.
+    processes: :obj:`int`
+        number of worker processes.
+    slots: :obj:`int`, optional
+        number of frames held in shared memory at once (default is 2 per process).
+
+    Yields
+    ------
+    :obj:`core.spectra.Spectra`
+        spectrum of each file, in order.
+    """
+    frames = (core.Scan.loadFromPath(p).getImg() for p in paths)
+    first = next(frames, None)
+    if first is None:
+        return
+    slots = slots if slots is not None else 2 * processes
+    energies = data["energies"]
+
+    with FrameBuffer(slots, first.shape, first.dtype) as buffer:
+        with spectraPool(data, processes, buffer) as pool:
+            pending = deque()
+
+            def collect():
+                slot, result = pending.popleft()
+                stats = result.get()
+                buffer.release(slot)
+                return statSpectra(energies, stats)
+
+            for img in itertools.chain((first,), frames):
+                if not buffer.free:
+                    yield collect()
+                slot = buffer.write(img)
+                pending.append((slot, pool.apply_async(_projectSlot, (slot,))))
+            while pending:
+                yield collect()
@@ -0,0 +1,29 @@
+from CalibFileClass import CalibFile, CalibTableModel
+from PyQt6.QtCore import Qt
+
+
+def test_calib_table():
+    files = [
+        CalibFile(None, None, f"dir/frame_{i}.tif", i, (10, 10)) for i in range(600)
+    ]
+    model = CalibTableModel(files)
+
+    # rows are fetched in batches
+    assert model.rowCount() == CalibTableModel.BATCH
+    while model.canFetchMore():
+        model.fetchMore()
+    assert model.rowCount() == 600
+
+    model.setEnergies([7000 + i for i in range(600)])
+    assert files[599].getVal() == 7599
+
+    index = model.index(3, CalibTableModel.NAME)
+    assert model.data(index) == "frame_3.tif"
+    model.setData(index, Qt.CheckState.Unchecked.value, Qt.ItemDataRole.CheckStateRole)
+    assert not files[3].enabled and files[3].disabled
+
+    index = model.index(4, CalibTableModel.ENERGY)
+    model.setData(index, 7100.5)
+    assert files[4].getVal() == 7100.5
+    files[4].changeVal(7200)
+    assert model.data(index, Qt.ItemDataRole.EditRole) == 7200
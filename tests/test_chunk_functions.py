@@ -0,0 +1,63 @@
+from chunkFunctions import chunkDecoder, readFrames
+import numpy as np
+import h5py
+import pytest
+
+
+def makeFrames():
+    return np.random.default_rng(0).poisson(0.2, (12, 1, 20, 30)).astype("u4")
+
+
+def test_read_frames(tmp_path):
+    """Are deflate and uncompressed frames read the same as regular reads."""
+    frames = makeFrames()
+    with h5py.File(tmp_path / "frames.nx", "w") as f:
+        chunks = (1, 1, 20, 30)
+        f.create_dataset("gzip", data=frames, chunks=chunks, compression="gzip")
+        f.create_dataset("plain", data=frames, chunks=chunks)
+        for name in ("gzip", "plain"):
+            dset = f[name]
+            decode = chunkDecoder(dset)
+            assert decode is not None
+            assert np.array_equal(readFrames(dset, decode, 3), frames[:, 0])
+
+            rows, cols = slice(4, 15), slice(2, 25)
+            cropped = readFrames(dset, decode, 2, rows, cols)
+            assert np.array_equal(cropped, frames[:, 0, rows, cols])
+            assert cropped[0].flags.c_contiguous
+
+
+def test_unsupported_chunks(tmp_path):
+    """Do unsupported layouts or filters fall back to regular reads."""
+    frames = makeFrames()
+    with h5py.File(tmp_path / "frames.nx", "w") as f:
+        f.create_dataset("contiguous", data=frames)
+        f.create_dataset("partial", data=frames, chunks=(1, 1, 10, 30))
+        f.create_dataset(
+            "shuffle", data=frames, chunks=(1, 1, 20, 30), shuffle=True, compression=4
+        )
+        for name in ("contiguous", "partial", "shuffle"):
+            assert chunkDecoder(f[name]) is None
+
+
+def test_read_bitshuffle_frames(tmp_path):
+    """Are bitshuffle/LZ4 frames (e.g. Eiger data) read the same as regular reads."""
+    hdf5plugin = pytest.importorskip("hdf5plugin")
+    pytest.importorskip("bitshuffle")
+    frames = makeFrames()
+    with h5py.File(tmp_path / "frames.nx", "w") as f:
+        # default and explicit block sizes (in elements, stored in bytes)
+        for nelems in (0, 64):
+            dset = f.create_dataset(
+                f"bslz4_{nelems}",
+                data=frames,
+                chunks=(1, 1, 20, 30),
+                **hdf5plugin.Bitshuffle(nelems=nelems, cname="lz4"),
+            )
+            decode = chunkDecoder(dset)
+            assert decode is not None
+            assert np.array_equal(readFrames(dset, decode, 3), dset[:, 0])
+
+            rows, cols = slice(4, 15), slice(2, 25)
+            cropped = readFrames(dset, decode, 2, rows, cols)
+            assert np.array_equal(cropped, dset[:, 0, rows, cols])
@@ -71,6 +71,18 @@ def test_error():
     window.close()
     QApplication.processEvents()
 
+    error = "watchDatasets"
+    window = ErrorWindow(error)
+    assert window.tlabel.text().startswith("New files can only be added")
+    window.close()
+    QApplication.processEvents()
+
+    error = "badEvents"
+    window = ErrorWindow(error)
+    assert window.tlabel.text().startswith("The event lists")
+    window.close()
+    QApplication.processEvents()
+
     window = ErrorWindow()
     assert window.tlabel.text() == "Unknown Error Occurred."
     window.close()
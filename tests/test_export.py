@@ -0,0 +1,141 @@
+from exportFunctions import (
+    exportType,
+    saveSpectraTable,
+    saveRXESNexus,
+    saveRXESSession,
+)
+from FileLoad import LoadSessionData
+from types import SimpleNamespace
+from openpyxl import load_workbook
+import numpy as np
+import h5py
+
+
+def test_export_type():
+    assert exportType("Excel Spreadsheet (*.xlsx)") == "xlsx"
+    assert exportType("Simple Text Layout (*.csv)") == "csv"
+    assert exportType("NeXus HDF5 (*.nxs)") == "nxs"
+    assert exportType("") is None
+
+
+def test_save_spectra_table(tmp_path):
+    energies = np.linspace(7000, 7100, 5000)
+    blocks = [(energies, energies * 0 + i) for i in range(3)]
+    side = ("Normalized: True", "Logged Intensity: False")
+
+    path = tmp_path / "spectra.csv"
+    saveSpectraTable(path, "csv", ["a", "b", "c"], ("E", "C"), blocks, side=side)
+    lines = path.read_text().splitlines()
+    assert len(lines) == 5002
+    assert lines[0] == "Normalized: True,a,,,b,,,c,,,"
+    assert lines[2].startswith(",7000.0,0.0,,7000.0,1.0,,")
+
+    path = tmp_path / "spectra.xlsx"
+    saveSpectraTable(path, "xlsx", ["a", "b", "c"], ("E", "C"), blocks, widths=(20,))
+    ws = load_workbook(path).active
+    assert ws.max_row == 5002
+    assert ws.cell(3, 1).value == 7000
+    assert ws.cell(5002, 5).value == 1
+    assert ws.column_dimensions["A"].width == 20
+
+
+def test_save_rxes_nexus(tmp_path):
+    incident = np.linspace(7100, 7200, 50)
+    emission = [np.linspace(7000, 7100, 300)] * 50
+    intensity = np.random.default_rng(0).random((50, 300))
+    path = tmp_path / "rxes.nxs"
+    saveRXESNexus(
+        path,
+        incident,
+        emission,
+        intensity,
+        np.ones(50),
+        {"Normalized": True},
+        np.sqrt(intensity),
+        np.ones((50, 300)),
+    )
+
+    with h5py.File(path, "r") as f:
+        data = f["entry/data"]
+        assert data.attrs["signal"] == "intensity"
+        assert np.array_equal(data["energy"][()], incident)
+        assert data["emission"].shape == (300,)
+        assert np.array_equal(data["intensity"][()], intensity)
+        assert data["intensity"].compression == "gzip"
+        assert np.allclose(data["intensity_errors"][()], np.sqrt(intensity))
+        assert data["pixels"].shape == (50, 300)
+        assert f["entry/process"].attrs["Normalized"]
+
+
+def test_save_rxes_session(tmp_path):
+    emission = np.linspace(7000, 7100, 200)
+    datasets = [
+        SimpleNamespace(
+            name=f"scan{i}",
+            enabled=bool(i),
+            data=[
+                SimpleNamespace(energies=emission, intensities=np.full(200, j))
+                for j in range(10)
+            ],
+            energy=list(np.linspace(7100, 7110, 10)) if i else None,
+            i0=list(np.ones(10)) if i else None,
+        )
+        for i in range(2)
+    ]
+    path = tmp_path / "session.nxs"
+    saveRXESSession(path, datasets)
+
+    with h5py.File(path, "r") as f:
+        assert sorted(f.keys()) == ["dataset_0", "dataset_1"]
+        assert f["dataset_0"].attrs["name"] == "scan0"
+        assert not f["dataset_0"].attrs["enabled"]
+        assert "energy" not in f["dataset_0"]
+        assert np.array_equal(f["dataset_1/emission"][()], emission)
+        assert f["dataset_1/intensity"].shape == (10, 200)
+        assert f["dataset_1/intensity"][9, 0] == 9
+        assert np.array_equal(f["dataset_1/energy"][()], datasets[1].energy)
+
+
+def test_rxes_session_round_trip(tmp_path):
+    """Are saved sessions loaded back the same, in saved order."""
+    emission = np.linspace(7000, 7100, 50)
+    rng = np.random.default_rng(3)
+    datasets = []
+    # more than 10 datasets, so "dataset_10" must come after "dataset_9"
+    for i in range(12):
+        data = []
+        for j in range(4):
+            s = SimpleNamespace(energies=emission, intensities=rng.random(50) * 100)
+            if i % 3:
+                s.variance = s.intensities.copy()
+                s.pixels = np.full(50, j + 1.0)
+            data.append(s)
+        datasets.append(
+            SimpleNamespace(
+                name=f"scan{i}",
+                enabled=i % 2 == 0,
+                data=data,
+                energy=list(7100 + np.arange(4) + i) if i % 4 else None,
+                i0=list(np.linspace(1, 2, 4) * i) if i % 4 else None,
+            )
+        )
+    path = tmp_path / "session.nxs"
+    saveRXESSession(path, datasets)
+    loaded = LoadSessionData.loadData(path)
+
+    assert [d["name"] for d in loaded] == [d.name for d in datasets]
+    for saved, d in zip(datasets, loaded):
+        assert d["enabled"] == saved.enabled
+        assert np.array_equal(d["emission"], emission)
+        intensity = [s.intensities for s in saved.data]
+        assert np.array_equal(d["intensity"], intensity)
+        if hasattr(saved.data[0], "variance"):
+            assert np.array_equal(d["variance"], [s.variance for s in saved.data])
+            assert np.array_equal(d["pixels"], [s.pixels for s in saved.data])
+        else:
+            assert d["variance"] is None and d["pixels"] is None
+        if saved.energy is None:
+            assert d["energy"] is None and d["i0"] is None
+        else:
+            assert np.array_equal(d["energy"], saved.energy)
+            assert np.array_equal(d["i0"], saved.i0)
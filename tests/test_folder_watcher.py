@@ -0,0 +1,54 @@
+from FolderWatcher import FolderWatcher, MAX_RETRIES
+from PyQt6.QtCore import QCoreApplication
+
+
+def test_folder_watcher(tmp_path):
+    """Are only new, complete files reported, once each."""
+    app = QCoreApplication.instance() or QCoreApplication([])
+    (tmp_path / "old.tif").write_bytes(b"old")
+    watcher = FolderWatcher(str(tmp_path), (".tif",), interval=60000)
+    ready = []
+    watcher.filesReady.connect(ready.extend)
+
+    new = tmp_path / "new.tif"
+    new.write_bytes(b"1")
+    (tmp_path / "notes.txt").write_bytes(b"ignored")
+    watcher.poll()
+    assert ready == []
+
+    # still being written
+    new.write_bytes(b"12")
+    watcher.poll()
+    assert ready == []
+
+    watcher.poll()
+    assert [p[p.rfind("/") + 1 :] for p in ready] == ["new.tif"]
+    watcher.poll()
+    assert len(ready) == 1
+    watcher.stop()
+    app.processEvents()
+
+
+def test_folder_watcher_retry(tmp_path):
+    """Are files given back reported again, a limited number of times."""
+    app = QCoreApplication.instance() or QCoreApplication([])
+    watcher = FolderWatcher(str(tmp_path), (".tif",), interval=60000)
+    ready = []
+    watcher.filesReady.connect(ready.extend)
+
+    (tmp_path / "locked.tif").write_bytes(b"1")
+    watcher.poll()
+    watcher.poll()
+    assert len(ready) == 1
+
+    for _ in range(MAX_RETRIES):
+        assert watcher.retry(ready[-1:]) == []
+        watcher.poll()
+        watcher.poll()
+    assert len(ready) == MAX_RETRIES + 1
+    assert watcher.retry(ready[-1:]) == ready[-1:]
+    watcher.poll()
+    watcher.poll()
+    assert len(ready) == MAX_RETRIES + 1
+    watcher.stop()
+    app.processEvents()
@@ -0,0 +1,37 @@
+from FrameBufferClass import FrameBuffer
+from multiprocessing import Pool
+import numpy as np
+import pytest
+
+
+def readSlot(args):
+    info, slot = args
+    buffer = FrameBuffer.attach(info)
+    total = float(buffer.view(slot).sum())
+    buffer.close()
+    return total
+
+
+def test_frame_buffer_slots():
+    with FrameBuffer(2, (4, 3), np.uint32) as buffer:
+        a = buffer.write(np.ones((4, 3)))
+        b = buffer.write(np.full((4, 3), 2))
+        assert buffer.free == 0
+        assert buffer.view(b).sum() == 24
+        with pytest.raises(IndexError):
+            buffer.acquire()
+
+        # released slots are reused
+        buffer.release(a)
+        assert buffer.write(np.zeros((4, 3))) == a
+        with pytest.raises(ValueError):
+            buffer.write(np.zeros((3, 4)))
+
+
+def test_frame_buffer_shared():
+    frames = np.arange(3 * 5 * 6).reshape(3, 5, 6)
+    with FrameBuffer(3, (5, 6), frames.dtype) as buffer:
+        slots = [buffer.write(f) for f in frames]
+        with Pool(2) as pool:
+            totals = pool.map(readSlot, [(buffer.info, s) for s in slots])
+    assert totals == [float(f.sum()) for f in frames]
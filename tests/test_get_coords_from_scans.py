@@ -54,3 +54,14 @@ def multi_scan_reorder(scans, cuts):
 
     assert len(no_cut) == len(scans)
     assert len(cut) == len(scans)
+
+
+def test_h5py_frame():
+    # h5py frames are (y, x)
+    img = np.zeros((4, 6), dtype=int)
+    img[1, 4] = 10
+    img[3, 2] = 50
+    img[2, 2] = 500
+    points, spots = gCFS(img, reorder=True, cuts=(5, 100), dtype="h5py")
+    assert points == [[4, 2], [1, 3], [10, 50]]
+    assert spots[0] == {"pos": (4, 1), "size": 10}
@@ -1,6 +1,9 @@
 from GetPoints import GetPoints
 from PyQt6.QtCore import pyqtBoundSignal
-from PyQt6.QtCore import QThread
+import calibFunctions
+import numpy as np
+import threading
+import time
 
 
 def test_get_points_init(scans):
@@ -42,3 +45,55 @@ def test_get_points_run(scans):
         continue
     assert points != [] if len(scans) != 0 else points == []
     assert not run
+
+
+def test_get_points_abort():
+    """Does an aborted job skip every scan but still finish."""
+    frames = [np.zeros((4, 6)) for _ in range(3)]
+    emitted = []
+    done = []
+    gp = GetPoints(frames, dtype="h5py", workers=2)
+    gp.progress.connect(emitted.append)
+    gp.finished.connect(lambda: done.append(True))
+
+    gp.abort()
+    gp.run()
+
+    assert gp.isAborted()
+    assert emitted == []
+    assert done == [True]
+
+
+def test_get_points_abort_mid_scan(monkeypatch):
+    """Does aborting while a (slow) scan is searched stop it early."""
+    searched = []
+    started = threading.Event()
+
+    def slowBlock(block, cuts):
+        searched.append(len(block))
+        started.set()
+        time.sleep(0.01)
+        return blockPoints(block, cuts)
+
+    blockPoints = calibFunctions._blockPoints
+    monkeypatch.setattr(calibFunctions, "_blockPoints", slowBlock)
+    monkeypatch.setattr(calibFunctions, "ROW_BLOCK", 1)
+
+    # 1000 rows take 10 s to search unless aborted
+    frame = np.full((1000, 6), 10)
+    emitted = []
+    done = []
+    gp = GetPoints([frame], dtype="h5py", workers=1)
+    gp.progress.connect(emitted.append)
+    gp.finished.connect(lambda: done.append(True))
+
+    job = threading.Thread(target=gp.run)
+    job.start()
+    assert started.wait(5)
+    gp.abort()
+    job.join(5)
+
+    assert not job.is_alive()
+    assert len(searched) < 1000
+    assert emitted == []
+    assert done == [True]
@@ -0,0 +1,93 @@
+import FileLoad
+from FileLoad import LoadH5Data, LoadEventData
+import numpy as np
+import h5py
+import pytest
+import os
+
+
+def makeFile(path):
+    with h5py.File(path, "w") as fd:
+        scan = fd.create_group("entry").create_group("scan")
+        scan.create_dataset(
+            "eiger_image", data=np.ones((3, 1, 4, 5), dtype="u4"), chunks=(1, 1, 4, 5)
+        )
+        scan["energy"] = np.arange(3.0)
+        scan["IpreKB_ds_v1-net_current"] = np.ones(3)
+
+
+def test_layout_index(tmp_path, monkeypatch):
+    """Is the layout indexed once, cached, and redone when the file changes."""
+    monkeypatch.setattr(FileLoad, "LAYOUT_CACHE", str(tmp_path / "cache.json"))
+    monkeypatch.setattr(FileLoad, "_layouts", {})
+    path = str(tmp_path / "data.nx")
+    makeFile(path)
+
+    index = LoadH5Data.getIndex(path)
+    assert index["images"] == [
+        {
+            "path": "/entry/scan/eiger_image",
+            "shape": [3, 1, 4, 5],
+            "dtype": "<u4",
+            "chunks": [1, 1, 4, 5],
+        }
+    ]
+    assert index["energy"] == ["/entry/scan/energy"]
+    assert index["i0"] == ["/entry/scan/IpreKB_ds_v1-net_current"]
+    assert os.path.exists(FileLoad.LAYOUT_CACHE)
+
+    # cached indexes are used without walking the file
+    monkeypatch.setattr(LoadH5Data, "getImages", None)
+    assert LoadH5Data.getIndex(path) == index
+    layout, energy, i0 = LoadH5Data.loadLayout(path)
+    assert layout == [("/entry/scan/eiger_image", 3)]
+    assert list(energy) == [0.0, 1.0, 2.0]
+    points, _, _ = LoadH5Data.loadData(path)
+    assert len(points) == 3 and points[0].shape == (4, 5)
+    points, _, _ = LoadH5Data.loadData(path, box=(1, 3, 2, 9))
+    assert points[0].shape == (2, 3)
+    monkeypatch.undo()
+
+    # a rewritten file is indexed again
+    monkeypatch.setattr(FileLoad, "LAYOUT_CACHE", str(tmp_path / "cache.json"))
+    with h5py.File(path, "a") as fd:
+        del fd["entry/scan/energy"]
+    assert LoadH5Data.getIndex(path)["energy"] == []
+
+
+def test_load_events(tmp_path):
+    """Are event lists found in NeXus and npz files, and frames left alone."""
+    path = str(tmp_path / "events.h5")
+    with h5py.File(path, "w") as fd:
+        events = fd.create_group("entry").create_group("events")
+        events["x"] = [1, 2, 3]
+        events["y"] = [4, 5, 6]
+        events["frame"] = [0, 0, 4]
+    events = LoadEventData.loadData(path)
+    assert events["frames"] == 5
+    assert events["weight"] is None
+    assert list(events["y"]) == [4, 5, 6]
+
+    # motor positions aren't events, but events with mismatched lists are an error
+    path = str(tmp_path / "motors.h5")
+    with h5py.File(path, "w") as fd:
+        fd.create_group("entry").create_group("sample")
+        fd["entry/sample/x"] = [1.0]
+        fd["entry/sample/y"] = [2.0]
+    assert LoadEventData.loadData(path) is None
+    with h5py.File(path, "a") as fd:
+        events = fd["entry"].create_group("events")
+        events["x"] = [1, 2, 3]
+        events["y"] = [4, 5]
+        events["frame"] = [0, 0, 1]
+    with pytest.raises(ValueError):
+        LoadEventData.loadData(path)
+
+    path = str(tmp_path / "events.npz")
+    np.savez(path, x=[1], y=[2], weight=[3.0])
+    events = LoadEventData.loadData(path)
+    assert events["frames"] == 1 and events["weight"][0] == 3.0
+
+    path = str(tmp_path / "data.nx")
+    makeFile(path)
+    assert LoadEventData.loadData(path) is None
@@ -0,0 +1,32 @@
+from plotFunctions import poolGrid, downsampleGrid, cropGrid
+import numpy as np
+
+
+def test_pool_grid():
+    arr = np.arange(20, dtype=float).reshape(4, 5)
+
+    # already fits, returned unchanged
+    assert np.array_equal(poolGrid(arr, 4, 5), arr)
+
+    mean = poolGrid(arr, 2, 5)
+    assert mean.shape == (2, 5)
+    assert np.allclose(mean[0], (arr[0] + arr[1]) / 2)
+
+    peak = poolGrid(arr, 2, 2, "max")
+    assert peak.shape == (2, 2)
+    assert peak[-1, -1] == arr.max()
+
+    # the mean of all blocks is kept when blocks are equal in size
+    assert np.isclose(poolGrid(arr, 2, 1).mean(), arr.mean())
+
+
+def test_downsample_and_crop_grid():
+    inc, em = np.meshgrid(np.arange(100.0), np.arange(7000.0, 7050.0), indexing="ij")
+    z = inc + em
+    x, y, zz = downsampleGrid(inc, em, z, 10, 5)
+    assert x.shape == y.shape == zz.shape == (10, 5)
+    assert np.all(np.diff(x[:, 0]) > 0)
+
+    x, y, zz = cropGrid(inc, em, z, (20, 30), (7010, 7020))
+    assert x.min() == 19 and x.max() == 31
+    assert y.min() == 7009 and y.max() == 7021
@@ -0,0 +1,102 @@
+import profileFunctions as prof
+import numpy as np
+import json
+from types import SimpleNamespace
+
+
+@prof.profiled("allocate")
+def allocate(n):
+    return np.ones(n).sum()
+
+
+def test_profiling_off():
+    prof.setProfiling(False)
+    prof.clearRecords()
+    with prof.stage("outer"):
+        allocate(10)
+    assert not len(prof.records)
+
+
+def test_profiling_on(tmp_path):
+    log = tmp_path / "log.jsonl"
+    prof.setProfiling(True, str(log))
+    prof.clearRecords()
+    try:
+        with prof.stage("outer"):
+            allocate(1_000_000)
+            allocate(10)
+    finally:
+        prof.setProfiling(False)
+
+    inner, _, outer = prof.records
+    assert inner["stage"] == "allocate" and inner["depth"] == 1
+    assert outer["stage"] == "outer" and outer["depth"] == 0
+    assert inner["peak_memory"] >= 8_000_000
+    assert outer["peak_memory"] >= inner["peak_memory"]
+    assert outer["wall"] >= inner["wall"]
+
+    summary = {s["stage"]: s for s in prof.summarizeRecords()}
+    assert summary["allocate"]["calls"] == 2
+    lines = log.read_text().splitlines()
+    assert [json.loads(line)["stage"] for line in lines] == [
+        "allocate",
+        "allocate",
+        "outer",
+    ]
+
+
+@prof.profiled("operation", operation=True)
+def operation(n):
+    return allocate(n)
+
+
+def test_log_per_operation(tmp_path):
+    log = tmp_path / "log.jsonl"
+    prof.setProfiling(True, str(log))
+    prof.clearRecords()
+    try:
+        allocate(10)
+        assert not log.exists()  # written once the operation ends
+        operation(10)
+        assert len(log.read_text().splitlines()) == 3
+        allocate(10)
+        prof.saveRecords(tmp_path / "records.json")
+        assert len(log.read_text().splitlines()) == 4
+    finally:
+        prof.setProfiling(False)
+
+
+def test_capture(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    reports = []
+    prof.captureListeners.append(reports.append)
+    try:
+        prof.armCapture("cpu")
+        operation(1000)
+        operation(1000)  # only the next operation is captured
+        prof.armCapture("memory")
+        operation(1000)
+    finally:
+        prof.captureListeners.remove(reports.append)
+
+    cpu, memory = reports
+    assert cpu["mode"] == "cpu" and cpu["operation"] == "operation"
+    assert any(row[0].startswith("allocate") for row in cpu["rows"])
+    # cProfile only sees the calling thread, which the report says
+    assert "thread" in cpu["note"]
+    assert cpu["note"] in (tmp_path / cpu["files"][1]).read_text()
+    assert memory["mode"] == "memory"
+    for path in cpu["files"] + memory["files"]:
+        assert (tmp_path / path).exists()
+    assert prof.captureArmed() is None
+
+
+def test_read_bytes(monkeypatch):
+    """Are bytes read taken from psutil when it's available."""
+    counters = SimpleNamespace(read_bytes=1234)
+    process = SimpleNamespace(io_counters=lambda: counters)
+    monkeypatch.setattr(prof, "psutil", SimpleNamespace(Error=OSError))
+    monkeypatch.setitem(prof._state, "process", process)
+    assert prof.readBytes() == 1234
+    counters.read_chars = 5678
+    assert prof.readBytes() == 5678
@@ -0,0 +1,34 @@
+from SelectionListClass import SelectionModel
+from PyQt6.QtCore import Qt
+from types import SimpleNamespace
+import numpy as np
+
+
+def test_selection_model():
+    items = [SimpleNamespace(name=f"scan-{i}") for i in range(1000)]
+    mask = np.ones(len(items), dtype=bool)
+    model = SelectionModel(items, mask)
+    assert model.rowCount() == 1000
+
+    changes = []
+    model.checkedChanged.connect(changes.append)
+
+    # bulk changes emit once, and the shared mask is updated in place
+    model.setChecked(np.arange(0, 1000, 2), False)
+    assert len(changes) == 1
+    assert mask.sum() == 500
+
+    index = model.index(0)
+    assert model.data(index) == "scan-0"
+    assert model.data(index, Qt.ItemDataRole.CheckStateRole) == Qt.CheckState.Unchecked
+    model.setData(index, Qt.CheckState.Checked.value, Qt.ItemDataRole.CheckStateRole)
+    assert mask[0]
+
+    model.invert(np.arange(1000))
+    assert mask.sum() == 499
+
+    model.appendItems([SimpleNamespace(name="new")])
+    assert model.rowCount() == 1001
+    assert model.mask[-1]
+    model.removeItem(items[0])
+    assert model.rowCount() == 1000
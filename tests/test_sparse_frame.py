@@ -0,0 +1,44 @@
+from SparseFrameClass import SparseFrame
+from calibFunctions import getCoordsFromScans
+from axeap import core
+import numpy as np
+
+
+def test_sparse_frame():
+    img = np.zeros((40, 30), dtype="u4")
+    img[np.random.default_rng(0).random(img.shape) < 0.05] = 7
+    img[3, 4] = 200
+    frame = SparseFrame.fromDense(img)
+    assert frame.shape == (40, 30)
+    assert frame.nnz == np.count_nonzero(img)
+    assert frame.nbytes < img.nbytes
+    assert np.array_equal(frame.toDense(), img)
+    assert np.array_equal(np.asarray(frame), img)
+
+    # thresholding is the same as on the dense frame
+    first, second, values = frame.points((5, 100))
+    keep = (img >= 5) & (img <= 100)
+    assert (first, second) == tuple(i.tolist() for i in np.nonzero(keep))
+    assert values == img[keep].tolist()
+
+
+def test_sparse_points_match_dense():
+    """Does a SparseFrame give the same points as its dense frame."""
+    img = np.random.default_rng(1).integers(0, 4, (40, 30)) ** 3
+    frame = SparseFrame.fromDense(img)
+    for dtype, dense in ((None, core.Scan(img)), ("h5py", img)):
+        expected = getCoordsFromScans(dense, reorder=True, cuts=(5, 100), dtype=dtype)
+        points = getCoordsFromScans(frame, reorder=True, cuts=(5, 100), dtype=dtype)
+        assert len(points[0][0]) > 0
+        assert points == expected
+
+
+def test_sparse_to_scan():
+    """Does a SparseFrame keep its dims and metadata as a Scan."""
+    img = np.zeros((8, 5), dtype="u4")
+    img[2, 3] = 9
+    frame = SparseFrame.fromDense(img, {"IncidentEnergy": 7000.0}, (8, 5))
+    scan = frame.toScan()
+    assert np.array_equal(scan.img, img)
+    assert tuple(scan.dims) == (8, 5)
+    assert scan.meta["IncidentEnergy"] == 7000.0
@@ -0,0 +1,231 @@
+from spectraFunctions import (
+    calcDataForSpectra,
+    projectImage,
+    spectraPool,
+    calcH5Spectra,
+    frameLayout,
+    cropSlices,
+    sumFrames,
+    crystalLabels,
+    projectCrystals,
+    projectStats,
+    projectSum,
+    framesToEvents,
+    projectEvents,
+    statSpectra,
+)
+from types import SimpleNamespace
+import numpy as np
+import h5py
+
+
+def makeEmap():
+    rng = np.random.default_rng(0)
+    values = rng.uniform(7000, 7100, (40, 30))
+    values[rng.random((40, 30)) < 0.3] = 0
+    return SimpleNamespace(values=values, eres=0.5)
+
+
+def histogramSpectrum(emap, img):
+    """reference projection (the original per-pixel loop)"""
+    evals = emap.values
+    emap_energies = []
+    weights = []
+    for x in range(evals.shape[0]):
+        for y in range(evals.shape[1]):
+            if evals[x, y] > 0:
+                emap_energies.append(evals[x, y])
+                try:
+                    weights.append(img[x, y])
+                except IndexError:
+                    weights.append(0)
+    data = calcDataForSpectra(emap)
+    hist, _ = np.histogram(
+        emap_energies,
+        bins=len(data["energies"]),
+        range=(data["minenergy"], data["maxenergy"]),
+        weights=weights,
+    )
+    return hist
+
+
+def test_project_image():
+    emap = makeEmap()
+    data = calcDataForSpectra(emap)
+    img = np.random.default_rng(1).integers(0, 100, (40, 30))
+    assert np.allclose(projectImage(img, data), histogramSpectrum(emap, img))
+
+    # pixels outside of smaller images count as 0
+    small = img[:25, :20]
+    assert np.allclose(projectImage(small, data), histogramSpectrum(emap, small))
+
+
+def test_frame_layout():
+    emap = makeEmap()
+    xy = calcDataForSpectra(emap, frameLayout("tif"))
+    yx = calcDataForSpectra(emap, frameLayout("h5py"))
+    assert yx["shape"] == (30, 40)
+
+    # h5py frames (y, x) are projected without being transposed
+    frame = np.random.default_rng(3).integers(0, 100, (30, 40))
+    expected = projectImage(np.swapaxes(frame, 0, 1), xy)
+    assert np.allclose(projectImage(frame, yx), expected)
+    assert np.allclose(
+        projectImage(frame[:20, :35], yx), histogramSpectrum(emap, frame[:20, :35].T)
+    )
+
+
+def test_calc_h5_spectra(tmp_path):
+    emap = makeEmap()
+    xy = calcDataForSpectra(emap)
+    data = calcDataForSpectra(emap, "yx")
+    frames = np.random.default_rng(2).integers(0, 100, (70, 1, 30, 40))
+    path = str(tmp_path / "frames.nx")
+    with h5py.File(path, "w") as f:
+        f.create_dataset("entry/eiger_image", data=frames)
+
+    with spectraPool(data, 2) as pool:
+        chunks = list(
+            calcH5Spectra(pool, path, [("/entry/eiger_image", 70)], data, chunk=16)
+        )
+    spectra = [s for chunk in chunks for s in chunk]
+    assert [len(c) for c in chunks] == [16, 16, 16, 16, 6]
+    for frame, spectrum in zip(frames[:, 0], spectra):
+        expected = projectImage(np.swapaxes(frame, 0, 1), xy)
+        assert np.allclose(spectrum.intensities, expected)
+
+
+def test_cropped_frames(tmp_path):
+    """Are frames cropped to the energy map's bounding box projected the same."""
+    emap = makeEmap()
+    emap.values[:5] = 0
+    emap.values[25:] = 0
+    emap.values[:, :8] = 0
+    emap.values[:, 20:] = 0
+    data = calcDataForSpectra(emap, "yx")
+    rows, cols = np.nonzero(emap.values.T > 0)
+    assert data["box"] == (rows.min(), rows.max() + 1, cols.min(), cols.max() + 1)
+
+    frames = np.random.default_rng(4).integers(0, 100, (20, 1, 30, 40))
+    rows, cols = cropSlices(data["box"], frames.shape[2:])
+    for frame in frames[:, 0]:
+        expected = projectImage(frame, data)
+        assert np.allclose(projectImage(frame[rows, cols], data, True), expected)
+
+    # crops of smaller frames are clipped to them
+    rows, cols = cropSlices(data["box"], (15, 40))
+    small = frames[0, 0, :15]
+    assert np.allclose(
+        projectImage(small[rows, cols], data, True), projectImage(small, data)
+    )
+
+    path = str(tmp_path / "frames.nx")
+    with h5py.File(path, "w") as f:
+        f.create_dataset("entry/eiger_image", data=frames)
+    with spectraPool(data, 2) as pool:
+        chunks = list(calcH5Spectra(pool, path, [("/entry/eiger_image", 20)], data))
+    spectra = [s for chunk in chunks for s in chunk]
+    for frame, spectrum in zip(frames[:, 0], spectra):
+        assert np.allclose(spectrum.intensities, projectImage(frame, data))
+
+
+def test_sum_then_project():
+    """Is projecting a sum of frames the same as summing their projections."""
+    emap = makeEmap()
+    data = calcDataForSpectra(emap, "yx")
+    frames = np.random.default_rng(5).integers(0, 2**31, (50, 30, 40), dtype="u4")
+    expected = np.sum([projectImage(f, data) for f in frames], axis=0)
+
+    total = sumFrames(frames[:20])
+    total = sumFrames(iter(frames[20:]), total)
+    assert np.allclose(projectImage(total, data), expected)
+    assert sumFrames([], None) is None
+
+
+def test_project_crystals():
+    """Do per-crystal spectra add up to the combined spectrum."""
+    emap = makeEmap()
+    emap.values[10:14] = 0
+    emap.values[30:] = 0
+    labels = crystalLabels(emap.values)
+    assert set(np.unique(labels)) == {-1, 0, 1}
+    assert np.all(labels[:10][emap.values[:10] > 0] == 0)
+
+    emap.rois = ((0, 0, 9, 29), (14, 0, 19, 29), (20, 0, 29, 29))
+    data = calcDataForSpectra(emap, "yx")
+    assert data["crystals"] == 3
+    frame = np.random.default_rng(6).integers(0, 100, (30, 40))
+    crystals = projectCrystals(frame, data)
+    assert crystals.shape == (3, len(data["energies"]))
+    assert np.allclose(crystals.sum(axis=0), projectImage(frame, data))
+
+    # pixels outside every ROI are left out of the crystals only
+    emap.rois = emap.rois[:2]
+    data = calcDataForSpectra(emap, "yx")
+    crystals = projectCrystals(frame, data)
+    assert crystals.shape[0] == 2
+    assert crystals.sum() < projectImage(frame, data).sum()
+
+
+def test_project_stats():
+    """Are variance and pixel counts accumulated with the intensities."""
+    emap = makeEmap()
+    data = calcDataForSpectra(emap, "yx")
+    frames = np.random.default_rng(7).integers(0, 3, (10, 30, 40))
+    stats = projectStats(frames[0], data)
+    assert np.allclose(stats[0], projectImage(frames[0], data))
+    assert np.allclose(stats[1], stats[0])
+    assert np.allclose(stats[2], projectImage((frames[0] != 0) * 1.0, data))
+
+    # statistics of a sum of frames add up like their spectra
+    expected = np.sum([projectStats(f, data) for f in frames], axis=0)
+    total = sumFrames(frames, stats=True)
+    assert total.shape == (3, 30, 40)
+    assert np.allclose(projectSum(total, data), expected)
+
+
+def test_poisson_errors():
+    """Are errors of counts above 1 the square root of the counts."""
+    emap = makeEmap()
+    data = calcDataForSpectra(emap, "yx")
+    frames = np.random.default_rng(9).integers(2, 20, (4, 30, 40))
+    counts = projectImage(frames.sum(axis=0), data)
+    assert counts.max() > 1
+
+    total = sumFrames(frames, stats=True)
+    spectrum = statSpectra(data["energies"], projectSum(total, data))
+    assert np.allclose(np.sqrt(spectrum.variance), np.sqrt(counts))
+    stats = np.sum([projectStats(f, data) for f in frames], axis=0)
+    assert np.allclose(np.sqrt(stats[1]), np.sqrt(counts))
+
+    # frames converted to events are still counts, weighted events aren't
+    events = framesToEvents(frames.swapaxes(1, 2), "xy")
+    assert np.allclose(projectEvents(events, data)[1], counts)
+    events["counts"] = False
+    squares = projectImage((frames * frames).sum(axis=0), data)
+    assert np.allclose(projectEvents(events, data)[1], squares)
+
+
+def test_project_events():
+    """Do event lists give the same spectra as the frames they came from."""
+    emap = makeEmap()
+    frames = np.random.default_rng(8).poisson(0.05, (6, 40, 30))
+    expected = np.array(
+        [projectStats(f, calcDataForSpectra(emap, "xy")) for f in frames]
+    )
+
+    # events are binned the same for any frame layout
+    events = framesToEvents(frames, "xy")
+    for layout in ("xy", "yx"):
+        data = calcDataForSpectra(emap, layout)
+        assert np.allclose(projectEvents(events, data, len(frames)), expected)
+        assert np.allclose(projectEvents(events, data), expected.sum(axis=0))
+
+    # cropped "yx" frames, and unweighted events outside of the energy map
+    data = calcDataForSpectra(emap, "yx")
+    r0, r1, c0, c1 = data["box"]
+    cropped = frames.swapaxes(1, 2)[:, r0:r1, c0:c1]
+    events = framesToEvents(cropped, "yx", (r0, c0))
+    assert np.allclose(projectEvents(events, data, len(frames))[:, 0], expected[:, 0])
+    events = {"x": np.array([0, 100, -1]), "y": np.array([0, 0, 0]), "frame": [0] * 3}
+    assert projectEvents(events, data)[0].sum() == (emap.values[0, 0] > 0)
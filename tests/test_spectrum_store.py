@@ -0,0 +1,66 @@
+from XESSpectrumClass import SpectrumStore
+from types import SimpleNamespace
+import numpy as np
+import pytest
+
+
+def test_spectrum_store():
+    energies = np.linspace(7000, 7100, 11)
+    spectra = [
+        SimpleNamespace(energies=energies, intensities=np.full(11, float(i)))
+        for i in range(5)
+    ]
+    store = SpectrumStore(spectra)
+    assert store.base.shape == (5, 11)
+    assert len(store) == 5
+
+    # spectra without statistics have NaN errors
+    assert np.isnan(store.variance).all()
+    store.variance[:] = 4.0
+
+    store.select([1, 3], False)
+    en, inte = store.average()
+    assert np.allclose(en, energies)
+    assert np.allclose(inte, (0 + 2 + 4) / 3)
+    assert np.allclose(store.averageErrors(), np.sqrt(3 * 4.0) / 3)
+
+    # selected spectra are spaced by their position among selected spectra
+    store.stack(100)
+    assert np.allclose(store.current[[0, 2, 4], 0], [0, 102, 204])
+
+    store.invert()
+    assert list(store.mask) == [False, True, False, True, False]
+
+    store.select(slice(None), False)
+    with pytest.raises(IndexError):
+        store.average()
+
+
+def test_spectrum_store_extend():
+    energies = np.linspace(7000, 7100, 11)
+    spectra = [
+        SimpleNamespace(energies=energies, intensities=np.full(11, float(i)))
+        for i in range(3)
+    ]
+    store = SpectrumStore(spectra[:2])
+    store.select([0], False)
+    store.extend(spectra[2:])
+    assert store.base.shape == (3, 11)
+    assert list(store.mask) == [False, True, True]
+    assert store.variance.shape == store.pixels.shape == (3, 11)
+
+
+def test_spectrum_store_replace():
+    energies = np.linspace(7000, 7100, 11)
+    spectra = [
+        SimpleNamespace(energies=energies, intensities=np.full(11, float(i)))
+        for i in range(3)
+    ]
+    store = SpectrumStore(spectra[:2])
+    store.select([1], False)
+    store.stack(10)
+    store.replace(0, spectra[2])
+    assert np.allclose(store.base[0], 2)
+    assert np.allclose(store.current[0], 2 + store.offsets[0])
+    assert np.allclose(store.base[1], 1)
+    assert list(store.mask) == [True, False]